@@ -1,10 +1,8 @@
 import os
-import pandas as pd
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from flask_jwt_extended import create_access_token, jwt_required, JWTManager, get_jwt_identity,verify_jwt_in_request
 from flask_bcrypt import Bcrypt
-from pymongo import MongoClient
 from dotenv import load_dotenv
 from datetime import datetime
 import logging
@@ -13,23 +11,24 @@ from datetime import datetime
 from datetime import datetime, timedelta
 import pyotp
 import smtplib
-import joblib
 import sys
-import pandas as pd
-import numpy as np
-from sklearn.neighbors import NearestNeighbors
 import random
 from flask_mail import Mail, Message
 from werkzeug.security import generate_password_hash
+from resources import ResourceRegistry
+from ttl_cache import TTLCache
+import data_access
+import group_posts
+import leaderboard
+import nutrition_rollups
+import profile_metrics
 
 
 print("✅ Flask is using Python:", sys.executable)
 
-try:
-    import sklearn
-    print("✅ scikit-learn is installed:", sklearn.__version__)
-except ImportError:
-    print("❌ ERROR: scikit-learn is NOT available in this environment!")
+# Datasets, indexes and models are built on first use (see the
+# @resources.resource builders below) so that importing the app stays cheap.
+resources = ResourceRegistry(globals())
 
 NEWS_API_KEY = os.getenv("NEWS_API_KEY")  
 NEWS_API_URL = "https://newsapi.org/v2/everything"
@@ -51,33 +50,35 @@ OTP_EXPIRY_MINUTES = 10
 bcrypt = Bcrypt(app)
 
 
-MONGO_URI=os.getenv("MONGO_URI")
-client=MongoClient(MONGO_URI)
-db = client.HealthFitnessApp
-users_collection=db.users
-sleep_collection=db.sleep
-achievements_collection=db.achievements
-groups_collection=db.groups
-meal_collection=db.meals
-badges_collection=db.badges
-progress_collection=db.progress
-steps_collection = db.steps
-users_collection = db.users
-profiles_collection = db.profiles
-challenges_collection = db.challenges
-user_challenges_collection = db.user_challenges
-notifications_collection = db.notifications
+# Clients are created lazily per process (see data_access.py), so importing the
+# app, or preloading it in the gunicorn master, opens no connection.
+# These names are the same lazy handles data_access exposes, not clients of
+# their own. Reads on the hot paths go through the data_access functions with
+# explicit projections; one-off writes and aggregations still use the handles.
+db = data_access.db
+users_collection = data_access.users
+sleep_collection = data_access.sleep
+achievements_collection = data_access.achievements
+groups_collection = data_access.groups
+group_posts_collection = data_access.group_posts
+meal_collection = data_access.meals
+nutrition_daily_collection = data_access.nutrition_daily
+nutrition_totals_collection = data_access.nutrition_totals
+badges_collection = data_access.badges
+progress_collection = data_access.progress
+steps_collection = data_access.steps
+profiles_collection = data_access.profiles
+challenges_collection = data_access.challenges
+user_challenges_collection = data_access.user_challenges
+notifications_collection = data_access.notifications
 
 app.config["JWT_SECRET_KEY"]=os.getenv("JWT_SECRET_KEY")
 jwt = JWTManager(app)
 
-MODEL_PATH = os.path.join(os.getcwd(), "diet_kmeans.pkl")
+# Centroid export of the diet KMeans model (see diet_clusters.py); serving it needs no sklearn.
+MODEL_PATH = os.path.join(os.getcwd(), "diet_centroids.npz")
 
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 from flask import jsonify
-from pymongo import MongoClient
 
 @app.route('/forgot-password', methods=['POST'])
 def forgot_password():
@@ -90,8 +91,7 @@ def forgot_password():
         if not email:
             return jsonify({'error': 'Email is required'}), 400
 
-        user = users_collection.find_one({'email': email})
-        if not user:
+        if not data_access.user_exists(email):
             return jsonify({'error': 'User not found'}), 404
 
         otp = str(random.randint(100000, 999999))
@@ -133,7 +133,7 @@ def verify_otp():
         if not email or not otp:
             return jsonify({'error': 'Email and OTP are required'}), 400
 
-        user = users_collection.find_one({'email': email})
+        user = data_access.find_user(email, data_access.USER_OTP)
         if not user or not user.get('otp'):
             return jsonify({'error': 'OTP not found for this email'}), 404
 
@@ -167,7 +167,7 @@ def reset_password():
         if not email or not new_password:
             return jsonify({'error': 'Email and password are required'}), 400
 
-        user = users_collection.find_one({'email': email})
+        user = data_access.find_user(email, data_access.USER_OTP)
         if not user or not user.get('otp_verified'):
             return jsonify({'error': 'OTP verification required'}), 403
 
@@ -195,13 +195,48 @@ def reset_password():
         return jsonify({'error': f"Error resetting password: {str(e)}"}), 500
 
 
-exercises_df = pd.read_csv('fitness_exercises.csv')  
-exercises_df['tags'] = exercises_df['bodyPart'] + ' ' + exercises_df['equipment'] + ' ' + exercises_df['target']
-
-tfidf = TfidfVectorizer(stop_words='english')
-tfidf_matrix = tfidf.fit_transform(exercises_df['tags'])
-
-cosine_sim = cosine_similarity(tfidf_matrix, tfidf_matrix)
+@resources.resource("exercises_df")
+def load_exercises_df():
+    from exercise_index import EXERCISES_FILE, load_exercises
+    return load_exercises(EXERCISES_FILE)
+
+@resources.resource("exercise_index")
+def load_exercise_neighbors():
+    from exercise_index import EXERCISES_FILE, load_exercise_index
+    return load_exercise_index(EXERCISES_FILE)
+
+@resources.resource("tfidf_matrix")
+def load_tfidf_matrix():
+    return resources.get("exercise_index").tfidf_matrix
+
+@resources.resource("exercise_engine")
+def load_exercise_engine():
+    from exercise_engine import ExerciseEngine
+    return ExerciseEngine(resources.get("exercises_df"), resources.get("exercise_index"), gif_url=format_gif_url)
+
+COOCCURRENCE_WEIGHT = float(os.getenv("COOCCURRENCE_WEIGHT", "0.5"))
+
+@resources.resource("exercise_cooccurrence")
+def load_exercise_cooccurrence():
+    """Registry of the latest co-occurrence build for the current catalog (see cooccurrence.py).
+
+    Every build rewrites the catalog's latest pointer, so incremental builds
+    reach running workers within MODEL_CHECK_INTERVAL, like the diet models.
+    """
+    from cooccurrence import latest_path, latest_pointer, open_latest, point_latest
+    from model_registry import ModelRegistry
+    version = resources.get("exercise_engine").version
+    pointer = latest_pointer(version)
+    if not os.path.exists(pointer) and latest_path(version):
+        # Builds published before pointers existed.
+        point_latest(version, latest_path(version))
+    registry = ModelRegistry(pointer, loader=open_latest,
+                             check_interval=float(os.getenv("MODEL_CHECK_INTERVAL", 5)))
+    try:
+        registry.get()
+    except FileNotFoundError:
+        pass
+    return registry
 
 def get_intensity_level(bmi):
     if bmi < 18.5: return 'beginner'
@@ -219,7 +254,9 @@ def format_gif_url(exercise_id):
 @app.route("/api/get-recommendations", methods=["GET"])
 @jwt_required()
 def get_recommendations():
+    import pandas as pd
     try:
+        exercises_df = resources.get("exercises_df")
         if exercises_df.empty:
             raise Exception("Exercise data not loaded")
             
@@ -237,15 +274,60 @@ def get_recommendations():
             "error": str(e)
         }), 500
 
+def taste_document(vector, exercise_engine, updated_at, updates=0):
+    return {
+        "vector": [float(x) for x in vector],
+        "index_version": exercise_engine.version,
+        "updated_at": updated_at,
+        "updates": updates,
+    }
+
+def history_taste_vector(history, exercise_engine, now):
+    """Rebuild a taste vector from a full workout history (legacy profiles / new catalog)."""
+    rows, ages = [], []
+    for entry in history:
+        row = exercise_engine.row_for_id(entry.get("exerciseId"))
+        if row is None:
+            continue
+        rows.append(row)
+        logged_at = entry.get("timestamp")
+        ages.append((now - logged_at).total_seconds() / 86400 if isinstance(logged_at, datetime) else 0.0)
+    if not rows:
+        return None
+    return exercise_engine.taste_vector(rows, ages)
+
+def get_taste_vector(user_email, user, exercise_engine):
+    """The user's stored taste vector, or one rebuilt from history if missing or from an old catalog.
+
+    A rebuilt vector is stored once, under the same condition log_workout rebuilds
+    under, so it never overwrites a vector someone else stored meanwhile.
+    """
+    import numpy as np
+    taste = user.get("taste")
+    if taste and taste.get("index_version") == exercise_engine.version:
+        return np.asarray(taste["vector"], dtype=np.float64)
+
+    now = datetime.utcnow()
+    history = [entry for entry in user.get("workout_history", []) if isinstance(entry, dict)]
+    vector = history_taste_vector(history, exercise_engine, now)
+    if vector is not None:
+        profiles_collection.update_one(
+            {"email": user_email, "taste.index_version": {"$ne": exercise_engine.version}},
+            {"$set": {"taste": taste_document(vector, exercise_engine, now)}},
+        )
+    return vector
+
 @app.route("/api/get-personalized-workouts", methods=["GET"])
 @jwt_required()
 def get_personalized_workouts():
+    import numpy as np
     try:
-        if exercises_df.empty or cosine_sim is None:
+        exercise_engine = resources.get("exercise_engine")
+        if exercise_engine.df.empty or exercise_engine.index is None:
             raise Exception("Exercise data not loaded")
         
         user_email = get_jwt_identity()
-        user = profiles_collection.find_one({"email": user_email})
+        user = profiles_collection.find_one({"email": user_email}, data_access.PROFILE_WORKOUT_FIELDS)
         
         if not user or "bmi" not in user:
             return jsonify({
@@ -258,50 +340,36 @@ def get_personalized_workouts():
         preferred_body_part = user.get("preferred_body_part", "all")
         equipment_available = user.get("equipment", ["body weight"])
         
-        filtered_exercises = exercises_df.copy()
-
-        if intensity == 'beginner':
-            filtered_exercises = filtered_exercises[~filtered_exercises['name'].str.contains('advanced|pro', case=False)]
-        elif intensity == 'low-impact':
-            filtered_exercises = filtered_exercises[filtered_exercises['equipment'].str.contains('body weight|resistance band', case=False)]
-        
-        if preferred_body_part != "all":
-            filtered_exercises = filtered_exercises[filtered_exercises['bodyPart'] == preferred_body_part]
-
-        filtered_exercises = filtered_exercises[filtered_exercises['equipment'].isin(equipment_available)]
-
-        arm_exercises = filtered_exercises[filtered_exercises['bodyPart'].str.lower().str.contains("arm")]
-        leg_exercises = filtered_exercises[filtered_exercises['bodyPart'].str.lower().str.contains("leg")]
-
-        def get_weekly_plan(df, n=7):
-            if 'workout_history' in user:
-                try:
-                    history = pd.DataFrame(user['workout_history'])
-                    top_exercises = history['exerciseId'].value_counts().head(3).index.tolist()
-                    similar_exercises = set()
-
-                    for ex_id in top_exercises:
-                        idx = exercises_df[exercises_df['id'] == ex_id].index[0]
-                        sim_scores = list(enumerate(cosine_sim[idx]))
-                        sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)
-                        similar_exercises.update([i[0] for i in sim_scores[1:4]])
-
-                    recommended_indices = list(similar_exercises)
-                    df = exercises_df.iloc[recommended_indices]
-                    df = df[df['bodyPart'].isin(["arms", "legs"])]
-                except:
-                    pass  
-
-            return df.sample(min(n, len(df))).copy()
-
-        weekly_arms = get_weekly_plan(arm_exercises)
-        weekly_legs = get_weekly_plan(leg_exercises)
-
-        weekly_arms['gifUrl'] = weekly_arms['id'].apply(format_gif_url)
-        weekly_legs['gifUrl'] = weekly_legs['id'].apply(format_gif_url)
-
-        arm_workouts = weekly_arms.replace({pd.NA: None}).to_dict('records')
-        leg_workouts = weekly_legs.replace({pd.NA: None}).to_dict('records')
+        candidates = exercise_engine.candidates(intensity, preferred_body_part, equipment_available)
+
+        history = [entry for entry in user.get("workout_history", []) if isinstance(entry, dict)]
+        seen_rows = exercise_engine.rows_for_ids(entry.get("exerciseId") for entry in history)
+        taste = get_taste_vector(user_email, user, exercise_engine)
+
+        # Collaborative signal: exercises other users often do in the same session.
+        boost = None
+        if len(seen_rows) and COOCCURRENCE_WEIGHT > 0:
+            try:
+                cooccurrence = resources.get("exercise_cooccurrence").get().model
+                boost = COOCCURRENCE_WEIGHT * cooccurrence.scores(seen_rows)
+            except FileNotFoundError:
+                pass
+
+        def get_weekly_plan(part_mask, n=7):
+            mask = candidates & part_mask
+            rows = []
+            if taste is not None:
+                ranked, _ = exercise_engine.recommend(taste, k=n, exclude=seen_rows, mask=mask, boost=boost)
+                rows = ranked.tolist()
+
+            if len(rows) < n:
+                taken = set(rows)
+                remaining = [row for row in np.flatnonzero(mask).tolist() if row not in taken]
+                rows += random.sample(remaining, min(n - len(rows), len(remaining)))
+            return [exercise_engine.records[row] for row in rows]
+
+        arm_workouts = get_weekly_plan(exercise_engine.arm)
+        leg_workouts = get_weekly_plan(exercise_engine.leg)
 
         weekly_plan = {
             "monday": {"arms": arm_workouts[0] if len(arm_workouts) > 0 else None,
@@ -333,67 +401,92 @@ def get_personalized_workouts():
             "error": str(e)
         }), 500
 
+@app.route("/api/log-workout", methods=["POST"])
+@jwt_required()
+def log_workout():
+    data = request.json or {}
+    user_email = get_jwt_identity()
+    exercise_id = data.get("exerciseId")
+
+    if exercise_id is None:
+        return jsonify({"error": "exerciseId is required"}), 400
+
+    exercise_engine = resources.get("exercise_engine")
+    row = exercise_engine.row_for_id(exercise_id)
+    if row is None:
+        return jsonify({"error": "Exercise not found"}), 404
+
+    now = datetime.utcnow()
+    entry = {"exerciseId": int(exercise_id), "timestamp": now}
+
+    # Optimistic concurrency: the taste update only applies if nobody else
+    # updated the vector since we read it; otherwise re-read and retry.
+    for _ in range(3):
+        user = profiles_collection.find_one({"email": user_email}, {"_id": 0, "taste": 1, "workout_history": 1})
+        if not user:
+            return jsonify({"error": "Profile not found"}), 404
+
+        taste = user.get("taste")
+        if taste and taste.get("index_version") == exercise_engine.version:
+            elapsed_days = (now - taste["updated_at"]).total_seconds() / 86400
+            vector = exercise_engine.update_taste(taste["vector"], row, elapsed_days)
+            updates = taste.get("updates", 0)
+            query = {"email": user_email, "taste.updates": updates}
+        else:
+            history = [item for item in user.get("workout_history", []) if isinstance(item, dict)]
+            vector = history_taste_vector(history + [entry], exercise_engine, now)
+            updates = -1
+            query = {"email": user_email, "taste.index_version": {"$ne": exercise_engine.version}}
+
+        result = profiles_collection.update_one(query, {
+            "$push": {"workout_history": entry},
+            "$set": {"taste": taste_document(vector, exercise_engine, now, updates + 1)},
+        })
+        if result.matched_count:
+            return jsonify({"message": "Workout logged successfully!", "exerciseId": entry["exerciseId"]}), 201
+
+    return jsonify({"error": "Could not log workout, please retry"}), 409
+
+@resources.resource("food_table")
 def load_food_data():
+    from food_table import FOOD_FILE, TABLE_DIR, load_food_table, open_food_table
     try:
-        file_path = os.path.join(os.getcwd(), "food_database.xlsx")
+        imported = os.getenv("FOOD_TABLE_PATH")
+        if imported:
+            food_table = open_food_table(imported)
+            print(f"✅ Loaded {len(food_table)} imported food items from {imported}")
+            return food_table
+
+        file_path = os.path.join(os.getcwd(), FOOD_FILE)
         print(f"📂 Checking file at: {file_path}")  
         if not os.path.exists(file_path):
             print("❌ File not found!")
-            return {}
+            return None
 
-        df = pd.read_excel(file_path, engine="openpyxl")
-        print("✅ First 5 rows of DataFrame:")
-        print(df.head())  
-        required_columns = ["Food Name", "Calories (kcal)", "Protein (g)", "Carbohydrates (g)", "Fats (g)"]
-        for col in required_columns:
-            if col not in df.columns:
-                print(f"❌ Column '{col}' not found in Excel!")
-                return {}
-
-        
-        df = df.fillna(0)
-        numeric_columns = ["Calories (kcal)", "Protein (g)", "Carbohydrates (g)", "Fats (g)"]
-        df[numeric_columns] = df[numeric_columns].apply(pd.to_numeric, errors="coerce").fillna(0)
-
-       
-        food_dict = df.set_index("Food Name")[numeric_columns].to_dict(orient="index")
-
-        print(f"✅ Loaded Food Items: {list(food_dict.keys())}") 
-        return food_dict
+        food_table = load_food_table(file_path, os.path.join(os.getcwd(), TABLE_DIR))
+        print(f"✅ Loaded {len(food_table)} food items") 
+        return food_table
 
     except Exception as e:
         print(f"⚠ Error loading food database: {e}")
-        return {}
+        return None
 
-food_database = load_food_data()
-    
 
+# The kNN food model MealComposer replaced; only the meal-plan tests still compare against it.
 def initialize_model():
+    from sklearn.neighbors import NearestNeighbors
     try:
-        if not food_database:
+        food_table = resources.get("food_table")
+        if not food_table:
             print("⚠ Food database not loaded - cannot initialize model")
             return None, None
         
-        foods = []
-        for name, nutrients in food_database.items():
-            foods.append({
-                'name': name,
-                'calories': nutrients['Calories (kcal)'],
-                'protein': nutrients['Protein (g)'],
-                'carbs': nutrients['Carbohydrates (g)'],
-                'fat': nutrients['Fats (g)']
-            })
-        
-        food_df = pd.DataFrame(foods)
-        features = food_df[['calories', 'protein', 'carbs', 'fat']]
-        model = NearestNeighbors(n_neighbors=5, algorithm='ball_tree')
-        model.fit(features)
-        return model, food_df
+        model = NearestNeighbors(n_neighbors=min(5, len(food_table)), algorithm='ball_tree')
+        model.fit(food_table.macros)
+        return model, food_table
     except Exception as e:
         print(f"⚠ Error initializing model: {e}")
         return None, None
-    
-food_model, food_df = initialize_model()
 
 def calculate_calorie_needs(bmi, weight_kg, activity_level):
     base_calories = weight_kg * 22 
@@ -412,30 +505,48 @@ def calculate_calorie_needs(bmi, weight_kg, activity_level):
     else:
         return base_calories * activity_multiplier  
 
-def generate_meal_plan(bmi, daily_calories):
-    if not food_model or food_df.empty:
+MAX_MEAL_PLAN_DAYS = 31
+
+@resources.resource("meal_composer")
+def load_meal_composer():
+    from meal_planner import MealComposer
+    food_table = resources.get("food_table")
+    return MealComposer(food_table) if food_table else None
+
+def get_meal_planner(restrictions=(), excluded_foods=()):
+    from meal_planner import MealPlanner
+    food_table = resources.get("food_table")
+    if not food_table:
         raise ValueError("Food database not initialized")
-    
-    macros = get_macros_by_bmi(bmi)
-    
-    
-    meals = {
-        'breakfast': generate_meal(daily_calories * 0.25, macros),
-        'lunch': generate_meal(daily_calories * 0.35, macros),
-        'dinner': generate_meal(daily_calories * 0.30, macros),
-        'snacks': [
-            generate_meal(daily_calories * 0.05, macros),
-            generate_meal(daily_calories * 0.05, macros)
-        ]
-    }
-    
-    meals['total_calories'] = sum(
-        meal['total_calories'] 
-        for meal in meals.values() 
-        if isinstance(meal, dict)
-    )
-    
-    return meals
+    composer = resources.get("meal_composer")
+    if composer is None or composer.food_table is not food_table:
+        composer = None
+    mask = None
+    if restrictions or excluded_foods:
+        mask = food_table.allowed(restrictions, excluded_foods)
+    return MealPlanner(food_table, composer, mask=mask)
+
+def generate_meal_plan(bmi, daily_calories, days=None, restrictions=(), excluded_foods=()):
+    """One day's meal plan, or a list of ``days`` plans; each distinct meal target is composed once."""
+    planner = get_meal_planner(restrictions, excluded_foods)
+    plans = planner.plan(daily_calories, get_macros_by_bmi(bmi), days=days or 1)
+    return plans if days else plans[0]
+
+def parse_diet_preferences(data):
+    """Validated dietary_restrictions / excluded_foods from a profile payload (only the keys present)."""
+    from food_tags import RESTRICTIONS
+    preferences = {}
+    if "dietary_restrictions" in data:
+        restrictions = data["dietary_restrictions"] or []
+        if not isinstance(restrictions, list) or any(r not in RESTRICTIONS for r in restrictions):
+            raise ValueError(f"dietary_restrictions must be a list of {sorted(RESTRICTIONS)}")
+        preferences["dietary_restrictions"] = sorted(set(restrictions))
+    if "excluded_foods" in data:
+        excluded = data["excluded_foods"] or []
+        if not isinstance(excluded, list) or not all(isinstance(name, str) for name in excluded):
+            raise ValueError("excluded_foods must be a list of food names")
+        preferences["excluded_foods"] = excluded
+    return preferences
 
 def get_macros_by_bmi(bmi):
     """Determine macronutrient ratios based on BMI"""
@@ -447,29 +558,16 @@ def get_macros_by_bmi(bmi):
         return {'protein': 0.30, 'carbs': 0.45, 'fat': 0.25}
 
 def generate_meal(calories, macros):
-    target_protein = calories * macros['protein'] / 4  
-    target_carbs = calories * macros['carbs'] / 4     
-    target_fat = calories * macros['fat'] / 9         
-    
-    target_vector = [calories, target_protein, target_carbs, target_fat]
-    distances, indices = food_model.kneighbors([target_vector])
-    
-    selected_indices = random.sample(list(indices[0]), min(3, len(indices[0])))
-    meal_foods = food_df.iloc[selected_indices].to_dict('records')
-    
-    return {
-        'foods': [{
-            'name': food['name'],
-            'calories': food['calories'],
-            'protein': food['protein'],
-            'carbs': food['carbs'],
-            'fat': food['fat']
-        } for food in meal_foods],
-        'total_calories': sum(f['calories'] for f in meal_foods),
-        'total_protein': sum(f['protein'] for f in meal_foods),
-        'total_carbs': sum(f['carbs'] for f in meal_foods),
-        'total_fat': sum(f['fat'] for f in meal_foods)
-    }
+    from meal_planner import macro_targets
+    return get_meal_planner().meals(macro_targets([calories], macros))[0]
+
+# Generated plans, keyed by (user, UTC day, profile_version, days). Each worker
+# has its own cache; profile_version keeps them correct across workers, and
+# store_profile/edit_profile also drop the local entries straight away.
+meal_plan_cache = TTLCache(
+    maxsize=int(os.getenv("MEAL_PLAN_CACHE_SIZE", 10000)),
+    ttl=float(os.getenv("MEAL_PLAN_CACHE_TTL", 6 * 3600)),
+)
 
 @app.route('/api/meal-plan', methods=['GET'])
 @jwt_required()
@@ -478,7 +576,8 @@ def get_meal_plan():
         user_email = get_jwt_identity()
         profile = profiles_collection.find_one(
             {"email": user_email},
-            {"_id": 0, "bmi": 1, "daily_calories": 1, "goals": 1}
+            {"_id": 0, "bmi": 1, "daily_calories": 1, "goals": 1, "dietary_restrictions": 1, "excluded_foods": 1,
+             "profile_version": 1}
         )
         
         if not profile:
@@ -493,15 +592,37 @@ def get_meal_plan():
             profile['bmi']
         )
         
+        days = request.args.get('days', type=int)
+        if days is not None and not 1 <= days <= MAX_MEAL_PLAN_DAYS:
+            return jsonify({"error": f"days must be between 1 and {MAX_MEAL_PLAN_DAYS}"}), 400
+
+        cache_key = (user_email, datetime.utcnow().date().isoformat(), profile.get('profile_version', 0), days)
+        regenerate = request.args.get('regenerate', '').lower() in ('1', 'true', 'yes')
+        if not regenerate:
+            body = meal_plan_cache.get(cache_key)
+            if body is not None:
+                return app.response_class(body, mimetype='application/json', headers={'X-Cache': 'HIT'})
+
         meal_plan = generate_meal_plan(
             bmi=profile['bmi'],
-            daily_calories=daily_calories
+            daily_calories=daily_calories,
+            days=days,
+            restrictions=profile.get('dietary_restrictions', []),
+            excluded_foods=profile.get('excluded_foods', [])
         )
         
         if not meal_plan:
             return jsonify({"error": "Failed to generate meal plan"}), 500
-            
-        return jsonify(meal_plan)
+
+        if days is not None:
+            meal_plan = {
+                "days": meal_plan,
+                "total_calories": sum(plan['total_calories'] for plan in meal_plan)
+            }
+        response = jsonify(meal_plan)
+        meal_plan_cache.set(cache_key, response.get_data())
+        response.headers['X-Cache'] = 'REGENERATED' if regenerate else 'MISS'
+        return response
         
     except Exception as e:
         return jsonify({
@@ -509,6 +630,11 @@ def get_meal_plan():
             "message": str(e)
         }), 500
 
+@app.route('/api/meal-plan/cache-stats', methods=['GET'])
+@jwt_required()
+def get_meal_plan_cache_stats():
+    return jsonify(meal_plan_cache.stats()), 200
+
 def adjust_calories_by_goal(base_calories, goal, bmi):
     if goal == "lose_weight" or bmi > 25:
         return base_calories * 0.9  
@@ -516,24 +642,23 @@ def adjust_calories_by_goal(base_calories, goal, bmi):
         return base_calories * 1.1  
     return base_calories 
 
-kmeans = None
-try:
-    if os.path.exists(MODEL_PATH):
-        print("🔍 Loading model from:", MODEL_PATH)
-        kmeans = joblib.load(MODEL_PATH)
-        print("✅ Model loaded successfully!")
-    else:
-        print("❌ Model file not found!")
-except Exception as e:
-    print(f"❌ ERROR: Model could not be loaded: {e}")
+@resources.resource("diet_models")
+def load_diet_models():
+    import diet_clusters
+    from model_registry import ModelRegistry
+    registry = ModelRegistry(MODEL_PATH, loader=diet_clusters.load,
+                             check_interval=float(os.getenv("MODEL_CHECK_INTERVAL", 5)))
+    try:
+        registry.get()
+    except FileNotFoundError:
+        pass
+    return registry
 
 def calculate_bmi(weight_kg, height_cm):
     if height_cm <= 0 or weight_kg <= 0:
         return None, "Invalid input"
 
-    height_m = height_cm / 100  
-    bmi = round(weight_kg / (height_m ** 2), 2) 
-    return bmi
+    return float(profile_metrics.bmi(weight_kg, height_cm))
 
 
 default_challenges = [
@@ -544,8 +669,11 @@ default_challenges = [
     {"name": "🛌 Sleep 8 Hours Daily", "description": "Get at least 8 hours of sleep daily", "target": 8, "unit": "hours"}
 ]
 
-if challenges_collection.count_documents({}) == 0:
-    challenges_collection.insert_many(default_challenges)
+@resources.resource("default_challenges")
+def seed_default_challenges():
+    if challenges_collection.count_documents({}) == 0:
+        challenges_collection.insert_many(default_challenges)
+    return True
 
 @app.route("/",methods=["GET"])
 def home():
@@ -554,16 +682,6 @@ def home():
 @app.route("/api/recommend-diet", methods=["GET"])
 @jwt_required()
 def recommend_diet():
-    import sys
-    print(f"✅ Inside API: Flask is using Python: {sys.executable}")
-
-    try:
-        import sklearn
-        print(f"✅ scikit-learn is installed: {sklearn.__version__}")
-    except ImportError as e:
-        print(f"❌ ERROR: {e}")
-        return jsonify({"error": "Failed to recommend diet", "details": str(e)}), 500
-
     user_email = get_jwt_identity()
 
     try:
@@ -577,73 +695,66 @@ def recommend_diet():
         bmi = user["bmi"]
         print(f"✅ Retrieved BMI: {bmi}")
 
-        meals = list(meal_collection.find({"user": user_email}, {"_id": 0}))
-        if not meals:
+        total_nutrition, meal_count = nutrition_rollups.lifetime_totals(nutrition_totals_collection, user_email, meal_collection)
+        if not meal_count:
             print("⚠ No meal data found for user.")
             return jsonify({"message": "No meal data available"}), 400
 
-        total_nutrition = {
-            "calories": sum(meal.get("nutrition", {}).get("calories", 0) for meal in meals),
-            "protein": sum(meal.get("nutrition", {}).get("protein", 0) for meal in meals),
-            "carbs": sum(meal.get("nutrition", {}).get("carbs", 0) for meal in meals),
-            "fats": sum(meal.get("nutrition", {}).get("fats", 0) for meal in meals),
-        }
         print(f"📊 Nutrition Summary: {total_nutrition}")
 
-        model_path = os.path.join(os.getcwd(), "diet_kmeans.pkl")
-        if not os.path.exists(model_path):
-            print(f"❌ Model file not found at {model_path}")
+        try:
+            diet_model = resources.get("diet_models").get()
+        except FileNotFoundError:
+            print(f"❌ Model file not found at {MODEL_PATH}")
             return jsonify({"error": "Diet model not available"}), 500
 
-        kmeans_model = joblib.load(model_path)
-        print("✅ Model loaded successfully!")
-
-        user_data = [[bmi, 3, 4, 2, 2]]
-        print(f"📊 Predicting cluster for input: {user_data}")
-
-        cluster = kmeans_model.predict(user_data)[0]
-        print(f"✅ Predicted Cluster: {cluster}")
-
-        diet_plans = {
-            0: {
-                "goal": "Weight Gain",
-                "breakfast": "Avocado Toast & Eggs",
-                "lunch": "Chicken & Quinoa",
-                "dinner": "Salmon & Brown Rice",
-                "snacks": "Greek Yogurt with Nuts"
-            },
-            1: {
-                "goal": "Maintenance",
-                "breakfast": "Oats & Banana",
-                "lunch": "Grilled Chicken Salad",
-                "dinner": "Stir-fry Tofu with Rice",
-                "snacks": "Hummus with Carrots"
-            },
-            2: {
-                "goal": "Weight Loss",
-                "breakfast": "Scrambled Eggs with Spinach",
-                "lunch": "Grilled Fish & Veggies",
-                "dinner": "Vegetable Soup",
-                "snacks": "Almond Butter & Apple"
-            }
-        }
+        cluster = diet_model.model.cluster_for_bmi(bmi)
+        print(f"✅ Predicted Cluster: {cluster} (model {diet_model.version})")
 
-        recommended_diet = diet_plans.get(cluster, {"goal": "Balanced Diet", "breakfast": "Smoothie", "lunch": "Quinoa Salad", "dinner": "Grilled Fish"})
+        recommended_diet = DIET_PLANS.get(cluster, DEFAULT_DIET_PLAN)
         
         return jsonify({
             "bmi": bmi,
             "overall_nutrition": total_nutrition,
-            "recommended_diet": recommended_diet
+            "recommended_diet": recommended_diet,
+            "model_version": diet_model.version
         }), 200
 
     except Exception as e:
         print(f"❌ ERROR: {str(e)}")
         return jsonify({"error": "Failed to recommend diet", "details": str(e)}), 500
     
+DIET_PLANS = {
+    0: {
+        "goal": "Weight Gain",
+        "breakfast": "Avocado Toast & Eggs",
+        "lunch": "Chicken & Quinoa",
+        "dinner": "Salmon & Brown Rice",
+        "snacks": "Greek Yogurt with Nuts"
+    },
+    1: {
+        "goal": "Maintenance",
+        "breakfast": "Oats & Banana",
+        "lunch": "Grilled Chicken Salad",
+        "dinner": "Stir-fry Tofu with Rice",
+        "snacks": "Hummus with Carrots"
+    },
+    2: {
+        "goal": "Weight Loss",
+        "breakfast": "Scrambled Eggs with Spinach",
+        "lunch": "Grilled Fish & Veggies",
+        "dinner": "Vegetable Soup",
+        "snacks": "Almond Butter & Apple"
+    }
+}
+
+DEFAULT_DIET_PLAN = {"goal": "Balanced Diet", "breakfast": "Smoothie", "lunch": "Quinoa Salad", "dinner": "Grilled Fish"}
+
 
 @app.route("/api/get-challenges", methods=["GET"])
 @jwt_required()
 def get_challenges():
+    resources.get("default_challenges")
     challenges = list(challenges_collection.find({}, {"_id": 0}))
     return jsonify({"challenges": challenges}), 200
 
@@ -688,11 +799,12 @@ def join_challenge():
     if not challenge_name:
         return jsonify({"error": "Challenge name is required"}), 400
 
-    challenge = challenges_collection.find_one({"name": challenge_name})
+    resources.get("default_challenges")
+    challenge = data_access.find_challenge(challenge_name)
     if not challenge:
         return jsonify({"error": "Challenge not found"}), 404
 
-    existing_entry = user_challenges_collection.find_one({"email": user_email, "challenge_name": challenge_name})
+    existing_entry = data_access.find_user_challenge(user_email, challenge_name)
     if existing_entry:
         return jsonify({"message": "You have already joined this challenge"}), 400
 
@@ -704,6 +816,7 @@ def join_challenge():
         "unit": challenge["unit"],
         "joined_at": datetime.utcnow()
     })
+    track_rank(challenge_name, user_email, 0)
 
     return jsonify({"message": f"Joined challenge: {challenge_name}"}), 201
 
@@ -718,23 +831,20 @@ def update_challenge_progress():
     if not challenge_name or progress is None:
         return jsonify({"error": "Challenge name and progress are required"}), 400
 
-    challenge = challenges_collection.find_one({"name": challenge_name})
+    if not isinstance(progress, (int, float)) or isinstance(progress, bool):
+        return jsonify({"error": "Progress must be a number"}), 400
+
+    challenge = data_access.find_challenge(challenge_name)
     if not challenge:
         return jsonify({"error": "Challenge not found"}), 404
 
-    user_progress = user_challenges_collection.find_one({"email": user_email, "challenge_name": challenge_name})
-    if not user_progress:
+    updated = data_access.add_challenge_progress(user_email, challenge_name, progress, challenge["target"])
+    if updated is None:
         return jsonify({"error": "You have not joined this challenge"}), 403
+    new_progress, newly_completed = updated
+    track_rank(challenge_name, user_email, new_progress)
 
-    new_progress = user_progress["progress"] + progress
-    is_completed = new_progress >= challenge["target"]
-
-    user_challenges_collection.update_one(
-        {"email": user_email, "challenge_name": challenge_name},
-        {"$set": {"progress": new_progress, "completed": is_completed}}
-    )
-
-    if is_completed:
+    if newly_completed:
         badge_title = f"🏆 {challenge_name} Champion"
         badge_description = f"Congratulations! You completed the '{challenge_name}' challenge and earned the {badge_title} badge!"
 
@@ -771,6 +881,7 @@ def reset_challenge_progress():
     )
 
     if result.modified_count > 0:
+        track_rank(challenge_name, user_email, 0)
         return jsonify({"message": f"Progress for '{challenge_name}' has been reset!"}), 200
 
     return jsonify({"error": "Challenge progress not found"}), 404
@@ -786,30 +897,65 @@ def get_user_challenges():
 @app.route("/api/get-leaderboard/<challenge_name>", methods=["GET"])
 @jwt_required()
 def get_leaderboard(challenge_name):
-    try:
-        leaderboard = list(user_challenges_collection.find(
-            {"challenge_name": challenge_name}, 
-            {"_id": 0, "email": 1, "progress": 1}
-        ))
+    limit = request.args.get("limit", leaderboard.DEFAULT_LIMIT, type=int)
+    cursor = request.args.get("after")
+    if not 1 <= limit <= leaderboard.MAX_LIMIT:
+        return jsonify({"error": f"limit must be between 1 and {leaderboard.MAX_LIMIT}"}), 400
 
-        if not leaderboard:
-            return jsonify({"message": "No entries found for this challenge", "leaderboard": []}), 200
-
-        leaderboard_sorted = sorted(leaderboard, key=lambda x: x["progress"], reverse=True)
+    try:
+        entries, next_cursor = leaderboard.page(user_challenges_collection, challenge_name, limit, cursor)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        for entry in leaderboard_sorted:
-            user = users_collection.find_one(
-                {"email": entry["email"]}, 
-                {"_id": 0, "username": 1}
-            )
-            entry["username"] = user.get("username", entry["email"]) if user else entry["email"]
-            del entry["email"]
+    response = {"leaderboard": entries, "limit": limit, "next": next_cursor}
+    if not entries and not cursor:
+        response["message"] = "No entries found for this challenge"
+    return jsonify(response), 200
+    
+@resources.resource("challenge_ranks")
+def load_challenge_ranks():
+    from challenge_ranks import RankBoards
+    boards = RankBoards(user_challenges_collection)
+    boards.load_all()
+    return boards
+
+def track_rank(challenge_name, user_email, progress):
+    """Apply a user_challenges write to this worker's rankings (None: the user left)."""
+    if not resources.loaded("challenge_ranks"):
+        return
+    if progress is None:
+        challenge_ranks.remove(challenge_name, user_email)
+    else:
+        challenge_ranks.set(challenge_name, user_email, progress)
 
-        return jsonify({"leaderboard": leaderboard_sorted}), 200
+@app.route("/api/my-rank/<challenge_name>", methods=["GET"])
+@jwt_required()
+def get_my_rank(challenge_name):
+    from challenge_ranks import MAX_NEIGHBORS
+    user_email = get_jwt_identity()
+    neighbors = request.args.get("neighbors", 2, type=int)
+    if not 0 <= neighbors <= MAX_NEIGHBORS:
+        return jsonify({"error": f"neighbors must be between 0 and {MAX_NEIGHBORS}"}), 400
 
+    try:
+        standing = resources.get("challenge_ranks").standing(challenge_name, user_email, neighbors)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    
+    if standing is None:
+        return jsonify({"error": "You have not joined this challenge"}), 404
+
+    nearby = standing["above"] + standing["below"]
+    usernames = {user["email"]: user.get("username") for user in users_collection.find(
+        {"email": {"$in": [entry["email"] for entry in nearby]}}, {"_id": 0, "email": 1, "username": 1}
+    )} if nearby else {}
+    for entry in nearby:
+        email = entry.pop("email")
+        entry["username"] = usernames.get(email) or email
+
+    return jsonify({"challenge": challenge_name, **standing}), 200
+
 @app.route("/api/leave-challenge", methods=["POST"])
 @jwt_required()
 def leave_challenge():
@@ -823,6 +969,7 @@ def leave_challenge():
     result = user_challenges_collection.delete_one({"email": user_email, "challenge_name": challenge_name})
 
     if result.deleted_count > 0:
+        track_rank(challenge_name, user_email, None)
         return jsonify({"message": f"You have left the '{challenge_name}' challenge."}), 200
 
     return jsonify({"error": "Challenge not found or not joined."}), 404
@@ -840,7 +987,7 @@ def add_challenge():
     if not all([challenge_name, description, target, unit]):
         return jsonify({"error": "All fields (name, description, target, unit) are required"}), 400
 
-    if challenges_collection.find_one({"name": challenge_name}):
+    if data_access.find_challenge(challenge_name, {"_id": 1}):
         return jsonify({"error": "Challenge already exists"}), 400
 
     new_challenge = {
@@ -871,12 +1018,11 @@ def store_profile():
         
         if age <= 0 or height <= 0 or weight <= 0:
             raise ValueError("Values must be positive")
+        activity_level = parse_activity_level(data.get("activity_level", profile_metrics.DEFAULT_ACTIVITY))
+        diet_preferences = parse_diet_preferences(data)
     except ValueError as e:
         return jsonify({"error": f"Invalid data format: {str(e)}"}), 400
 
-    bmi = calculate_bmi(weight, height)
-    daily_calories = calculate_base_calories(weight, data.get("gender", "male"))
-
     profile_data = {
         "email": user_email,
         "name": data["name"],
@@ -884,16 +1030,19 @@ def store_profile():
         "gender": data["gender"],
         "height": height,
         "weight": weight,
-        "bmi": bmi,
-        "daily_calories": daily_calories,
+        "activity_level": activity_level,
         "goals": data.get("goals", "maintain"),
         "updated_at": datetime.utcnow(),
+        **diet_preferences,
     }
+    profile_data.update(profile_metrics.for_profile(profile_data))
+    bmi, daily_calories = profile_data["bmi"], profile_data["daily_calories"]
     result = profiles_collection.update_one(
         {"email": user_email},
-        {"$set": profile_data},
+        {"$set": profile_data, "$inc": {"profile_version": 1}},
         upsert=True
     )
+    meal_plan_cache.invalidate(user_email)
     
     return jsonify({
         "message": "Profile stored successfully",
@@ -901,11 +1050,14 @@ def store_profile():
         "daily_calories": daily_calories
     }), 201
 
+def parse_activity_level(value):
+    if value not in profile_metrics.ACTIVITY_MULTIPLIERS:
+        raise ValueError(f"activity_level must be one of {sorted(profile_metrics.ACTIVITY_MULTIPLIERS)}")
+    return value
+
 def calculate_base_calories(weight_kg, gender="male"):
     """Simplified calorie calculation without activity level"""
-    if gender.lower() == "female":
-        return weight_kg * 22 * 0.9 
-    return weight_kg * 22  
+    return float(profile_metrics.daily_calories(weight_kg, None, None, gender.lower() == "female", None, "base"))
 
 @app.route("/api/edit-profile", methods=["PUT"])
 @jwt_required()
@@ -918,8 +1070,16 @@ def edit_profile():
     gender = data.get("gender")
     height = data.get("height")
     weight = data.get("weight")
+    activity_level = data.get("activity_level")
+
+    try:
+        if activity_level:
+            parse_activity_level(activity_level)
+        diet_preferences = parse_diet_preferences(data)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid data format: {str(e)}"}), 400
 
-    if not any([name, age, gender, height, weight]):
+    if not any([name, age, gender, height, weight, activity_level]) and not diet_preferences:
         return jsonify({"error": "No fields to update"}), 400
     
     try:
@@ -932,7 +1092,7 @@ def edit_profile():
     except ValueError:
         return jsonify({"error": "Invalid data format"}), 400
 
-    update_data = {}
+    update_data = dict(diet_preferences)
     if name:
         update_data["name"] = name
     if age:
@@ -943,11 +1103,19 @@ def edit_profile():
         update_data["height"] = height
     if weight:
         update_data["weight"] = weight
+    if activity_level:
+        update_data["activity_level"] = activity_level
 
-    if weight and height:
-        update_data["bmi"] = calculate_bmi(weight, height)
+    if any([age, gender, height, weight, activity_level]):
+        # Derived metrics depend on fields this request may not carry, so merge with the stored profile.
+        current = profiles_collection.find_one({"email": user_email}, profile_metrics.PROJECTION) or {}
+        metrics = profile_metrics.for_profile({**current, **update_data})
+        if metrics:
+            update_data.update(metrics)
+    update_data["updated_at"] = datetime.utcnow()
 
-    profiles_collection.update_one({"email": user_email}, {"$set": update_data})
+    profiles_collection.update_one({"email": user_email}, {"$set": update_data, "$inc": {"profile_version": 1}})
+    meal_plan_cache.invalidate(user_email)
 
     return jsonify({"message": "Profile updated successfully"}), 200
 
@@ -955,7 +1123,7 @@ def edit_profile():
 @jwt_required()
 def get_profile():
     user_email = get_jwt_identity()
-    profile = profiles_collection.find_one({"email": user_email}, {"_id": 0})
+    profile = data_access.find_profile(user_email)
     
     if not profile:
         return jsonify({"error": "Profile not found"}), 404
@@ -967,7 +1135,7 @@ def get_profile():
 def get_bmi():
     user_email = get_jwt_identity()
 
-    user = profiles_collection.find_one({"email": user_email}, {"_id": 0, "bmi": 1})
+    user = data_access.find_profile(user_email, {"_id": 0, "bmi": 1})
 
     if not user or "bmi" not in user:
         return jsonify({"error": "BMI not found. Please update your profile."}), 400
@@ -980,7 +1148,7 @@ def register():
     email = data.get("email")
     password = data.get("password")
 
-    if users_collection.find_one({"email": email}):
+    if data_access.user_exists(email):
         return jsonify({"error": "User already exists"}), 400
 
     hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
@@ -1001,7 +1169,7 @@ def login():
     if not email or not password:
         return jsonify({"error": "Email and password are required"}), 400
 
-    user = users_collection.find_one({"email": email})
+    user = data_access.find_user(email)
     if not user:
         return jsonify({"error": "Invalid email or password"}), 401
 
@@ -1019,15 +1187,7 @@ def login():
         except Exception:
             return jsonify({"error": "Authentication error"}), 500
 
-    profile = profiles_collection.find_one({"email": email})
-    profile_complete = bool(
-        profile
-        and profile.get("name")
-        and profile.get("age")
-        and profile.get("gender")
-        and profile.get("height")
-        and profile.get("weight")
-    )
+    profile_complete = data_access.profile_complete(email)
 
     token = create_access_token(identity=email)
 
@@ -1054,24 +1214,11 @@ def update_steps():
     if new_steps is None:
         return jsonify({"error": "Steps value is required"}), 400
 
-    if "steps" not in db.list_collection_names():
-        db.create_collection("steps")
-
-    last_entry = steps_collection.find_one({"email": user_email, "date": current_date})
-
-    if not last_entry:
-        steps_collection.insert_one({
-            "email": user_email,
-            "date": current_date,
-            "steps": new_steps,
-            "last_updated": datetime.utcnow()
-        })
-    else:
-        steps_collection.update_one(
-            {"email": user_email, "date": current_date},
-            {"$set": {"steps": new_steps, "last_updated": datetime.utcnow()}},
-            upsert=True
-        )
+    steps_collection.update_one(
+        {"email": user_email, "date": current_date},
+        {"$set": {"steps": new_steps, "last_updated": datetime.utcnow()}},
+        upsert=True
+    )
 
     return jsonify({"message": "Steps updated successfully!", "date": current_date}), 200
 
@@ -1083,15 +1230,10 @@ def get_steps():
     user_email = get_jwt_identity()
     current_date = get_current_date()
 
-    today_steps = steps_collection.find_one(
-        {"email": user_email, "date": current_date}, {"_id": 0, "steps": 1}
-    )
-
-    return jsonify({"steps": today_steps["steps"] if today_steps else 0, "date": current_date})
+    return jsonify({"steps": data_access.steps_on(user_email, current_date), "date": current_date})
 
 from flask import Flask, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from pymongo import MongoClient
 from datetime import datetime, timedelta
 
 @app.route("/api/get-step-history", methods=["GET"])
@@ -1101,9 +1243,7 @@ def get_step_history():
     today = datetime.utcnow().date()
 
     try:
-        today_steps = steps_collection.find_one(
-            {"email": user_email, "date": str(today)}, {"_id": 0, "steps": 1}
-        )
+        today_steps = data_access.steps_on(user_email, str(today))
 
         week_start = today - timedelta(days=6)  
         weekly_steps = steps_collection.aggregate([
@@ -1120,7 +1260,7 @@ def get_step_history():
         monthly_steps = next(monthly_steps, {}).get("total", 0)
 
         return jsonify({
-            "daily": today_steps["steps"] if today_steps else 0,
+            "daily": today_steps,
             "weekly": weekly_steps,
             "monthly": monthly_steps
         }), 200
@@ -1166,10 +1306,12 @@ def get_sleep_streak():
 def reset_sleep():
     user_email = get_jwt_identity()
     
-    user_challenges_collection.update_one(
+    result = user_challenges_collection.update_one(
         {"email": user_email, "challenge_name": "Sleep Tracker"},
         {"$set": {"progress": 0}}
     )
+    if result.matched_count:
+        track_rank("Sleep Tracker", user_email, 0)
     
     return jsonify({"message": "Sleep value reset successfully!"}), 200
     
@@ -1310,7 +1452,7 @@ def join_group():
     if not group_name:
         return jsonify({"error": "Group name is required"}), 400
 
-    group = groups_collection.find_one({"name": group_name})
+    group = data_access.find_group(group_name)
 
     if not group:
         return jsonify({"error": "Group does not exist. Use /api/create-group to create a new group."}), 404
@@ -1331,14 +1473,13 @@ def create_group():
     if not group_name:
         return jsonify({"error": "Group name is required"}), 400
 
-    existing_group = groups_collection.find_one({"name": group_name})
+    existing_group = data_access.find_group(group_name, {"_id": 1})
     if existing_group:
         return jsonify({"error": "Group already exists"}), 400
 
     new_group = {
         "name": group_name,
         "members": [user_email], 
-        "posts": [],
         "created_at": datetime.utcnow().isoformat(),
     }
 
@@ -1351,7 +1492,7 @@ def create_group():
 def get_group_details(group_name):
     user_email = get_jwt_identity()
 
-    group = groups_collection.find_one({"name": group_name}, {"_id": 0})
+    group = groups_collection.find_one({"name": group_name}, {"_id": 0, "posts": 0})
 
     if not group:
         return jsonify({"error": "Group not found"}), 404
@@ -1359,6 +1500,8 @@ def get_group_details(group_name):
     if user_email not in group.get("members", []):
         return jsonify({"error": "You are not a member of this group"}), 403
 
+    # The newest posts only; /api/get-group-posts pages on from next_posts.
+    group["posts"], group["next_posts"] = group_posts.page(group_posts_collection, group_name)
     return jsonify(group), 200
 
 @app.route("/api/delete-group", methods=["POST"])
@@ -1371,7 +1514,7 @@ def delete_group():
     if not group_name:
         return jsonify({"error": "Group name is required"}), 400
 
-    group = groups_collection.find_one({"name": group_name})
+    group = data_access.find_group(group_name)
 
     if not group:
         return jsonify({"error": "Group not found"}), 404
@@ -1380,6 +1523,7 @@ def delete_group():
         return jsonify({"error": "Only the group creator can delete this group"}), 403
 
     groups_collection.delete_one({"name": group_name})
+    group_posts_collection.delete_many({"group": group_name})
 
     return jsonify({"message": f"Group '{group_name}' deleted successfully!"}), 200
 
@@ -1394,7 +1538,7 @@ def leave_group():
         if not group_name:
             return jsonify({"error": "Group name is required"}), 400
 
-        group = groups_collection.find_one({"name": group_name})
+        group = data_access.find_group(group_name)
 
         if not group:
             return jsonify({"error": "Group not found"}), 404
@@ -1425,92 +1569,79 @@ def group_post():
     if not group_name or not content:
         return jsonify({"error": "Group name and content are required"}), 400
 
-    group = groups_collection.find_one({"name": group_name})
+    group = data_access.find_group(group_name)
 
     if not group or user not in group.get("members", []):
         return jsonify({"error": "You are not a member of this group"}), 403
 
-    post = {
-        "user": user,
-        "content": content,
-        "likes": 0,
-        "comments": [],
-        "timestamp": datetime.utcnow().isoformat(),
-    }
+    result = group_posts_collection.insert_one(group_posts.new_post(group_name, user, content))
 
-    result = groups_collection.update_one({"name": group_name}, {"$push": {"posts": post}})
+    return jsonify({"message": "Post added successfully!", "id": str(result.inserted_id), "redirect": True}), 201
 
-    if result.modified_count > 0:
-        return jsonify({"message": "Post added successfully!", "redirect": True}), 201
-    return jsonify({"error": "Group not found"}), 404
+def find_post_filter(data):
+    """(filter, None) for the post a request names by post_id or post_content, else (None, error response)."""
+    try:
+        return group_posts.post_filter(data.get("group_name"), data.get("post_id"), data.get("post_content")), None
+    except ValueError as e:
+        return None, (jsonify({"error": str(e)}), 400)
 
 @app.route("/api/like-post", methods=["POST"])
 @jwt_required()
 def like_post():
     data = request.json
     user_email = get_jwt_identity()
-    group_name = data.get("group_name")
-    post_content = data.get("post_content")
-
-    group = groups_collection.find_one({"name": group_name, "posts.content": post_content}, {"posts.$": 1})
-
-    if not group or "posts" not in group or not group["posts"]:
-        return jsonify({"error": "Post not found"}), 404
-
-    post = group["posts"][0]
-    post_owner = post["user"]
-
-    if user_email in post.get("liked_by", []):
-        return jsonify({"error": "You have already liked this post."}), 400
-
-    result = groups_collection.update_one(
-        {"name": group_name, "posts.content": post_content},
-        {"$inc": {"posts.$.likes": 1}, "$push": {"posts.$.liked_by": user_email}}
+    post_filter, error = find_post_filter(data)
+    if error:
+        return error
+
+    # One conditional update: two concurrent likes by the same user cannot both count.
+    post = group_posts_collection.find_one_and_update(
+        {**post_filter, "liked_by": {"$ne": user_email}},
+        {"$inc": {"likes": 1}, "$push": {"liked_by": user_email}},
+        projection={"_id": 0, "user": 1},
+        sort=group_posts.OLDEST_FIRST,
     )
 
-    if result.modified_count > 0:
-        notifications_collection.insert_one({
-            "user": post_owner,
-            "message": f"{user_email} liked your post!",
-            "timestamp": datetime.utcnow().isoformat(),
-            "seen": False
-        })
-        return jsonify({"message": "Post liked successfully!"}), 200
+    if not post:
+        if group_posts_collection.find_one(post_filter, {"_id": 1}):
+            return jsonify({"error": "You have already liked this post."}), 400
+        return jsonify({"error": "Post not found"}), 404
 
-    return jsonify({"error": "Failed to like post"}), 500
+    notifications_collection.insert_one({
+        "user": post["user"],
+        "message": f"{user_email} liked your post!",
+        "timestamp": datetime.utcnow().isoformat(),
+        "seen": False
+    })
+    return jsonify({"message": "Post liked successfully!"}), 200
 
 @app.route("/api/comment-post", methods=["POST"])
 @jwt_required()
 def comment_post():
     data = request.json
     user_email = get_jwt_identity()
-    group_name = data.get("group_name")
-    post_content = data.get("post_content")
     comment_text = data.get("comment")
-
-    group = groups_collection.find_one({"name": group_name, "posts.content": post_content}, {"posts.$": 1})
-
-    if not group or "posts" not in group or not group["posts"]:
-        return jsonify({"error": "Post not found"}), 404
-
-    post = group["posts"][0]
-    post_owner = post["user"]
-
-    result = groups_collection.update_one(
-        {"name": group_name, "posts.content": post_content},
-        {"$push": {"posts.$.comments": {"user": user_email, "text": comment_text}}}
+    post_filter, error = find_post_filter(data)
+    if error:
+        return error
+
+    post = group_posts_collection.find_one_and_update(
+        post_filter,
+        {"$push": {"comments": {"user": user_email, "text": comment_text}}},
+        projection={"_id": 0, "user": 1},
+        sort=group_posts.OLDEST_FIRST,
     )
 
-    if result.modified_count > 0:
-        notifications_collection.insert_one({
-            "user": post_owner,
-            "message": f"{user_email} commented on your post: {comment_text}",
-            "timestamp": datetime.utcnow().isoformat(),
-            "seen": False
-        })
-        return jsonify({"message": "Comment added successfully!"}), 200
+    if not post:
+        return jsonify({"error": "Post not found"}), 404
 
-    return jsonify({"error": "Failed to add comment"}), 500
+    notifications_collection.insert_one({
+        "user": post["user"],
+        "message": f"{user_email} commented on your post: {comment_text}",
+        "timestamp": datetime.utcnow().isoformat(),
+        "seen": False
+    })
+    return jsonify({"message": "Comment added successfully!"}), 200
 
 @app.route("/api/notifications", methods=["GET"])
 @jwt_required()
@@ -1523,16 +1654,32 @@ def get_notifications():
 @app.route("/api/get-group-posts/<group_name>", methods=["GET"])
 @jwt_required()
 def get_group_posts(group_name):
+    """With ?limit and/or ?after, one page {posts, limit, next}, newest first; otherwise every post, oldest first."""
     user = get_jwt_identity()
-    group = groups_collection.find_one({"name": group_name}, {"_id": 0, "members": 1, "posts": 1})
+    paged = "limit" in request.args or "after" in request.args
+    limit = request.args.get("limit", group_posts.DEFAULT_LIMIT, type=int)
+    cursor = request.args.get("after")
+    if not 1 <= limit <= group_posts.MAX_LIMIT:
+        return jsonify({"error": f"limit must be between 1 and {group_posts.MAX_LIMIT}"}), 400
+
+    group = data_access.find_group(group_name)
 
     if not group:
         return jsonify({"error": "Group not found"}), 404
 
-    if user not in group["members"]:
+    if user not in group.get("members", []):
         return jsonify({"error": "You are not a member of this group"}), 403
 
-    return jsonify(group["posts"])
+    if not paged:
+        # The original response, a bare list in posting order, for clients that do not page.
+        return jsonify(group_posts.all_posts(group_posts_collection, group_name))
+
+    try:
+        posts, next_cursor = group_posts.page(group_posts_collection, group_name, limit, cursor)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({"posts": posts, "limit": limit, "next": next_cursor})
 
 
 @app.route("/api/get-groups", methods=["GET"])
@@ -1555,15 +1702,15 @@ def get_user_groups():
 @jwt_required()
 def dislike_post():
     data = request.json
-    group_name = data.get("group_name")
-    post_content = data.get("post_content")
+    post_filter, error = find_post_filter(data)
+    if error:
+        return error
 
-    result = groups_collection.update_one(
-        {"name": group_name, "posts.content": post_content},
-        {"$inc": {"posts.$.likes": -1}}
+    post = group_posts_collection.find_one_and_update(
+        post_filter, {"$inc": {"likes": -1}}, projection={"_id": 1}, sort=group_posts.OLDEST_FIRST
     )
 
-    if result.modified_count > 0:
+    if post:
         return jsonify({"message": "Post disliked successfully!"}), 200
     return jsonify({"error": "Post not found"}), 404
 
@@ -1571,16 +1718,19 @@ def dislike_post():
 @jwt_required()
 def remove_comment():
     data = request.json
-    group_name = data.get("group_name")
-    post_content = data.get("post_content")
     comment_text = data.get("comment")
-
-    result = groups_collection.update_one(
-        {"name": group_name, "posts.content": post_content},
-        {"$pull": {"posts.$.comments": {"text": comment_text}}}
+    post_filter, error = find_post_filter(data)
+    if error:
+        return error
+
+    post = group_posts_collection.find_one_and_update(
+        {**post_filter, "comments.text": comment_text},
+        {"$pull": {"comments": {"text": comment_text}}},
+        projection={"_id": 1},
+        sort=group_posts.OLDEST_FIRST,
     )
 
-    if result.modified_count > 0:
+    if post:
         return jsonify({"message": "Comment removed successfully!"}), 200
     return jsonify({"error": "Comment not found"}), 404
 
@@ -1600,11 +1750,13 @@ def log_meal():
     meals = data.get("meals")
 
    
-    global food_database
-    if not isinstance(food_database, dict) or not food_database:
+    food_table = resources.get("food_table")
+    if not food_table:
         return jsonify({"error": "Food database not loaded properly"}), 500
+    food_search = resources.get("food_search")
 
    
+    unmatched = []
     total_calories = 0
     total_protein = 0
     total_carbs = 0
@@ -1616,15 +1768,23 @@ def log_meal():
             food_items = [food_items] 
         
         for food_item in food_items:
-            if food_item in food_database:
-                food_info = food_database[food_item]
-                total_calories += food_info.get("Calories (kcal)", 0)
-                total_protein += food_info.get("Protein (g)", 0)
-                total_carbs += food_info.get("Carbohydrates (g)", 0)
-                total_fats += food_info.get("Fats (g)", 0)
+            row = food_table.lookup(food_item)
+            if row is None and food_search is not None:
+                row = food_search.resolve(food_item)
+            if row is not None:
+                calories, protein, carbs, fats = food_table.macros[row].tolist()
+                total_calories += calories
+                total_protein += protein
+                total_carbs += carbs
+                total_fats += fats
             else:
-                print(f"⚠ Warning: '{food_item}' not found in database!")
+                suggestions = food_search.suggest(food_item) if food_search is not None else []
+                unmatched.append({
+                    "name": food_item,
+                    "suggestions": [food_table.name(s) for s in suggestions],
+                })
 
+    logged_at = datetime.utcnow()
     meal_entry = {
         "user": user_email,
         "meals": meals, 
@@ -1634,40 +1794,90 @@ def log_meal():
             "carbs": total_carbs,
             "fats": total_fats,
         },
-        "date": datetime.utcnow().isoformat()  
+        "date": logged_at.isoformat()
     }
 
     meal_collection.insert_one(meal_entry)
+    nutrition_rollups.record_meal(
+        nutrition_daily_collection, nutrition_totals_collection, user_email, logged_at, meal_entry["nutrition"]
+    )
 
-    return jsonify({
+    response = {
         "message": "Meal logged successfully!",
         "total_nutrition": meal_entry["nutrition"],
         "date": meal_entry["date"]
-    }), 201
+    }
+    if unmatched:
+        # Unknown foods add nothing to the totals; tell the client what we think was meant.
+        response["unmatched"] = unmatched
+    return jsonify(response), 201
+
+def get_all_meals(user_email):
+    try:
+        meals = list(meal_collection.find({"user": user_email}, {"_id": 0}))
+
+        if not meals:
+            return jsonify({"meals": [], "message": "No meals found"}), 200
+        total_nutrition = nutrition_rollups.empty_totals()
+        for meal in meals:
+            for nutrient in nutrition_rollups.NUTRIENTS:
+                total_nutrition[nutrient] += meal.get("nutrition", {}).get(nutrient, 0)
+
+        return jsonify({"meals": meals, "overall_nutrition": total_nutrition}), 200
+
+    except Exception as e:
+        print(f"⚠ Error fetching meals: {e}")
+        return jsonify({"error": "Failed to load meals", "details": str(e)}), 500
 
 @app.route("/api/get-meals", methods=["GET"])
 @jwt_required()
 def get_meals():
+    """Every meal and its overall nutrition, or with ?period=day|week|all a rollup window.
+
+    The windows end on ?date=YYYY-MM-DD (default today; a date alone means
+    period=day) and read their totals from the nutrition rollups. "all"
+    returns lifetime totals without the meal list.
+    """
     user_email = get_jwt_identity()
+    if "period" not in request.args and "date" not in request.args:
+        return get_all_meals(user_email)
 
+    period = request.args.get("period", "day")
+    if period != "all" and period not in nutrition_rollups.PERIODS:
+        return jsonify({"error": "period must be one of day, week, all"}), 400
     try:
-       
-        print(f"🔍 Fetching meals for: {user_email}")
+        end = datetime.strptime(request.args["date"], "%Y-%m-%d").date() if "date" in request.args \
+            else datetime.utcnow().date()
+    except ValueError:
+        return jsonify({"error": "date must be YYYY-MM-DD"}), 400
 
-        meals = list(meal_collection.find({"user": user_email}, {"_id": 0})) 
-        
-        print(f"✅ Retrieved Meals: {meals}")
+    try:
+        if period == "all":
+            total_nutrition, meal_count = nutrition_rollups.lifetime_totals(nutrition_totals_collection, user_email, meal_collection)
+            return jsonify({"period": period, "meal_count": meal_count, "overall_nutrition": total_nutrition}), 200
 
-        if not meals:
-            return jsonify({"meals": [], "message": "No meals found"}), 200 
-        total_nutrition = {
-            "calories": sum(meal.get("nutrition", {}).get("calories", 0) for meal in meals),
-            "protein": sum(meal.get("nutrition", {}).get("protein", 0) for meal in meals),
-            "carbs": sum(meal.get("nutrition", {}).get("carbs", 0) for meal in meals),
-            "fats": sum(meal.get("nutrition", {}).get("fats", 0) for meal in meals),
+        start, end = nutrition_rollups.window(period, end)
+        total_nutrition, meal_count, days = nutrition_rollups.window_totals(
+            nutrition_daily_collection, user_email, start, end
+        )
+        # Meal dates are ISO timestamps, so every entry of the window sorts inside [start, end + 1 day).
+        meals = list(meal_collection.find(
+            {"user": user_email, "date": {"$gte": str(start), "$lt": str(end + timedelta(days=1))}},
+            {"_id": 0},
+        ).sort("date", 1)) if meal_count else []
+
+        response = {
+            "period": period,
+            "start": str(start),
+            "end": str(end),
+            "meals": meals,
+            "meal_count": meal_count,
+            "overall_nutrition": total_nutrition,
+            "daily": days,
         }
-
-        return jsonify({"meals": meals, "overall_nutrition": total_nutrition}), 200
+        if not meals:
+            response["message"] = "No meals found"
+        return jsonify(response), 200
 
     except Exception as e:
         print(f"⚠ Error fetching meals: {e}")  
@@ -1675,31 +1885,77 @@ def get_meals():
 
 @app.route("/api/get-food-items", methods=["GET"])
 def get_food_items():
-    return jsonify({"food_items": list(food_database.keys())})
+    food_table = resources.get("food_table")
+    return jsonify({"food_items": food_table.names if food_table else []})
+
+@resources.resource("barcode_index")
+def load_barcode_index():
+    """Barcode hash index of the imported food table (see food_import.py), or None."""
+    from food_import import open_barcode_index
+    imported = os.getenv("FOOD_TABLE_PATH")
+    if not imported or not os.path.exists(os.path.join(imported, "barcode_keys.npy")):
+        return None
+    return open_barcode_index(imported)
+
+@app.route("/api/food-by-barcode/<code>", methods=["GET"])
+def get_food_by_barcode(code):
+    food_table = resources.get("food_table")
+    barcode_index = resources.get("barcode_index")
+    if not food_table or barcode_index is None:
+        return jsonify({"error": "No barcode index loaded"}), 503
+
+    row = barcode_index.lookup(code)
+    if row is None:
+        return jsonify({"error": "Barcode not found"}), 404
+
+    food = food_table.records([row])[0]
+    food.update(barcode=code, category=food_table.category(row), tags=food_table.tags(row))
+    return jsonify(food), 200
+
+@resources.resource("food_search")
+def load_food_search():
+    from food_search import FoodSearchIndex
+    food_table = resources.get("food_table")
+    return FoodSearchIndex(food_table.names) if food_table else None
+
+@app.route("/api/search-foods", methods=["GET"])
+def search_foods():
+    from food_search import DEFAULT_LIMIT, MAX_LIMIT
+    query = request.args.get("q", "").strip()
+    limit = request.args.get("limit", DEFAULT_LIMIT, type=int)
+    offset = request.args.get("offset", 0, type=int)
+
+    if not query:
+        return jsonify({"error": "Query parameter 'q' is required"}), 400
+    if not 1 <= limit <= MAX_LIMIT or offset < 0:
+        return jsonify({"error": f"limit must be between 1 and {MAX_LIMIT} and offset non-negative"}), 400
+
+    food_table = resources.get("food_table")
+    food_search = resources.get("food_search")
+    if not food_table or food_search is None:
+        return jsonify({"error": "Food database not loaded properly"}), 500
+
+    page, has_more = food_search.search(query, limit=limit, offset=offset)
+    results = food_table.records([row for row, _ in page])
+    for result, (_, match) in zip(results, page):
+        result["match"] = match
+
+    return jsonify({
+        "query": query,
+        "results": results,
+        "offset": offset,
+        "limit": limit,
+        "next_offset": offset + limit if has_more else None,
+    }), 200
+
+WORKOUT_BADGES = {3: "🏅 Beginner Badge", 5: "🥈 Intermediate Badge", 7: "🏆 Advanced Badge"}
 
 @app.route("/api/track-progress", methods=["POST"])
 @jwt_required()
 def track_progress():
     user_email = get_jwt_identity()
 
-    progress = progress_collection.find_one({"user": user_email}) or {"completed_days": 0}
-    completed_days = progress["completed_days"] + 1 
-    achievement_days = completed_days
-
-    badge = None
-    if completed_days == 3:
-        badge = "🏅 Beginner Badge"
-    elif completed_days == 5:
-        badge = "🥈 Intermediate Badge"
-    elif completed_days == 7:
-        badge = "🏆 Advanced Badge"
-        completed_days = 0  
-
-    progress_collection.update_one(
-        {"user": user_email},
-        {"$set": {"completed_days": completed_days, "badge": badge}},
-        upsert=True
-    )
+    completed_days, badge, achievement_days = data_access.record_workout_day(user_email, WORKOUT_BADGES)
 
     if badge:
         achievements_collection.insert_one({
@@ -1721,7 +1977,7 @@ def track_progress():
 @jwt_required()
 def get_progress():
     user_email = get_jwt_identity()
-    progress = progress_collection.find_one({"user": user_email}, {"_id": 0}) or {"completed_days": 0, "badge": None}
+    progress = data_access.find_progress(user_email) or {"completed_days": 0, "badge": None}
     return jsonify(progress)
 
 
@@ -1752,28 +2008,22 @@ def post_badge():
         if not group_name or not badge:
             return jsonify({"error": "Group name and badge are required!"}), 400
 
-        group = groups_collection.find_one({"name": group_name})
+        group = data_access.find_group(group_name, {"_id": 1})
         if not group:
             return jsonify({"error": "Group not found!"}), 404
 
-        post = {
-            "user": user_email,
-            "content": f"🎉 Earned a new badge: {badge}!",
-            "likes": 0,
-            "comments": []
-        }
-
-        result = groups_collection.update_one({"name": group_name}, {"$push": {"posts": post}})
+        group_posts_collection.insert_one(
+            group_posts.new_post(group_name, user_email, f"🎉 Earned a new badge: {badge}!")
+        )
 
-        if result.modified_count > 0:
-            return jsonify({"message": "Badge posted successfully to the group!"}), 201
-        return jsonify({"error": "Failed to post badge!"}), 500
+        return jsonify({"message": "Badge posted successfully to the group!"}), 201
 
     except Exception as e:
         print(f"⚠ Error in /api/post-badge: {str(e)}")
         return jsonify({"error": "Internal Server Error"}), 500
 @app.route("/test-read-excel", methods=["GET"])
 def test_read_excel():
+    import pandas as pd
     try:
         file_path = os.path.join(os.getcwd(), "food_database.xlsx") 
         df = pd.read_excel(file_path) 
@@ -1785,6 +2035,30 @@ def test_read_excel():
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)})
 
+def __getattr__(name):
+    # Module-level access to a lazily built resource, e.g. ``app.food_table``.
+    if name in resources:
+        return resources.get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Read-only datasets and models that can be built once in the gunicorn master
+# and shared copy-on-write with the workers (see gunicorn.conf.py).
+SHARED_RESOURCES = ["exercises_df", "exercise_index", "tfidf_matrix", "exercise_engine", "exercise_cooccurrence", "food_table", "meal_composer", "food_search", "barcode_index", "diet_models"]
+
+def preload_shared_resources(names=None):
+    """Build the shared resources in the current (master) process and freeze them for fork."""
+    import gc
+    resources.warm_up(names or SHARED_RESOURCES)
+    food_table = resources.get("food_table")
+    if food_table:
+        food_table.index
+    gc.collect()
+    gc.freeze()
+
+if os.getenv("WARM_UP_RESOURCES"):
+    _warm_up = os.getenv("WARM_UP_RESOURCES")
+    resources.warm_up(None if _warm_up == "all" else _warm_up.split(","), background=True)
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 10000)) 
     app.run(host="0.0.0.0", port=port, debug=True)
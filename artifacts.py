@@ -0,0 +1,79 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+ARTIFACTS_DIR = "artifacts"
+
+
+def file_digest(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def is_published(path):
+    return os.path.exists(os.path.join(path, "meta.json"))
+
+
+def publish_arrays(target, arrays, meta):
+    """Write arrays as .npy files plus meta.json into target, atomically."""
+    def write(tmp_dir):
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), array)
+        return meta
+    return publish_directory(target, write)
+
+
+def publish_directory(target, write):
+    """Publish the files written by write(tmp_dir) as target, atomically.
+
+    write() fills a private directory and returns the meta dict; the
+    directory is then renamed into place, so concurrent workers never see a
+    half-written artifact. If another process published the same target
+    first, its copy wins.
+    """
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    tmp_dir = f"{target}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    try:
+        meta = write(tmp_dir)
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        os.rename(tmp_dir, target)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if not is_published(target):
+            raise
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return target
+
+
+def read_arrays(path, names, mmap_mode="r"):
+    """Open a published artifact; arrays are memory-mapped read-only by default."""
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode) for name in names}
+    return arrays, meta
+
+
+def prune(directory, keep_prefix):
+    """Remove every artifact in directory whose name does not start with keep_prefix.
+
+    Only artifact directories are removed; plain files (such as pointers) stay.
+    """
+    if not os.path.isdir(directory):
+        return []
+    removed = []
+    for name in os.listdir(directory):
+        if not name.startswith(keep_prefix) and os.path.isdir(os.path.join(directory, name)):
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+            removed.append(name)
+    return removed
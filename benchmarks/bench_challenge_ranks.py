@@ -0,0 +1,78 @@
+"""Challenge rank lookups at scale: ChallengeRanks versus scanning the participants.
+
+    python benchmarks/bench_challenge_ranks.py --participants 1000000
+
+Builds one challenge with N participants (integer progress, many ties) and
+reports build time and memory, then latency (mean / p95, microseconds) of
+``standing`` with two neighbours each side, of a progress update, and of
+answering the same rank question by counting over every participant the way
+a query without the structure would.
+"""
+import argparse
+import os
+import random
+import resource
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from challenge_ranks import ChallengeRanks  # noqa: E402
+
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def report(name, latencies):
+    latencies = np.array(latencies) * 1e6
+    print(f"{name:<22} {latencies.mean():>10.2f} {np.percentile(latencies, 95):>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--participants", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--scans", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    entries = [(f"user{i}@example.com", rng.randint(0, 10000)) for i in range(args.participants)]
+    before = rss_mb()
+    start = time.perf_counter()
+    board = ChallengeRanks(entries)
+    print(f"{args.participants} participants: built in {time.perf_counter() - start:.2f}s, "
+          f"+{rss_mb() - before:.0f} MB peak RSS")
+    print(f"{'operation':<22} {'mean us':>10} {'p95 us':>10}")
+
+    emails = [email for email, _ in entries]
+    latencies = []
+    for email in rng.choices(emails, k=args.queries):
+        start = time.perf_counter()
+        board.standing(email)
+        latencies.append(time.perf_counter() - start)
+    report("standing", latencies)
+
+    latencies = []
+    for email in rng.choices(emails, k=args.queries):
+        progress = rng.randint(0, 10000)
+        start = time.perf_counter()
+        board.set(email, progress)
+        latencies.append(time.perf_counter() - start)
+    report("set progress", latencies)
+
+    progress = np.array([p for _, p in entries])
+    latencies = []
+    for _ in range(args.scans):
+        mine = rng.randint(0, 10000)
+        start = time.perf_counter()
+        int((progress > mine).sum()) + 1
+        latencies.append(time.perf_counter() - start)
+    report("scan (numpy count)", latencies)
+
+
+if __name__ == "__main__":
+    main()
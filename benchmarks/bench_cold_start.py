@@ -0,0 +1,75 @@
+"""Cold-start breakdown of a fresh worker: framework imports, ``import app`` and
+the first build of every lazily loaded resource.
+
+    python benchmarks/bench_cold_start.py --runs 5
+    python benchmarks/bench_cold_start.py --resources exercises_df,meal_composer
+
+Each run happens in a new interpreter so nothing is cached in ``sys.modules``.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+CHILD = r"""
+import json, sys, time
+stages = []
+start = time.perf_counter()
+import flask, flask_cors, flask_jwt_extended, flask_bcrypt, flask_mail, pymongo, requests, pyotp, dotenv
+stages.append(["framework imports", time.perf_counter() - start])
+
+mark = time.perf_counter()
+import app
+stages.append(["import app", time.perf_counter() - mark])
+stages.append(["ready to serve", time.perf_counter() - start])
+
+names = sys.argv[1]
+names = app.resources.names() if names == "all" else [n for n in names.split(",") if n]
+for name in names:
+    mark = time.perf_counter()
+    try:
+        app.resources.get(name)
+        stages.append(["build " + name, time.perf_counter() - mark])
+    except Exception as e:
+        stages.append(["build " + name + " (failed: " + type(e).__name__ + ")", time.perf_counter() - mark])
+print("@@" + json.dumps(stages))
+"""
+
+
+def run_once(resources):
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD, resources],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stdout
+    line = next(l for l in out.splitlines() if l.startswith("@@"))
+    return json.loads(line[2:])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--resources", default="exercises_df,exercise_index,food_table,meal_composer,diet_models",
+                        help="comma separated resource names, 'all' or '' for none")
+    args = parser.parse_args()
+
+    samples = {}
+    order = []
+    for _ in range(args.runs):
+        for stage, seconds in run_once(args.resources):
+            if stage not in samples:
+                samples[stage] = []
+                order.append(stage)
+            samples[stage].append(seconds)
+
+    print(f"{'stage':<40} {'median ms':>10} {'min ms':>10}")
+    for stage in order:
+        values = samples[stage]
+        print(f"{stage:<40} {statistics.median(values) * 1000:>10.1f} {min(values) * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Meal composition: random 3-of-5 kNN sampling versus the vectorized MealComposer.
+
+    python benchmarks/bench_meal_composer.py --repeat 200
+
+For every BMI class and a range of daily calorie budgets, builds each meal
+target of a day both ways and reports latency per meal (mean / p95) and the
+macro error of the result: the mean absolute relative error over calories,
+protein, carbs and fat, versus the target from get_macros_by_bmi.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from food_table import FOOD_FILE, TABLE_DIR, load_food_table  # noqa: E402
+from meal_planner import MEAL_SHARES, MealComposer, macro_error, macro_targets  # noqa: E402
+
+BMI_MACROS = {
+    "underweight": {'protein': 0.25, 'carbs': 0.50, 'fat': 0.25},
+    "normal": {'protein': 0.30, 'carbs': 0.45, 'fat': 0.25},
+    "overweight": {'protein': 0.35, 'carbs': 0.40, 'fat': 0.25},
+}
+
+
+def knn_sampling(food_table, rng):
+    """The previous generate_meal: 3 random foods among the 5 nearest raw-macro neighbors."""
+    from sklearn.neighbors import NearestNeighbors
+
+    model = NearestNeighbors(n_neighbors=min(5, len(food_table)), algorithm='ball_tree')
+    model.fit(food_table.macros)
+
+    def meal(target):
+        _, indices = model.kneighbors([target])
+        rows = rng.choice(indices[0], size=min(3, indices.shape[1]), replace=False)
+        return food_table.macros[rows].sum(axis=0)
+    return meal
+
+
+def composer(food_table, rng, budget_ms):
+    meal_composer = MealComposer(food_table, budget_ms=budget_ms)
+
+    def meal(target):
+        options = meal_composer.compose(target)
+        rows, portions, _ = options[rng.integers(len(options))]
+        return (food_table.macros[rows] * portions[:, None]).sum(axis=0)
+    return meal
+
+
+def run(name, meal, targets, repeat):
+    meal(targets[0])
+    latencies, errors = [], []
+    for _ in range(repeat):
+        for target in targets:
+            start = time.perf_counter()
+            totals = meal(target)
+            latencies.append(time.perf_counter() - start)
+            errors.append(macro_error(totals, target))
+    latencies = np.array(latencies) * 1000
+    errors = np.array(errors) * 100
+    print(f"{name:<16} {latencies.mean():>8.2f} {np.percentile(latencies, 95):>8.2f} "
+          f"{errors.mean():>9.1f} {np.percentile(errors, 95):>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", default=os.path.join(ROOT, FOOD_FILE))
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--budget-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    food_table = load_food_table(args.source, os.path.join(ROOT, TABLE_DIR))
+    shares = np.array(sorted({share for _, share in MEAL_SHARES}))
+    targets = np.concatenate([
+        macro_targets(np.outer(np.arange(1600, 3201, 400), shares).ravel(), macros)
+        for macros in BMI_MACROS.values()
+    ])
+    print(f"{len(food_table)} foods, {len(targets)} meal targets x {args.repeat}")
+    print(f"{'strategy':<16} {'mean ms':>8} {'p95 ms':>8} {'err % avg':>9} {'err % p95':>9}")
+
+    rng = np.random.default_rng(0)
+    run("knn 3-of-5", knn_sampling(food_table, rng), targets, args.repeat)
+    run("composer", composer(food_table, rng, args.budget_ms), targets, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
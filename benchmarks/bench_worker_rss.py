@@ -0,0 +1,110 @@
+"""Per-worker memory of the gunicorn deployment with and without preload.
+
+    python benchmarks/bench_worker_rss.py --workers 4
+
+Starts gunicorn twice with gunicorn.conf.py (GUNICORN_PRELOAD=0, then 1),
+waits until every worker has built the shared datasets/models, and reports
+RSS, PSS and private (USS) memory per worker from /proc/<pid>/smaps_rollup.
+PSS/USS are what matter for sharing: RSS counts shared pages in every worker.
+Linux only.
+"""
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def children(pid):
+    found = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            found.append(int(entry))
+    return sorted(found)
+
+
+def memory_kb(pid):
+    usage = {"Rss": 0, "Pss": 0, "Private_Clean": 0, "Private_Dirty": 0}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in usage:
+                usage[key] = int(value.split()[0])
+    return {"rss": usage["Rss"], "pss": usage["Pss"], "uss": usage["Private_Clean"] + usage["Private_Dirty"]}
+
+
+def measure(preload, workers, resources, timeout):
+    env = dict(os.environ)
+    env.update({
+        "GUNICORN_PRELOAD": "1" if preload else "0",
+        "GUNICORN_BIND": f"127.0.0.1:{free_port()}",
+        "WEB_CONCURRENCY": str(workers),
+        "WARM_UP_RESOURCES": resources,
+    })
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.time() + timeout
+        previous = None
+        while time.time() < deadline:
+            time.sleep(1.0)
+            pids = children(proc.pid)
+            if len(pids) < workers:
+                continue
+            sample = {pid: memory_kb(pid)["rss"] for pid in pids}
+            if sample == previous:
+                break
+            previous = sample
+        pids = children(proc.pid)
+        return memory_kb(proc.pid), {pid: memory_kb(pid) for pid in pids}
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+
+
+def report(label, master, workers):
+    print(f"\n{label}")
+    print(f"{'process':<16} {'RSS MB':>9} {'PSS MB':>9} {'USS MB':>9}")
+    print(f"{'master':<16} {master['rss'] / 1024:>9.1f} {master['pss'] / 1024:>9.1f} {master['uss'] / 1024:>9.1f}")
+    for pid, usage in workers.items():
+        print(f"{'worker ' + str(pid):<16} {usage['rss'] / 1024:>9.1f} {usage['pss'] / 1024:>9.1f} {usage['uss'] / 1024:>9.1f}")
+    total_pss = master["pss"] + sum(u["pss"] for u in workers.values())
+    print(f"{'total PSS':<16} {'':>9} {total_pss / 1024:>9.1f}")
+
+
+def main():
+    import app
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--resources", default=",".join(app.SHARED_RESOURCES))
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    for preload in (False, True):
+        master, workers = measure(preload, args.workers, args.resources, args.timeout)
+        report(f"GUNICORN_PRELOAD={int(preload)}", master, workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""In-process challenge rankings: a participant's rank, percentile and neighbours without a scan.
+
+Each challenge's participants are kept ordered by (-progress, email) in a
+``SortedKeys``: a list of sorted buckets of at most 2 * LOAD keys with the
+last key of every bucket alongside, so finding a key is two bisects and
+inserting or removing one shifts at most one bucket. With 1M participants a
+rank lookup takes a few microseconds (benchmarks/bench_challenge_ranks.py).
+
+Ranks are competition ranks: 1 + the number of participants with strictly
+more progress, so ties share a rank. The percentile is the share of
+participants at or below the user's progress (100 for the leader).
+
+Every worker holds its own ``ChallengeRanks``. The request handlers apply
+their writes to it as they make them; writes made by other workers show up
+when a board older than ``refresh_seconds`` is rebuilt from Mongo in the
+background, the current one serving until the new one is swapped in.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left, insort
+from itertools import accumulate
+
+LOAD = 1000
+REFRESH_SECONDS = float(os.getenv("CHALLENGE_RANKS_REFRESH_SECONDS", 300))
+MAX_NEIGHBORS = 10
+
+
+class SortedKeys:
+    """A sorted multiset of comparable keys with positional access."""
+
+    def __init__(self, keys=(), load=LOAD):
+        self._load = load
+        keys = sorted(keys)
+        self._lists = [keys[i:i + load] for i in range(0, len(keys), load)]
+        self._maxes = [bucket[-1] for bucket in self._lists]
+        self._offsets = None
+        self._len = len(keys)
+
+    def __len__(self):
+        return self._len
+
+    def _bucket_offsets(self):
+        if self._offsets is None:
+            self._offsets = [0, *accumulate(len(bucket) for bucket in self._lists)]
+        return self._offsets
+
+    def add(self, key):
+        if not self._lists:
+            self._lists.append([key])
+            self._maxes.append(key)
+        else:
+            i = min(bisect_left(self._maxes, key), len(self._lists) - 1)
+            bucket = self._lists[i]
+            insort(bucket, key)
+            self._maxes[i] = bucket[-1]
+            if len(bucket) > 2 * self._load:
+                self._lists[i:i + 1] = [bucket[:self._load], bucket[self._load:]]
+                self._maxes[i:i + 1] = [bucket[self._load - 1], bucket[-1]]
+        self._len += 1
+        self._offsets = None
+
+    def remove(self, key):
+        i = bisect_left(self._maxes, key)
+        bucket = self._lists[i] if i < len(self._lists) else []
+        j = bisect_left(bucket, key)
+        if j == len(bucket) or bucket[j] != key:
+            raise KeyError(key)
+        del bucket[j]
+        if bucket:
+            self._maxes[i] = bucket[-1]
+        else:
+            del self._lists[i], self._maxes[i]
+        self._len -= 1
+        self._offsets = None
+
+    def index(self, key):
+        """Number of keys less than key."""
+        i = bisect_left(self._maxes, key)
+        if i == len(self._lists):
+            return self._len
+        return self._bucket_offsets()[i] + bisect_left(self._lists[i], key)
+
+    def slice(self, start, stop):
+        """The keys at positions start..stop-1."""
+        start, stop = max(start, 0), min(stop, self._len)
+        if start >= stop:
+            return []
+        offsets = self._bucket_offsets()
+        i = bisect_left(offsets, start + 1) - 1
+        keys, position = [], start - offsets[i]
+        while len(keys) < stop - start:
+            keys.extend(self._lists[i][position:position + stop - start - len(keys)])
+            i, position = i + 1, 0
+        return keys
+
+
+def _progress(value):
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else 0
+
+
+class ChallengeRanks:
+    """The participants of one challenge, ordered by progress."""
+
+    def __init__(self, entries=(), loaded_at=0.0):
+        self._progress = {email: _progress(progress) for email, progress in entries}
+        self._keys = SortedKeys((-progress, email) for email, progress in self._progress.items())
+        self.loaded_at = loaded_at
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, email):
+        return email in self._progress
+
+    def set(self, email, progress):
+        progress = _progress(progress)
+        if email in self._progress:
+            self._keys.remove((-self._progress[email], email))
+        self._progress[email] = progress
+        self._keys.add((-progress, email))
+
+    def remove(self, email):
+        if email in self._progress:
+            self._keys.remove((-self._progress.pop(email), email))
+
+    def rank_of_progress(self, progress):
+        return self._keys.index((-progress,)) + 1
+
+    def standing(self, email, neighbors=2):
+        """{rank, participants, percentile, progress, above, below} for email, or None if not participating.
+
+        above/below are up to ``neighbors`` entries {email, progress, rank}
+        on either side in leaderboard order, nearest first.
+        """
+        progress = self._progress.get(email)
+        if progress is None:
+            return None
+        rank = self.rank_of_progress(progress)
+        position = self._keys.index((-progress, email))
+        participants = len(self._keys)
+
+        def entries(keys):
+            return [{"email": key[1], "progress": -key[0], "rank": self.rank_of_progress(-key[0])} for key in keys]
+
+        return {
+            "rank": rank,
+            "participants": participants,
+            "percentile": round(100 * (participants - rank + 1) / participants, 2),
+            "progress": progress,
+            "above": entries(reversed(self._keys.slice(position - neighbors, position))),
+            "below": entries(self._keys.slice(position + 1, position + 1 + neighbors)),
+        }
+
+
+def _entries(docs):
+    return ((doc["email"], doc.get("progress", 0)) for doc in docs if doc.get("email"))
+
+
+class RankBoards:
+    """One ChallengeRanks per challenge, loaded from user_challenges and kept current.
+
+    ``set``/``remove`` apply a write to the loaded board of that challenge
+    (boards not loaded yet will read it from Mongo). A board older than
+    ``refresh_seconds`` is rebuilt in a background thread on its next read;
+    writes made meanwhile are replayed onto the new board before it
+    replaces the old one.
+    """
+
+    def __init__(self, user_challenges_collection, refresh_seconds=REFRESH_SECONDS, clock=time.monotonic):
+        self.collection = user_challenges_collection
+        self.refresh_seconds = refresh_seconds
+        self.clock = clock
+        self._boards = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def _load(self, challenge_name):
+        docs = self.collection.find({"challenge_name": challenge_name}, {"_id": 0, "email": 1, "progress": 1})
+        return ChallengeRanks(_entries(docs), self.clock())
+
+    def load_all(self):
+        """Rebuild every challenge's board with one unsorted pass over user_challenges."""
+        loaded_at = self.clock()
+        entries = {}
+        for doc in self.collection.find({}, {"_id": 0, "challenge_name": 1, "email": 1, "progress": 1}):
+            entries.setdefault(doc.get("challenge_name"), []).append(doc)
+        boards = {name: ChallengeRanks(_entries(docs), loaded_at) for name, docs in entries.items()}
+        with self._lock:
+            self._boards = boards
+        return len(boards)
+
+    def get(self, challenge_name):
+        board = self._boards.get(challenge_name)
+        if board is None:
+            board = self._load(challenge_name)
+            if not len(board):
+                # Nobody joined, or no such challenge: any name can be requested,
+                # so only boards with participants are kept.
+                return board
+            with self._lock:
+                board = self._boards.setdefault(challenge_name, board)
+        elif self.clock() - board.loaded_at >= self.refresh_seconds:
+            self.refresh(challenge_name, background=True)
+        return board
+
+    def refresh(self, challenge_name, background=False):
+        with self._lock:
+            if challenge_name in self._pending:
+                return None
+            self._pending[challenge_name] = []
+
+        def run():
+            try:
+                board = self._load(challenge_name)
+            except Exception as e:
+                print(f"⚠ Rebuilding the '{challenge_name}' ranking failed: {e}")
+                with self._lock:
+                    self._pending.pop(challenge_name, None)
+                return
+            with self._lock:
+                for op, args in self._pending.pop(challenge_name):
+                    getattr(board, op)(*args)
+                self._boards[challenge_name] = board
+
+        if background:
+            thread = threading.Thread(target=run, name=f"challenge-ranks-{challenge_name}", daemon=True)
+            thread.start()
+            return thread
+        run()
+        return None
+
+    def _apply(self, challenge_name, op, *args):
+        with self._lock:
+            board = self._boards.get(challenge_name)
+            if board is not None:
+                getattr(board, op)(*args)
+            if challenge_name in self._pending:
+                self._pending[challenge_name].append((op, args))
+
+    def set(self, challenge_name, email, progress):
+        self._apply(challenge_name, "set", email, progress)
+
+    def remove(self, challenge_name, email):
+        self._apply(challenge_name, "remove", email)
+
+    def standing(self, challenge_name, email, neighbors=2):
+        board = self.get(challenge_name)
+        with self._lock:
+            return board.standing(email, neighbors)
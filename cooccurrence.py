@@ -0,0 +1,264 @@
+"""Item-item co-occurrence of exercises across all users' workout histories.
+
+A session is the set of distinct exercises one user logged on one UTC day
+(legacy history entries without a timestamp form one session per user).
+Counts are accumulated as a sparse matrix over exercise index rows: C[i, j]
+is the number of sessions containing both i and j, and C[i, i] the number of
+sessions containing i.
+
+    python cooccurrence.py            # incremental: only sessions since the last build
+    python cooccurrence.py --full     # recount every profile
+
+Only completed days are counted, so each build's watermark is the start of
+the current UTC day and the next incremental run adds the days since then.
+Builds are tied to the exercise index version; a new catalog needs --full.
+Every build rewrites ``<index version>.latest``, the file naming the newest
+build, which the app watches through a ModelRegistry to pick up new builds
+without a restart.
+"""
+import argparse
+import os
+from datetime import datetime, time as dtime
+
+import numpy as np
+from scipy import sparse
+
+from artifacts import ARTIFACTS_DIR, is_published, prune, publish_arrays, read_arrays
+
+COOCCURRENCE_DIR = os.path.join(ARTIFACTS_DIR, "exercise_cooccurrence")
+BATCH_SIZE = 1000
+FLUSH_PAIRS = 1 << 22
+
+_ARRAYS = ("indptr", "indices", "data")
+
+
+def history_sessions(history, row_for_id, since=None, until=None):
+    """Split a workout_history into sessions of distinct exercise rows.
+
+    Only entries logged in [since, until) are used; untimestamped entries are
+    only used by full builds (since=None).
+    """
+    sessions = {}
+    for entry in history or ():
+        if not isinstance(entry, dict):
+            continue
+        row = row_for_id(entry.get("exerciseId"))
+        if row is None:
+            continue
+        logged_at = entry.get("timestamp")
+        if isinstance(logged_at, datetime):
+            if (since is not None and logged_at < since) or (until is not None and logged_at >= until):
+                continue
+            key = logged_at.date()
+        elif since is None:
+            key = None
+        else:
+            continue
+        sessions.setdefault(key, set()).add(row)
+    return [sorted(rows) for rows in sessions.values()]
+
+
+class CooccurrenceCounter:
+    """Accumulates session pair counts in bounded memory.
+
+    Sessions are buffered as one flat list of rows plus session lengths, and
+    every ``flush_pairs`` pairs they are expanded into (row, col) pairs with
+    NumPy and folded into a CSR matrix. Memory depends on the number of
+    distinct pairs, not on the number of history rows.
+    """
+
+    def __init__(self, n_items, flush_pairs=FLUSH_PAIRS):
+        self.n_items = n_items
+        self.flush_pairs = flush_pairs
+        self.counts = sparse.csr_matrix((n_items, n_items), dtype=np.int64)
+        self.sessions = 0
+        self._rows, self._lengths, self._pending = [], [], 0
+
+    def add_session(self, rows):
+        """Add one session of distinct rows."""
+        if not rows:
+            return
+        self._rows.extend(rows)
+        self._lengths.append(len(rows))
+        self._pending += len(rows) * len(rows)
+        self.sessions += 1
+        if self._pending >= self.flush_pairs:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        flat = np.asarray(self._rows, dtype=np.int32)
+        lengths = np.asarray(self._lengths, dtype=np.int64)
+        starts = np.cumsum(lengths) - lengths
+
+        # Every element pairs with each element of its own session (itself included).
+        per_element = np.repeat(lengths, lengths)
+        element_start = np.repeat(starts, lengths)
+        rows = np.repeat(flat, per_element)
+        offsets = np.arange(len(rows)) - np.repeat(np.cumsum(per_element) - per_element, per_element)
+        cols = flat[np.repeat(element_start, per_element) + offsets]
+
+        batch = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int64), (rows, cols)), shape=(self.n_items, self.n_items)
+        )
+        self.counts = self.counts + batch
+        self._rows, self._lengths, self._pending = [], [], 0
+
+    def matrix(self):
+        self._flush()
+        return self.counts
+
+
+class Cooccurrence:
+    """Read-only co-occurrence counts with cosine-normalised scoring."""
+
+    def __init__(self, counts, meta):
+        self.counts = counts
+        self.meta = meta
+        item_counts = counts.diagonal().astype(np.float64)
+        scale = sparse.diags(np.divide(1.0, np.sqrt(item_counts), out=np.zeros_like(item_counts),
+                                       where=item_counts > 0))
+        similarity = (scale @ counts @ scale).tocsr()
+        similarity.setdiag(0)
+        similarity.eliminate_zeros()
+        self.similarity = similarity
+
+    def __len__(self):
+        return self.counts.shape[0]
+
+    def scores(self, rows, weights=None):
+        """Co-occurrence score of every exercise against the given (weighted) history rows."""
+        rows = np.asarray(rows, dtype=np.int64)
+        weights = np.ones(len(rows)) if weights is None else np.asarray(weights, dtype=np.float64)
+        history = np.bincount(rows, weights=weights, minlength=len(self))
+        return np.asarray(self.similarity.T @ history).ravel()
+
+
+def stream_profiles(profiles_collection, since=None, until=None, batch_size=BATCH_SIZE):
+    """Cursor over the workout histories of every profile with sessions in [since, until)."""
+    query = {"workout_history.0": {"$exists": True}}
+    if since is not None:
+        query = {"workout_history": {"$elemMatch": {"timestamp": {"$gte": since, "$lt": until}}}}
+    cursor = profiles_collection.find(query, {"_id": 0, "workout_history": 1})
+    return cursor.batch_size(batch_size)
+
+
+def count_sessions(profiles, row_for_id, n_items, since=None, until=None, flush_pairs=FLUSH_PAIRS):
+    counter = CooccurrenceCounter(n_items, flush_pairs)
+    n_profiles = 0
+    for profile in profiles:
+        n_profiles += 1
+        for rows in history_sessions(profile.get("workout_history"), row_for_id, since, until):
+            counter.add_session(rows)
+    return counter.matrix(), {"profiles": n_profiles, "sessions": counter.sessions}
+
+
+def _artifact_name(index_version, watermark, built_at):
+    return f"{index_version}-{watermark:%Y%m%d}-{built_at:%Y%m%d%H%M%S}"
+
+
+def open_cooccurrence(path):
+    arrays, meta = read_arrays(path, _ARRAYS, mmap_mode=None)
+    counts = sparse.csr_matrix((arrays["data"], arrays["indices"], arrays["indptr"]),
+                               shape=(meta["rows"], meta["rows"]))
+    return Cooccurrence(counts, meta)
+
+
+def latest_path(index_version, out_dir=COOCCURRENCE_DIR):
+    if not os.path.isdir(out_dir):
+        return None
+    names = sorted(name for name in os.listdir(out_dir)
+                   if name.startswith(f"{index_version}-") and is_published(os.path.join(out_dir, name)))
+    return os.path.join(out_dir, names[-1]) if names else None
+
+
+def latest_pointer(index_version, out_dir=COOCCURRENCE_DIR):
+    return os.path.join(out_dir, f"{index_version}.latest")
+
+
+def point_latest(index_version, path):
+    """Atomically make the index version's latest pointer name the build at path."""
+    pointer = latest_pointer(index_version, os.path.dirname(path))
+    tmp = f"{pointer}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(os.path.basename(path))
+    os.replace(tmp, pointer)
+    return pointer
+
+
+def open_latest(pointer):
+    """Open the build a latest pointer names (the ModelRegistry loader)."""
+    with open(pointer) as f:
+        name = f.read().strip()
+    return open_cooccurrence(os.path.join(os.path.dirname(pointer), name))
+
+
+def load_cooccurrence(index_version, out_dir=COOCCURRENCE_DIR):
+    """Latest build for the exercise index version, or None if there is none yet."""
+    path = latest_path(index_version, out_dir)
+    return open_cooccurrence(path) if path else None
+
+
+def build_cooccurrence(profiles_collection, row_for_id, n_items, index_version,
+                       out_dir=COOCCURRENCE_DIR, full=False, until=None):
+    """Count sessions up to ``until`` (default: start of today, UTC) and publish the result.
+
+    Unless ``full`` is set, the previous build for this index version is
+    extended with the sessions logged since its watermark.
+    """
+    until = until or datetime.combine(datetime.utcnow().date(), dtime.min)
+    base = None if full else load_cooccurrence(index_version, out_dir)
+    since = datetime.fromisoformat(base.meta["watermark"]) if base else None
+    if since is not None and since >= until:
+        path = latest_path(index_version, out_dir)
+        point_latest(index_version, path)
+        return path
+
+    counts, stats = count_sessions(stream_profiles(profiles_collection, since, until), row_for_id, n_items, since, until)
+    if base is not None:
+        counts = counts + base.counts
+        stats["sessions"] += base.meta.get("sessions", 0)
+
+    counts = counts.tocsr()
+    counts.sort_indices()
+    built_at = datetime.utcnow()
+    meta = {
+        "index_version": index_version,
+        "rows": n_items,
+        "watermark": until.isoformat(),
+        "incremental_from": since.isoformat() if since else None,
+        "built_at": built_at.isoformat(),
+        "pairs": int(counts.nnz),
+        **stats,
+    }
+    target = os.path.join(out_dir, _artifact_name(index_version, until, built_at))
+    arrays = {
+        "indptr": counts.indptr.astype(np.int64),
+        "indices": counts.indices.astype(np.int32),
+        "data": counts.data.astype(np.int64),
+    }
+    path = publish_arrays(target, arrays, meta)
+    point_latest(index_version, path)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the exercise co-occurrence matrix from workout histories")
+    parser.add_argument("--out", default=COOCCURRENCE_DIR)
+    parser.add_argument("--full", action="store_true", help="recount all profiles instead of only new sessions")
+    parser.add_argument("--prune", action="store_true", help="keep only the newest build")
+    args = parser.parse_args()
+
+    from app import profiles_collection, resources
+
+    engine = resources.get("exercise_engine")
+    started = datetime.utcnow()
+    path = build_cooccurrence(profiles_collection, engine.row_for_id, len(engine), engine.version,
+                              args.out, full=args.full)
+    built = open_cooccurrence(path)
+    elapsed = (datetime.utcnow() - started).total_seconds()
+    print(f"✅ Co-occurrence ready at {path}: {built.meta['sessions']} sessions, "
+          f"{built.meta['pairs']} pairs in {elapsed:.1f}s")
+    if args.prune:
+        print(f"🧹 Removed old builds: {prune(args.out, os.path.basename(path))}")
@@ -0,0 +1,260 @@
+"""MongoDB access: one lazily created client per process, and the queries the app runs.
+
+No connection is made at import. The client is created on first use and
+remembered per process id, and a fork() discards the parent's client in the
+child, so gunicorn workers forked from a preloading master each open their
+own pool (PyMongo clients must not be shared across fork()).
+
+Connection settings come from the environment:
+
+    MONGO_URI                            connection string
+    MONGO_DB_NAME                        database (HealthFitnessApp)
+    MONGO_MAX_POOL_SIZE                  connections per worker (20)
+    MONGO_MIN_POOL_SIZE                  idle connections kept open (0)
+    MONGO_SERVER_SELECTION_TIMEOUT_MS    fail fast when Mongo is unreachable (5000)
+    MONGO_CONNECT_TIMEOUT_MS             (5000)
+    MONGO_SOCKET_TIMEOUT_MS              per-operation socket timeout (20000)
+    MONGO_WAIT_QUEUE_TIMEOUT_MS          wait for a free pooled connection (5000)
+
+Collections are exposed as ``LazyCollection`` handles that resolve against
+the current process's client on every call. Reads the app performs in
+several places are functions below, each with the projection its callers
+need instead of whole documents.
+"""
+import os
+import threading
+
+from pymongo import MongoClient, ReturnDocument
+
+DEFAULT_DB_NAME = "HealthFitnessApp"
+
+_SETTINGS = {
+    "maxPoolSize": ("MONGO_MAX_POOL_SIZE", 20),
+    "minPoolSize": ("MONGO_MIN_POOL_SIZE", 0),
+    "serverSelectionTimeoutMS": ("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000),
+    "connectTimeoutMS": ("MONGO_CONNECT_TIMEOUT_MS", 5000),
+    "socketTimeoutMS": ("MONGO_SOCKET_TIMEOUT_MS", 20000),
+    "waitQueueTimeoutMS": ("MONGO_WAIT_QUEUE_TIMEOUT_MS", 5000),
+}
+
+_lock = threading.Lock()
+_client = None
+_client_pid = None
+
+
+def client_settings(environ=os.environ):
+    """MongoClient keyword arguments from the environment."""
+    return {option: int(environ.get(variable, default)) for option, (variable, default) in _SETTINGS.items()}
+
+
+def get_client():
+    """This process's MongoClient, created on first use (and again after a fork)."""
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _lock:
+            if _client is None or _client_pid != pid:
+                _client = MongoClient(os.getenv("MONGO_URI"), connect=False, **client_settings())
+                _client_pid = pid
+    return _client
+
+
+def get_database():
+    return get_client()[os.getenv("MONGO_DB_NAME", DEFAULT_DB_NAME)]
+
+
+def close_client():
+    global _client, _client_pid
+    with _lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client, _client_pid = None, None
+
+
+def _forget_client():
+    # The parent owns the inherited client's sockets; the child just drops it.
+    global _client, _client_pid
+    _client, _client_pid = None, None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_client)
+
+
+class LazyCollection:
+    """A collection handle that binds to the current process's client on each use.
+
+    Attribute lookups fall through to the real pymongo Collection, so the
+    handle is used like one. Attributes set on the handle itself (as
+    unittest.mock.patch does) take precedence.
+    """
+
+    def __init__(self, name):
+        self.__dict__["name"] = name
+
+    def resolve(self):
+        return get_database()[self.name]
+
+    def __getattr__(self, attr):
+        return getattr(self.resolve(), attr)
+
+    def __repr__(self):
+        return f"LazyCollection({self.name!r})"
+
+
+class LazyDatabase:
+    """The database handle, bound to the current process's client on each use."""
+
+    def __getattr__(self, attr):
+        return getattr(get_database(), attr)
+
+    def __getitem__(self, name):
+        return get_database()[name]
+
+
+db = LazyDatabase()
+
+users = LazyCollection("users")
+profiles = LazyCollection("profiles")
+sleep = LazyCollection("sleep")
+steps = LazyCollection("steps")
+meals = LazyCollection("meals")
+nutrition_daily = LazyCollection("nutrition_daily")
+nutrition_totals = LazyCollection("nutrition_totals")
+achievements = LazyCollection("achievements")
+badges = LazyCollection("badges")
+progress = LazyCollection("progress")
+groups = LazyCollection("groups")
+group_posts = LazyCollection("group_posts")
+challenges = LazyCollection("challenges")
+user_challenges = LazyCollection("user_challenges")
+notifications = LazyCollection("notifications")
+
+
+# users
+
+USER_EXISTS = {"_id": 1}
+USER_CREDENTIALS = {"_id": 0, "email": 1, "password": 1}
+USER_OTP = {"_id": 0, "otp": 1, "otp_expiry": 1, "otp_verified": 1}
+
+
+def find_user(email, projection=USER_CREDENTIALS):
+    return users.find_one({"email": email}, projection)
+
+
+def user_exists(email):
+    return find_user(email, USER_EXISTS) is not None
+
+
+# profiles
+
+# taste is the recommender's internal state (see get_taste_vector), not part of the profile.
+PROFILE_PUBLIC = {"_id": 0, "taste": 0}
+PROFILE_REQUIRED_FIELDS = ("name", "age", "gender", "height", "weight")
+# What the workout recommender reads; workout_history is the bulk of a profile.
+PROFILE_WORKOUT_FIELDS = {"_id": 0, "bmi": 1, "preferred_body_part": 1, "equipment": 1,
+                          "workout_history": 1, "taste": 1}
+
+
+def find_profile(email, projection=PROFILE_PUBLIC):
+    return profiles.find_one({"email": email}, projection)
+
+
+def profile_complete(email):
+    """True if the profile has every field store_profile requires."""
+    profile = find_profile(email, {"_id": 0, **{field: 1 for field in PROFILE_REQUIRED_FIELDS}})
+    return bool(profile and all(profile.get(field) for field in PROFILE_REQUIRED_FIELDS))
+
+
+# groups
+
+GROUP_MEMBERS = {"_id": 0, "name": 1, "members": 1}
+
+
+def find_group(name, projection=GROUP_MEMBERS):
+    """The group's name and members by default (posts live in group_posts)."""
+    return groups.find_one({"name": name}, projection)
+
+
+# challenges
+
+CHALLENGE_FIELDS = {"_id": 0, "name": 1, "target": 1, "unit": 1}
+USER_CHALLENGE_FIELDS = {"_id": 0, "progress": 1, "completed": 1, "target": 1}
+
+
+def find_challenge(name, projection=CHALLENGE_FIELDS):
+    return challenges.find_one({"name": name}, projection)
+
+
+def find_user_challenge(email, challenge_name, projection=USER_CHALLENGE_FIELDS):
+    return user_challenges.find_one({"email": email, "challenge_name": challenge_name}, projection)
+
+
+def add_challenge_progress(email, challenge_name, delta, target):
+    """Atomically add delta to a joined challenge's progress and recompute completed.
+
+    Returns (progress, newly_completed), or None if the user has not joined.
+    The document before the update is returned, so exactly one of several
+    concurrent updates sees completed flip from false to true.
+    """
+    before = user_challenges.find_one_and_update(
+        {"email": email, "challenge_name": challenge_name},
+        [
+            {"$set": {"progress": {"$add": [{"$ifNull": ["$progress", 0]}, delta]}}},
+            {"$set": {"completed": {"$gte": ["$progress", target]}}},
+        ],
+        projection={"_id": 0, "progress": 1, "completed": 1},
+        return_document=ReturnDocument.BEFORE,
+    )
+    if before is None:
+        return None
+    progress = (before.get("progress") or 0) + delta
+    return progress, progress >= target and not before.get("completed")
+
+
+# steps
+
+def steps_on(email, date):
+    """Steps logged on a "YYYY-MM-DD" day, 0 if none."""
+    entry = steps.find_one({"email": email, "date": date}, {"_id": 0, "steps": 1})
+    return entry["steps"] if entry else 0
+
+
+# progress
+
+PROGRESS_FIELDS = {"_id": 0, "completed_days": 1, "badge": 1}
+
+
+def find_progress(user, projection=PROGRESS_FIELDS):
+    return progress.find_one({"user": user}, projection)
+
+
+def record_workout_day(user, badges):
+    """Atomically count one more workout day; returns (completed_days, badge, days).
+
+    badges maps a day count to the badge earned on reaching it. Reaching the
+    highest count starts the cycle again at 0. The count, the badge and the
+    reset are all computed by the server in one update, so concurrent calls
+    each get their own day and every badge is earned exactly once per cycle.
+    days is the count reached by this call, before any reset.
+    """
+    cycle = max(badges)
+    doc = progress.find_one_and_update(
+        {"user": user},
+        [
+            {"$set": {"completed_days": {"$add": [{"$ifNull": ["$completed_days", 0]}, 1]}}},
+            {"$set": {
+                "badge": {"$switch": {
+                    "branches": [{"case": {"$eq": ["$completed_days", days]}, "then": badge}
+                                 for days, badge in sorted(badges.items())],
+                    "default": None,
+                }},
+                "completed_days": {"$cond": [{"$gte": ["$completed_days", cycle]}, 0, "$completed_days"]},
+            }},
+        ],
+        projection=PROGRESS_FIELDS,
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    # The count only reads 0 after this call completed a cycle.
+    return doc["completed_days"], doc.get("badge"), doc["completed_days"] or cycle
@@ -0,0 +1,162 @@
+"""Diet cluster lookup from exported KMeans centroids, without sklearn.
+
+Training exports the centroids of the fitted model into an .npz file (no
+pickle). Serving needs the cluster of [bmi, *DEFAULT_HABITS] only, and with
+the habit features fixed each centroid's distance is linear in BMI, so the
+cluster is a step function of BMI. The export precomputes that function's cut
+points with the model's own predict, so the table agrees with
+KMeans.predict down to the last float, and serving answers with one bisect.
+Anything else goes through ``predict``, a NumPy nearest-centroid search with
+the same distance as KMeans (||c||^2 - 2 x.c, first minimum wins); it can
+only differ within rounding error of a cluster boundary.
+
+The exported tables are verified against KMeans.predict before the artifact
+is written.
+"""
+from bisect import bisect_right
+
+import numpy as np
+
+DEFAULT_HABITS = (3, 4, 2, 2)
+BMI_RANGE = (0.0, 200.0)  # must not be negative, see _boundary_bits
+FLICKER_ULPS = 64
+VERIFY_STEP = 0.001
+
+
+def nearest_centroid(X, centroids):
+    X = np.asarray(X, dtype=np.float64)
+    # An explicit sum rather than X @ C.T: BLAS rounds one row and a batch differently.
+    dots = (X[:, None, :] * centroids[None, :, :]).sum(axis=2)
+    return np.argmin(np.einsum("ij,ij->i", centroids, centroids)[None, :] - 2 * dots, axis=1)
+
+
+def bmi_cut_points(centroids, habits=DEFAULT_HABITS, bmi_range=BMI_RANGE, predict=None):
+    """(cuts, labels): the cluster of a BMI b in bmi_range is labels[bisect_right(cuts, b)].
+
+    Candidate cuts are the pairwise intersections of the per-centroid score
+    lines. Each actual boundary is located by bisection on ``predict``
+    (nearest_centroid by default). Within rounding error of a boundary the
+    label can flip back and forth between adjacent floats, so every float in
+    a window around it is labelled and each flip becomes a cut.
+    """
+    habits = np.asarray(habits, dtype=np.float64)
+    predict = predict or (lambda X: nearest_centroid(X, centroids))
+
+    def labels_of(bmis):
+        bmis = np.asarray(bmis, dtype=np.float64)
+        return np.asarray(predict(np.column_stack([bmis, np.tile(habits, (len(bmis), 1))])))
+
+    offsets = np.einsum("ij,ij->i", centroids, centroids) - 2 * centroids[:, 1:] @ habits
+    slopes = -2 * centroids[:, 0]
+    lo, hi = bmi_range
+    candidates = {lo, hi}
+    for i in range(len(centroids)):
+        for j in range(i + 1, len(centroids)):
+            if slopes[i] != slopes[j]:
+                b = (offsets[j] - offsets[i]) / (slopes[i] - slopes[j])
+                if lo < b < hi:
+                    candidates.add(float(b))
+    points = sorted(candidates)
+    # Sample each segment's midpoint too: a candidate can sit past a boundary by a few ulps.
+    samples = sorted(set(points) | {left + (right - left) / 2 for left, right in zip(points, points[1:])})
+    sample_labels = labels_of(samples).tolist()
+
+    cuts, labels = [], [sample_labels[0]]
+    for below, above, label in zip(samples, samples[1:], sample_labels[1:]):
+        if label == labels[-1]:
+            continue
+        boundary = _boundary_bits(labels_of, below, above, labels[-1])
+        window = np.arange(max(boundary - FLICKER_ULPS, 0), boundary + FLICKER_ULPS + 1, dtype=np.int64)
+        bmis = window.view(np.float64)
+        for bmi, window_label in zip(bmis.tolist(), labels_of(bmis).tolist()):
+            if window_label != labels[-1]:
+                cuts.append(bmi)
+                labels.append(window_label)
+        if labels[-1] != label:
+            raise ValueError(f"BMI cluster boundary near {bmis[FLICKER_ULPS]} is not monotone")
+    return np.array(cuts, dtype=np.float64), np.array(labels, dtype=np.int64)
+
+
+def _boundary_bits(labels_of, below, above, previous):
+    """Bit pattern of a float in (below, above] where the label first differs from previous.
+
+    Non-negative floats order like their bit patterns, so this bisects over
+    the integers between the two.
+    """
+    lo, hi = np.float64(below).view(np.int64), np.float64(above).view(np.int64)
+    while hi - lo > 1:
+        mid = lo + (hi - lo) // 2
+        if labels_of([mid.view(np.float64)])[0] == previous:
+            lo = mid
+        else:
+            hi = mid
+    return int(hi)
+
+
+def export(model, habits=DEFAULT_HABITS, bmi_range=BMI_RANGE):
+    """Arrays to save for a fitted KMeans, after checking them against model.predict."""
+    centroids = np.ascontiguousarray(model.cluster_centers_, dtype=np.float64)
+    cuts, labels = bmi_cut_points(centroids, habits, bmi_range, model.predict)
+    tables = {"centroids": centroids, "bmi_cuts": cuts, "bmi_labels": labels,
+              "habits": np.asarray(habits, dtype=np.float64), "bmi_range": np.asarray(bmi_range, dtype=np.float64)}
+    verify(CentroidModel(**tables), model)
+    return tables
+
+
+def _habit_rows(bmis, habits):
+    return np.column_stack([bmis, np.tile(habits, (len(bmis), 1))])
+
+
+def verify(centroid_model, model, step=VERIFY_STEP):
+    """Raise ValueError unless the lookups agree with model.predict.
+
+    The cut table is checked on a BMI grid plus every float near each cut;
+    the centroid search on the grid.
+    """
+    lo, hi = centroid_model.bmi_range
+    grid = np.arange(lo, hi, step)
+    if not np.array_equal(centroid_model.predict(_habit_rows(grid, centroid_model.habits)),
+                          model.predict(_habit_rows(grid, centroid_model.habits))):
+        raise ValueError("nearest-centroid lookup disagrees with KMeans.predict")
+
+    near_cuts = centroid_model.bmi_cuts.view(np.int64)[:, None] + np.arange(-2 * FLICKER_ULPS, 2 * FLICKER_ULPS + 1)
+    bmis = np.concatenate([grid, near_cuts.ravel().view(np.float64)])
+    expected = model.predict(_habit_rows(bmis, centroid_model.habits))
+    if not np.array_equal([centroid_model.cluster_for_bmi(b) for b in bmis.tolist()], expected):
+        raise ValueError("BMI cut table disagrees with KMeans.predict")
+
+
+class CentroidModel:
+    """The served diet model: exported centroids plus the BMI cut table."""
+
+    def __init__(self, centroids, bmi_cuts, bmi_labels, habits, bmi_range):
+        self.centroids = np.asarray(centroids, dtype=np.float64)
+        self.habits = np.asarray(habits, dtype=np.float64)
+        self.bmi_range = tuple(np.asarray(bmi_range, dtype=np.float64).tolist())
+        self.bmi_cuts = np.asarray(bmi_cuts, dtype=np.float64)
+        self._cuts = self.bmi_cuts.tolist()
+        self._labels = np.asarray(bmi_labels, dtype=np.int64).tolist()
+
+    @property
+    def n_clusters(self):
+        return len(self.centroids)
+
+    def predict(self, X):
+        return nearest_centroid(X, self.centroids)
+
+    def cluster_for_bmi(self, bmi):
+        """Cluster of [bmi, *habits]: a bisect inside bmi_range, a centroid search outside it."""
+        lo, hi = self.bmi_range
+        if lo <= bmi < hi:
+            return self._labels[bisect_right(self._cuts, bmi)]
+        return int(self.predict([[bmi, *self.habits]])[0])
+
+
+def save(path, tables):
+    with open(path, "wb") as f:
+        np.savez(f, **tables)
+
+
+def load(path):
+    with np.load(path, allow_pickle=False) as tables:
+        return CentroidModel(**{name: tables[name] for name in tables.files})
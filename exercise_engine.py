@@ -0,0 +1,137 @@
+import numpy as np
+
+TASTE_HALF_LIFE_DAYS = 14.0
+
+
+class ExerciseEngine:
+    """Exercise catalog with facet masks precomputed at load time.
+
+    Every facet used to filter workouts (intensity, body part, equipment and
+    the arm/leg split) is a boolean array over catalog rows, so a request
+    builds its candidate set by AND-ing a few masks instead of scanning the
+    DataFrame. ``records`` holds the JSON-ready dict of every row, and
+    ``row_by_id`` maps exercise ids to rows.
+    """
+
+    def __init__(self, df, index=None, gif_url=None):
+        import pandas as pd
+
+        self.df = df
+        self.index = index
+        n = len(df)
+        body_part = df['bodyPart'].fillna('')
+        equipment = df['equipment'].fillna('')
+
+        self.all = np.ones(n, dtype=bool)
+        self.none = np.zeros(n, dtype=bool)
+        advanced = df['name'].str.contains('advanced|pro', case=False, na=False).to_numpy()
+        low_impact = equipment.str.contains('body weight|resistance band', case=False).to_numpy()
+        self.intensity_masks = {
+            'beginner': ~advanced,
+            'intermediate': self.all,
+            'advanced': self.all,
+            'low-impact': low_impact,
+        }
+        self.body_part_masks = _value_masks(body_part)
+        self.equipment_masks = _value_masks(equipment)
+        self.arm = body_part.str.lower().str.contains("arm").to_numpy()
+        self.leg = body_part.str.lower().str.contains("leg").to_numpy()
+
+        for mask in (self.all, self.none, self.arm, self.leg, *self.intensity_masks.values(),
+                     *self.body_part_masks.values(), *self.equipment_masks.values()):
+            mask.flags.writeable = False
+
+        records = df
+        if gif_url is not None:
+            records = df.assign(gifUrl=df['id'].apply(gif_url))
+        self.records = records.replace({pd.NA: None}).to_dict('records')
+        self.row_by_id = {int(ex_id): row for row, ex_id in enumerate(df['id'].tolist())}
+
+    def __len__(self):
+        return len(self.records)
+
+    def row_for_id(self, ex_id):
+        try:
+            return self.row_by_id.get(int(ex_id))
+        except (TypeError, ValueError):
+            return None
+
+    def rows_for_ids(self, ids):
+        rows = (self.row_for_id(ex_id) for ex_id in ids)
+        return np.fromiter((row for row in rows if row is not None), dtype=np.int64)
+
+    @property
+    def version(self):
+        """Identifies the TF-IDF feature space; taste vectors are only valid within one version."""
+        return self.index.meta.get("sha256", "")[:16] if self.index is not None else ""
+
+    def taste_vector(self, rows, ages_days=None, half_life_days=TASTE_HALF_LIFE_DAYS):
+        """Recency-weighted sum of the TF-IDF rows of the exercises a user has done."""
+        rows = np.asarray(rows, dtype=np.int64)
+        weights = np.ones(len(rows))
+        if ages_days is not None:
+            weights = 0.5 ** (np.maximum(np.asarray(ages_days, dtype=float), 0) / half_life_days)
+        return np.asarray(self.index.tfidf_matrix[rows].T @ weights, dtype=np.float64).ravel()
+
+    def update_taste(self, vector, row, elapsed_days=0.0, half_life_days=TASTE_HALF_LIFE_DAYS):
+        """Decay vector by the time since its last update and add one logged exercise."""
+        decayed = np.asarray(vector, dtype=np.float64) * 0.5 ** (max(elapsed_days, 0.0) / half_life_days)
+        start, stop = self.index.tfidf_matrix.indptr[row], self.index.tfidf_matrix.indptr[row + 1]
+        decayed[self.index.tfidf_matrix.indices[start:stop]] += self.index.tfidf_matrix.data[start:stop]
+        return decayed
+
+    def recommend(self, vector, k=10, exclude=None, mask=None, boost=None):
+        """Top-k exercises for a taste vector, scored with one sparse matrix-vector product.
+
+        ``boost`` is an optional per-row score added before ranking (e.g. the
+        co-occurrence signal).
+        """
+        scores = self.index.tfidf_matrix @ np.asarray(vector, dtype=np.float64)
+        if boost is not None:
+            scores += boost
+        if exclude is not None and len(exclude):
+            scores[np.asarray(exclude, dtype=np.int64)] = -np.inf
+        if mask is not None:
+            scores[~mask] = -np.inf
+        top, top_scores = top_k(scores, k)
+        keep = top_scores > 0
+        return top[keep], top_scores[keep]
+
+    def body_part_mask(self, body_part):
+        if body_part == "all":
+            return self.all
+        return self.body_part_masks.get(body_part, self.none)
+
+    def equipment_mask(self, equipment):
+        if isinstance(equipment, str):
+            equipment = [equipment]
+        masks = [self.equipment_masks[e] for e in equipment if e in self.equipment_masks]
+        if not masks:
+            return self.none
+        return np.logical_or.reduce(masks) if len(masks) > 1 else masks[0]
+
+    def candidates(self, intensity, body_part="all", equipment=("body weight",)):
+        """Mask of exercises matching the intensity level, body part and available equipment."""
+        mask = self.intensity_masks.get(intensity, self.all) & self.body_part_mask(body_part)
+        mask &= self.equipment_mask(equipment)
+        return mask
+
+
+def _value_masks(column):
+    codes, values = column.factorize()
+    return {value: codes == code for code, value in enumerate(values)}
+
+
+def top_k(scores, k):
+    """Indices and values of the k largest scores along the last axis, best first.
+
+    Uses argpartition, so only the k winners are sorted: O(n + k log k) per row.
+    """
+    k = min(k, scores.shape[-1])
+    if k <= 0:
+        shape = scores.shape[:-1] + (0,)
+        return np.empty(shape, dtype=np.int64), np.empty(shape, dtype=scores.dtype)
+    top = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    top_scores = np.take_along_axis(scores, top, axis=-1)
+    order = np.argsort(-top_scores, axis=-1, kind="stable")
+    return np.take_along_axis(top, order, axis=-1), np.take_along_axis(top_scores, order, axis=-1)
@@ -0,0 +1,169 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from artifacts import ARTIFACTS_DIR, file_digest, is_published, prune, publish_arrays, read_arrays
+
+EXERCISES_FILE = "fitness_exercises.csv"
+INDEX_DIR = os.path.join(ARTIFACTS_DIR, "exercise_index")
+DEFAULT_TOP_K = 10
+BLOCK_SIZE = 512
+
+_ARRAYS = ("neighbor_indptr", "neighbor_indices", "neighbor_scores",
+           "tfidf_indptr", "tfidf_indices", "tfidf_data")
+
+
+def load_exercises(csv_path):
+    df = pd.read_csv(csv_path)
+    df['tags'] = df['bodyPart'] + ' ' + df['equipment'] + ' ' + df['target']
+    return df
+
+
+def build_tfidf(tags):
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    tfidf = TfidfVectorizer(stop_words='english', dtype=np.float32)
+    return tfidf.fit_transform(tags).tocsr()
+
+
+def top_k_neighbors(tfidf_matrix, k=DEFAULT_TOP_K, block_size=BLOCK_SIZE):
+    """Top-k cosine neighbors of every row, excluding the row itself, as CSR arrays.
+
+    TF-IDF rows are L2-normalised, so the dot product is the cosine similarity.
+    Rows are scored block by block, so peak memory is block_size x N instead of N x N.
+    """
+    n = tfidf_matrix.shape[0]
+    k = max(0, min(k, n - 1))
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    indices, scores = [], []
+
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        sims = (tfidf_matrix[start:stop] @ tfidf_matrix.T).toarray()
+        sims[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+
+        if k == 0:
+            top = np.empty((stop - start, 0), dtype=np.int64)
+        else:
+            top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(sims, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        for offset in range(stop - start):
+            keep = top_scores[offset] > 0
+            indices.append(top[offset][keep])
+            scores.append(top_scores[offset][keep])
+            indptr[start + offset + 1] = indptr[start + offset] + keep.sum()
+
+    indices = np.concatenate(indices).astype(np.int32) if indices else np.empty(0, dtype=np.int32)
+    scores = np.concatenate(scores).astype(np.float32) if scores else np.empty(0, dtype=np.float32)
+    return indptr, indices, scores
+
+
+class ExerciseIndex:
+    """Read-only top-k neighbor index and TF-IDF matrix for the exercise catalog."""
+
+    def __init__(self, arrays, meta):
+        self.meta = meta
+        self.neighbor_indptr = arrays["neighbor_indptr"]
+        self.neighbor_indices = arrays["neighbor_indices"]
+        self.neighbor_scores = arrays["neighbor_scores"]
+        self.tfidf_matrix = sparse.csr_matrix(
+            (arrays["tfidf_data"], arrays["tfidf_indices"], arrays["tfidf_indptr"]),
+            shape=(meta["rows"], meta["features"]),
+            copy=False,
+        )
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    def neighbors(self, row, k=None):
+        """Return (rows, scores) of the most similar exercises, best first."""
+        start, stop = self.neighbor_indptr[row], self.neighbor_indptr[row + 1]
+        if k is not None:
+            stop = min(stop, start + k)
+        return self.neighbor_indices[start:stop], self.neighbor_scores[start:stop]
+
+
+def index_from_frame(df, k=DEFAULT_TOP_K):
+    """Build an in-memory index for an exercises DataFrame without persisting it."""
+    tfidf_matrix = build_tfidf(df['tags'])
+    neighbor_indptr, neighbor_indices, neighbor_scores = top_k_neighbors(tfidf_matrix, k)
+    arrays = {
+        "neighbor_indptr": neighbor_indptr,
+        "neighbor_indices": neighbor_indices,
+        "neighbor_scores": neighbor_scores,
+        "tfidf_indptr": tfidf_matrix.indptr,
+        "tfidf_indices": tfidf_matrix.indices,
+        "tfidf_data": tfidf_matrix.data,
+    }
+    meta = {"rows": int(tfidf_matrix.shape[0]), "features": int(tfidf_matrix.shape[1]), "k": k}
+    return ExerciseIndex(arrays, meta)
+
+
+def _index_name(digest, k):
+    return f"{digest[:16]}-k{k}"
+
+
+def build_index(csv_path=EXERCISES_FILE, index_dir=INDEX_DIR, k=DEFAULT_TOP_K):
+    """Build the index for csv_path into index_dir/<digest> and return its path."""
+    digest = file_digest(csv_path)
+    target = os.path.join(index_dir, _index_name(digest, k))
+    if is_published(target):
+        return target
+
+    df = load_exercises(csv_path)
+    tfidf_matrix = build_tfidf(df['tags'])
+    neighbor_indptr, neighbor_indices, neighbor_scores = top_k_neighbors(tfidf_matrix, k)
+
+    arrays = {
+        "neighbor_indptr": neighbor_indptr,
+        "neighbor_indices": neighbor_indices,
+        "neighbor_scores": neighbor_scores,
+        "tfidf_indptr": tfidf_matrix.indptr.astype(np.int64),
+        "tfidf_indices": tfidf_matrix.indices.astype(np.int32),
+        "tfidf_data": tfidf_matrix.data.astype(np.float32),
+    }
+    meta = {
+        "source": os.path.basename(csv_path),
+        "sha256": digest,
+        "rows": int(tfidf_matrix.shape[0]),
+        "features": int(tfidf_matrix.shape[1]),
+        "k": k,
+    }
+    return publish_arrays(target, arrays, meta)
+
+
+def open_index(path):
+    arrays, meta = read_arrays(path, _ARRAYS)
+    return ExerciseIndex(arrays, meta)
+
+
+def load_exercise_index(csv_path=EXERCISES_FILE, index_dir=INDEX_DIR, k=DEFAULT_TOP_K):
+    """Open the index for the current CSV, building it first if the CSV changed."""
+    return open_index(build_index(csv_path, index_dir, k))
+
+
+def prune_indexes(csv_path=EXERCISES_FILE, index_dir=INDEX_DIR):
+    """Remove indexes built from older versions of the CSV."""
+    return prune(index_dir, file_digest(csv_path)[:16])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the exercise neighbor index")
+    parser.add_argument("--csv", default=EXERCISES_FILE)
+    parser.add_argument("--out", default=INDEX_DIR)
+    parser.add_argument("-k", type=int, default=DEFAULT_TOP_K)
+    parser.add_argument("--prune", action="store_true", help="delete indexes for older CSV versions")
+    args = parser.parse_args()
+
+    path = build_index(args.csv, args.out, args.k)
+    index = open_index(path)
+    print(f"✅ Exercise index ready at {path}: {len(index)} exercises, top-{args.k} neighbors")
+    if args.prune:
+        print(f"🧹 Removed old indexes: {prune_indexes(args.csv, args.out)}")
@@ -0,0 +1,362 @@
+"""Stream large external food dumps (CSV/TSV/JSONL, optionally gzipped) into a food table.
+
+    python food_import.py en.openfoodfacts.org.products.csv.gz
+    FOOD_TABLE_PATH=artifacts/food_imports/<name> gunicorn -c gunicorn.conf.py app:app
+
+Rows are parsed one at a time and buffered in chunks of ``--chunk-rows``.
+Each chunk's columns are appended to raw spill files, and the final .npy
+arrays are written by copying those files. Peak memory is therefore one
+chunk, plus the barcode hash index built at the end (about 24 bytes per
+barcoded row). Energy is normalised to kcal, and macros to grams per 100 g.
+
+The artifact is the regular food table layout (open_food_table reads it)
+plus ``barcode_keys``/``barcode_rows``, an open-addressing hash table from
+numeric GTIN to row, used by BarcodeIndex for O(1) lookups.
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import math
+import os
+import shutil
+import sys
+
+import numpy as np
+
+from artifacts import ARTIFACTS_DIR, file_digest, is_published, publish_directory, read_arrays
+from food_table import FORMAT_VERSION, MACROS, open_food_table
+from food_tags import tag_bits as compute_tag_bits
+
+IMPORT_DIR = os.path.join(ARTIFACTS_DIR, "food_imports")
+CHUNK_ROWS = 100_000
+MAX_KCAL_PER_100G = 900 * 1.1
+KJ_PER_KCAL = 4.184
+
+FIELD_ALIASES = {
+    "barcode": ("code", "barcode", "ean", "upc", "gtin"),
+    "name": ("product_name", "product_name_en", "name", "food_name", "Food Name", "description"),
+    "calories": ("energy-kcal_100g", "energy_kcal_100g", "energy-kcal", "calories", "kcal", "Calories (kcal)",
+                 "energy-kcal_value", "energy_value"),
+    "energy_kj": ("energy-kj_100g", "energy_100g", "energy-kj", "energy_kj", "kj"),
+    "protein": ("proteins_100g", "proteins", "protein", "protein_g", "Protein (g)", "proteins_value"),
+    "carbs": ("carbohydrates_100g", "carbohydrates", "carbs", "Carbohydrates (g)", "carbohydrates_value"),
+    "fat": ("fat_100g", "fat", "fats", "Fats (g)", "fat_value"),
+    "category": ("main_category_en", "main_category", "category", "Category", "categories"),
+    "tags": ("allergens_tags", "allergens", "tags", "Tags"),
+}
+# Multiplier to grams (macros) or kcal (energy) for the "<nutrient>_unit" of a raw "<nutrient>_value" in
+# JSONL dumps. The *_100g fields are already in grams (kJ for energy_100g) and never take a unit.
+UNIT_FACTORS = {"g": 1.0, "mg": 1e-3, "µg": 1e-6, "mcg": 1e-6, "kg": 1e3, "kcal": 1.0, "kj": 1 / KJ_PER_KCAL}
+# Allergen vocabulary of the dumps mapped onto food_tags.TAGS.
+ALLERGEN_TAGS = {
+    "milk": "dairy", "eggs": "egg", "gluten": "gluten", "nuts": "tree_nut", "peanuts": "peanut",
+    "soybeans": "soy", "sesame-seeds": "sesame", "fish": "fish", "crustaceans": "shellfish", "molluscs": "shellfish",
+}
+
+
+def open_text(path):
+    raw = gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+    return io.TextIOWrapper(raw, encoding="utf-8", errors="replace", newline="")
+
+
+def read_records(path):
+    """Yield one flat dict per row of a CSV/TSV or JSONL dump."""
+    plain = path[:-3] if path.endswith(".gz") else path
+    with open_text(path) as f:
+        if plain.endswith((".jsonl", ".ndjson", ".json")):
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                nutriments = record.pop("nutriments", None)
+                if isinstance(nutriments, dict):
+                    record = {**nutriments, **record}
+                yield record
+        else:
+            csv.field_size_limit(sys.maxsize)
+            sample = f.read(1 << 16)
+            f.seek(0)
+            delimiter = "\t" if sample.count("\t") > sample.count(",") else ","
+            yield from csv.DictReader(f, delimiter=delimiter)
+
+
+def _first(record, field):
+    for alias in FIELD_ALIASES[field]:
+        value = record.get(alias)
+        if value not in (None, ""):
+            return alias, value
+    return None, None
+
+
+def _number(record, field):
+    alias, value = _first(record, field)
+    if alias is None:
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    if not math.isfinite(value):
+        return None
+    if alias.endswith("_value"):
+        # Raw values are as entered on the label: usable only per 100 g and in a known unit.
+        unit = record.get(f"{alias.removesuffix('_value')}_unit")
+        factor = UNIT_FACTORS.get(unit.strip().lower()) if isinstance(unit, str) else None
+        if factor is None or record.get("nutrition_data_per", "100g") != "100g":
+            return None
+        value *= factor
+    return value
+
+
+def _tags(value):
+    if isinstance(value, list):
+        value = ",".join(map(str, value))
+    if not isinstance(value, str):
+        return None
+    tags = []
+    for item in value.split(","):
+        item = item.strip().lower().split(":")[-1]
+        tags.append(ALLERGEN_TAGS.get(item, item))
+    return ",".join(tags)
+
+
+def normalize_record(record):
+    """(barcode, name, [kcal, protein, carbs, fat], category, tags) or None if unusable."""
+    _, name = _first(record, "name")
+    if not isinstance(name, str) or not name.strip():
+        return None
+    calories = _number(record, "calories")
+    if calories is None:
+        kj = _number(record, "energy_kj")
+        calories = kj / KJ_PER_KCAL if kj is not None else None
+    if calories is None or not 0 <= calories <= MAX_KCAL_PER_100G:
+        return None
+    macros = [calories] + [max(_number(record, field) or 0.0, 0.0) for field in MACROS[1:]]
+    if any(value > 100 for value in macros[1:]):
+        return None
+
+    _, barcode = _first(record, "barcode")
+    _, category = _first(record, "category")
+    if isinstance(category, str):
+        category = category.split(",")[0].strip().split(":")[-1] or None
+    _, tags = _first(record, "tags")
+    return str(barcode or "").strip(), " ".join(name.split()), macros, category, _tags(tags)
+
+
+def barcode_key(code):
+    """Numeric GTIN key: leading zeros dropped, so UPC-A and its EAN-13 form match. 0 if invalid."""
+    code = str(code).strip()
+    if not code.isdigit() or len(code) > 19:
+        return 0
+    return int(code)
+
+
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+
+
+def _slot(keys, bits):
+    return ((keys * np.uint64(_HASH_MULTIPLIER)) >> np.uint64(64 - bits)).astype(np.int64)
+
+
+def build_hash_index(keys, rows):
+    """Linear-probing hash table (keys, rows) at load factor <= 0.5; key 0 marks an empty slot.
+
+    Duplicate keys keep their first row. Insertion is vectorised: each round
+    every unplaced key claims its current slot, one winner per free slot is
+    kept, and the losers probe the next slot.
+    """
+    keys = np.asarray(keys, dtype=np.uint64)
+    rows = np.asarray(rows, dtype=np.int64)
+    valid = keys != 0
+    keys, first = np.unique(keys[valid], return_index=True)
+    rows = rows[valid][first]
+
+    bits = max(4, int(np.ceil(np.log2(max(len(keys), 1) * 2))))
+    size = 1 << bits
+    table_keys = np.zeros(size, dtype=np.uint64)
+    table_rows = np.full(size, -1, dtype=np.int64)
+
+    pending = np.arange(len(keys))
+    slots = _slot(keys, bits) if len(keys) else np.empty(0, dtype=np.int64)
+    while len(pending):
+        candidate = slots[pending]
+        free = table_keys[candidate] == 0
+        winners_at, winner_first = np.unique(candidate[free], return_index=True)
+        winners = pending[free][winner_first]
+        table_keys[winners_at] = keys[winners]
+        table_rows[winners_at] = rows[winners]
+
+        placed = np.zeros(len(pending), dtype=bool)
+        placed[np.flatnonzero(free)[winner_first]] = True
+        pending = pending[~placed]
+        slots[pending] = (slots[pending] + 1) & (size - 1)
+    return table_keys, table_rows
+
+
+class BarcodeIndex:
+    """O(1) barcode -> food row lookups on the memory-mapped hash table of an import."""
+
+    def __init__(self, keys, rows):
+        self.keys = keys
+        self.rows = rows
+        self.bits = int(len(keys)).bit_length() - 1
+
+    def __len__(self):
+        return int(np.count_nonzero(self.keys))
+
+    def lookup(self, code):
+        key = barcode_key(code)
+        if not key or not len(self.keys):
+            return None
+        mask = len(self.keys) - 1
+        slot = ((key * _HASH_MULTIPLIER) & _MASK64) >> (64 - self.bits)
+        while True:
+            stored = int(self.keys[slot])
+            if stored == key:
+                return int(self.rows[slot])
+            if stored == 0:
+                return None
+            slot = (slot + 1) & mask
+
+
+class _Spill:
+    """Append-only raw column files, turned into .npy arrays at the end."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.files = {}
+        self.dtypes = {}
+
+    def append(self, name, array):
+        if name not in self.files:
+            self.files[name] = open(os.path.join(self.directory, f"{name}.raw"), "wb")
+            self.dtypes[name] = array.dtype
+        self.files[name].write(np.ascontiguousarray(array, dtype=self.dtypes[name]).tobytes())
+
+    def save(self, name, out_path, shape, dtype=None):
+        """Write the spilled column as an .npy file, streaming the data."""
+        dtype = np.dtype(dtype or self.dtypes[name])
+        raw = os.path.join(self.directory, f"{name}.raw")
+        if name in self.files:
+            self.files.pop(name).close()
+        else:
+            open(raw, "wb").close()
+        with open(out_path, "wb") as out, open(raw, "rb") as src:
+            np.lib.format.write_array_header_1_0(out, {"descr": np.lib.format.dtype_to_descr(dtype),
+                                                       "fortran_order": False, "shape": shape})
+            shutil.copyfileobj(src, out, 1 << 20)
+        os.remove(raw)
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+
+
+def _import_name(digest):
+    return f"{digest[:16]}-v{FORMAT_VERSION}"
+
+
+def import_foods(source, out_dir=IMPORT_DIR, chunk_rows=CHUNK_ROWS, log=print):
+    """Import source into out_dir/<digest> (a no-op if already imported) and return the path."""
+    digest = file_digest(source)
+    target = os.path.join(out_dir, _import_name(digest))
+    if is_published(target):
+        return target
+
+    def write(tmp_dir):
+        spill = _Spill(tmp_dir)
+        categories, category_ids = [], {}
+        stats = {"rows": 0, "skipped": 0, "barcodes": 0}
+        name_bytes = 0
+        spill.append("name_offsets", np.zeros(1, dtype=np.int64))
+
+        def flush(chunk):
+            nonlocal name_bytes
+            barcodes, names, macros, cats, tags = zip(*chunk)
+            encoded = [name.encode("utf-8") for name in names]
+            lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+            spill.append("name_offsets", name_bytes + np.cumsum(lengths))
+            spill.append("name_blob", np.frombuffer(b"".join(encoded), dtype=np.uint8))
+            name_bytes += int(lengths.sum())
+            spill.append("macros", np.asarray(macros, dtype=np.float64))
+            codes = np.full(len(cats), -1, dtype=np.int16)
+            for i, category in enumerate(cats):
+                if category:
+                    code = category_ids.get(category)
+                    if code is None and len(categories) < np.iinfo(np.int16).max:
+                        code = category_ids[category] = len(categories)
+                        categories.append(category)
+                    codes[i] = -1 if code is None else code
+            spill.append("category_codes", codes)
+            spill.append("tag_bits", compute_tag_bits(names, tags))
+            spill.append("barcodes", np.fromiter(map(barcode_key, barcodes), dtype=np.uint64, count=len(barcodes)))
+
+        try:
+            chunk = []
+            for record in read_records(source):
+                normalized = normalize_record(record)
+                if normalized is None:
+                    stats["skipped"] += 1
+                    continue
+                chunk.append(normalized)
+                if len(chunk) >= chunk_rows:
+                    flush(chunk)
+                    stats["rows"] += len(chunk)
+                    log(f"… {stats['rows']} foods imported, {stats['skipped']} rows skipped")
+                    chunk = []
+            if chunk:
+                flush(chunk)
+                stats["rows"] += len(chunk)
+
+            n = stats["rows"]
+            spill.save("macros", os.path.join(tmp_dir, "macros.npy"), (n, len(MACROS)), np.float64)
+            spill.save("name_offsets", os.path.join(tmp_dir, "name_offsets.npy"), (n + 1,), np.int64)
+            spill.save("name_blob", os.path.join(tmp_dir, "name_blob.npy"), (name_bytes,), np.uint8)
+            spill.save("category_codes", os.path.join(tmp_dir, "category_codes.npy"), (n,), np.int16)
+            spill.save("tag_bits", os.path.join(tmp_dir, "tag_bits.npy"), (n,), np.uint16)
+            spill.save("barcodes", os.path.join(tmp_dir, "barcodes.raw.npy"), (n,), np.uint64)
+        finally:
+            spill.close()
+
+        barcodes = np.load(os.path.join(tmp_dir, "barcodes.raw.npy"), mmap_mode="r")
+        keys, rows = build_hash_index(barcodes, np.arange(len(barcodes)))
+        del barcodes
+        os.remove(os.path.join(tmp_dir, "barcodes.raw.npy"))
+        np.save(os.path.join(tmp_dir, "barcode_keys.npy"), keys)
+        np.save(os.path.join(tmp_dir, "barcode_rows.npy"), rows)
+        stats["barcodes"] = int(np.count_nonzero(keys))
+
+        return {
+            "source": os.path.basename(source),
+            "sha256": digest,
+            "categories": categories,
+            **stats,
+        }
+
+    return publish_directory(target, write)
+
+
+def open_barcode_index(path):
+    arrays, _ = read_arrays(path, ("barcode_keys", "barcode_rows"))
+    return BarcodeIndex(arrays["barcode_keys"], arrays["barcode_rows"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import a CSV/TSV/JSONL food dump into a food table")
+    parser.add_argument("source")
+    parser.add_argument("--out", default=IMPORT_DIR)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    path = import_foods(args.source, args.out, args.chunk_rows)
+    table = open_food_table(path)
+    print(f"✅ Imported {len(table)} foods ({table.meta['skipped']} rows skipped, "
+          f"{table.meta['barcodes']} barcodes) into {path}")
+    print(f"   Serve it with FOOD_TABLE_PATH={path}")
@@ -0,0 +1,144 @@
+import re
+import unicodedata
+from bisect import bisect_left
+from itertools import islice
+
+import numpy as np
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MIN_FUZZY_SCORE = 0.3
+NGRAM = 3
+
+_SPACES = re.compile(r"\s+")
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize(text):
+    """Lower-case, accent-free, punctuation-free text with single spaces."""
+    text = str(text)
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = text.casefold()
+    return _SPACES.sub(" ", _PUNCTUATION.sub(" ", text)).strip()
+
+
+def ngrams(text, n=NGRAM):
+    padded = f" {text} "
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+class FoodSearchIndex:
+    """Autocomplete and typo-tolerant search over the food table's names.
+
+    Two sorted arrays answer prefix queries with bisect: one of full
+    normalized names and one of every word-start suffix ("wheat bread" and
+    "bread" for "Whole Wheat Bread"), so a prefix costs O(log n + matches).
+    Fuzzy matching uses a character trigram inverted index in CSR form. A
+    query's posting lists are concatenated and counted with one bincount,
+    and rows are ranked by Dice similarity of their trigram sets.
+
+    Results come in rank order: exact match, name prefix, word prefix, then
+    fuzzy matches. Each tier is only computed if a page reaches it.
+    """
+
+    def __init__(self, names, n=NGRAM):
+        self.n = n
+        self.normalized = [normalize(name) for name in names]
+        self.exact = {}
+        for row, key in enumerate(self.normalized):
+            self.exact.setdefault(key, row)
+
+        self.name_keys = sorted((key, row) for row, key in enumerate(self.normalized))
+        self.word_keys = sorted(
+            (key[start:], row)
+            for row, key in enumerate(self.normalized)
+            for start in [m.start() for m in re.finditer(r"\b\w", key)][1:]
+        )
+
+        gram_ids, gram_of, row_of = {}, [], []
+        gram_counts = np.zeros(len(self.normalized), dtype=np.int32)
+        for row, key in enumerate(self.normalized):
+            ids = [gram_ids.setdefault(gram, len(gram_ids)) for gram in ngrams(key, n)]
+            gram_counts[row] = len(ids)
+            gram_of += ids
+            row_of += [row] * len(ids)
+
+        gram_of = np.asarray(gram_of, dtype=np.int64)
+        order = np.argsort(gram_of, kind="stable")
+        self.gram_ids = gram_ids
+        self.gram_indptr = np.zeros(len(gram_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(gram_of, minlength=len(gram_ids)), out=self.gram_indptr[1:])
+        self.gram_rows = np.asarray(row_of, dtype=np.int32)[order]
+        self.gram_counts = gram_counts
+
+    def __len__(self):
+        return len(self.normalized)
+
+    def resolve(self, name):
+        """Row whose name matches ignoring case, accents and punctuation, or None."""
+        return self.exact.get(normalize(name))
+
+    @staticmethod
+    def _prefix_rows(keys, prefix):
+        for i in range(bisect_left(keys, (prefix,)), len(keys)):
+            key, row = keys[i]
+            if not key.startswith(prefix):
+                break
+            yield row
+
+    def fuzzy(self, query, limit=DEFAULT_LIMIT, min_score=MIN_FUZZY_SCORE):
+        """(rows, scores) of the names most similar to query by trigram Dice score, best first."""
+        grams = ngrams(normalize(query), self.n)
+        ids = [self.gram_ids[gram] for gram in grams if gram in self.gram_ids]
+        if not ids or not len(self):
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        rows = np.concatenate([self.gram_rows[self.gram_indptr[i]:self.gram_indptr[i + 1]] for i in ids])
+        common = np.bincount(rows, minlength=len(self))
+        candidates = np.flatnonzero(common)
+        scores = 2.0 * common[candidates] / (len(grams) + self.gram_counts[candidates])
+        keep = scores >= min_score
+        candidates, scores = candidates[keep], scores[keep]
+
+        k = min(limit, len(candidates))
+        if k == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.lexsort((candidates[top], -scores[top]))]
+        return candidates[top], scores[top]
+
+    def matches(self, query, fuzzy_limit=MAX_LIMIT):
+        """Yield (row, match) pairs in rank order, each row at most once.
+
+        At most ``fuzzy_limit`` rows come from the fuzzy tier.
+        """
+        prefix = normalize(query)
+        if not prefix:
+            return
+        seen = set()
+        tiers = (
+            ("exact", [self.exact[prefix]] if prefix in self.exact else []),
+            ("prefix", self._prefix_rows(self.name_keys, prefix)),
+            ("word", self._prefix_rows(self.word_keys, prefix)),
+        )
+        for match, rows in tiers:
+            for row in rows:
+                if row not in seen:
+                    seen.add(row)
+                    yield row, match
+        # Fuzzy hits overlap the prefix tiers, so ask for enough to still fill fuzzy_limit.
+        for row in self.fuzzy(prefix, fuzzy_limit + len(seen))[0].tolist():
+            if row not in seen:
+                seen.add(row)
+                yield row, "fuzzy"
+
+    def search(self, query, limit=DEFAULT_LIMIT, offset=0):
+        """One page of matches: (results, has_more), results being (row, match) pairs."""
+        page = list(islice(self.matches(query, fuzzy_limit=offset + limit + 1), offset, offset + limit + 1))
+        return page[:limit], len(page) > limit
+
+    def suggest(self, query, limit=3):
+        """Likely intended foods for a name that did not match: prefix matches first, then fuzzy."""
+        return [row for row, _ in islice(self.matches(query, fuzzy_limit=limit), limit)]
@@ -0,0 +1,224 @@
+import argparse
+import os
+
+import numpy as np
+
+from artifacts import ARTIFACTS_DIR, file_digest, is_published, prune, publish_arrays, read_arrays
+from food_tags import TAG_BITS, TAGS, restriction_bits, tag_bits as compute_tag_bits
+
+FOOD_FILE = "food_database.xlsx"
+TABLE_DIR = os.path.join(ARTIFACTS_DIR, "food_table")
+
+MACROS = ("calories", "protein", "carbs", "fat")
+SOURCE_COLUMNS = {
+    "Food Name": "name",
+    "Calories (kcal)": "calories",
+    "Protein (g)": "protein",
+    "Carbohydrates (g)": "carbs",
+    "Fats (g)": "fat",
+}
+
+_ARRAYS = ("macros", "name_offsets", "name_blob", "category_codes", "tag_bits")
+# Bumped whenever the compiled layout changes, so old caches are rebuilt.
+FORMAT_VERSION = 2
+
+
+class FoodTable:
+    """Column-oriented food catalog shared by meal logging, meal planning and kNN.
+
+    ``macros`` is one contiguous (n, 4) float64 array in MACROS order; names are
+    stored as a single UTF-8 blob plus offsets so the whole table can be
+    memory-mapped from its compiled cache. The name -> row index is built on
+    first lookup.
+
+    ``tag_bits`` holds one dietary-tag bitset per food (see food_tags), so the
+    foods allowed by any combination of restrictions are one vectorized AND.
+    """
+
+    columns = ("name",) + MACROS
+
+    def __init__(self, macros, name_offsets, name_blob, category_codes=None, categories=(), meta=None,
+                 tag_bits=None):
+        self.macros = macros
+        self.name_offsets = name_offsets
+        self.name_blob = name_blob
+        self.category_codes = category_codes
+        self.categories = list(categories)
+        self.meta = meta or {}
+        self._names = None
+        self._index = None
+        self._tag_masks = None
+        self.tag_bits = tag_bits if tag_bits is not None else compute_tag_bits(self.names)
+
+    def __len__(self):
+        return len(self.name_offsets) - 1
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def column(self, name):
+        return self.macros[:, MACROS.index(name)]
+
+    def name(self, row):
+        return bytes(self.name_blob[self.name_offsets[row]:self.name_offsets[row + 1]]).decode("utf-8")
+
+    @property
+    def names(self):
+        if self._names is None:
+            blob = bytes(self.name_blob)
+            offsets = self.name_offsets.tolist()
+            self._names = [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(self))]
+        return self._names
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = {name: row for row, name in enumerate(self.names)}
+        return self._index
+
+    def lookup(self, name):
+        """Row of the food called name, or None."""
+        return self.index.get(name)
+
+    def category(self, row):
+        if self.category_codes is None or self.category_codes[row] < 0:
+            return None
+        return self.categories[self.category_codes[row]]
+
+    def tags(self, row):
+        return [tag for tag in TAGS if self.tag_bits[row] & TAG_BITS[tag]]
+
+    @property
+    def tag_masks(self):
+        """Read-only boolean mask of the foods carrying each tag."""
+        if self._tag_masks is None:
+            masks = {}
+            for tag in TAGS:
+                mask = (self.tag_bits & TAG_BITS[tag]) != 0
+                mask.flags.writeable = False
+                masks[tag] = mask
+            self._tag_masks = masks
+        return self._tag_masks
+
+    def allowed(self, restrictions=(), excluded_foods=()):
+        """Mask of the foods compatible with the restrictions and not explicitly excluded."""
+        forbidden = restriction_bits(restrictions)
+        mask = (self.tag_bits & forbidden) == 0
+        for name in excluded_foods:
+            row = self.lookup(name)
+            if row is not None:
+                mask[row] = False
+        return mask
+
+    def nutrients(self, row):
+        return dict(zip(MACROS, self.macros[row].tolist()))
+
+    def records(self, rows):
+        values = self.macros[rows].tolist()
+        return [dict(name=self.name(row), **dict(zip(MACROS, value))) for row, value in zip(rows, values)]
+
+    def arrays(self):
+        return {
+            "macros": np.ascontiguousarray(self.macros, dtype=np.float64),
+            "name_offsets": np.asarray(self.name_offsets, dtype=np.int64),
+            "name_blob": np.asarray(self.name_blob, dtype=np.uint8),
+            "category_codes": np.asarray(
+                self.category_codes if self.category_codes is not None else np.full(len(self), -1),
+                dtype=np.int16,
+            ),
+            "tag_bits": np.asarray(self.tag_bits, dtype=np.uint16),
+        }
+
+    @classmethod
+    def from_columns(cls, names, macros, categories=None, tags=None):
+        encoded = [name.encode("utf-8") for name in names]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+        category_names, category_codes = [], None
+        if categories is not None:
+            lookup = {}
+            category_codes = np.empty(len(names), dtype=np.int16)
+            for row, category in enumerate(categories):
+                if not category:
+                    category_codes[row] = -1
+                    continue
+                if category not in lookup:
+                    lookup[category] = len(category_names)
+                    category_names.append(category)
+                category_codes[row] = lookup[category]
+
+        macros = np.ascontiguousarray(macros, dtype=np.float64).reshape(len(names), len(MACROS))
+        return cls(macros, offsets, blob, category_codes, category_names, tag_bits=compute_tag_bits(names, tags))
+
+    @classmethod
+    def from_frame(cls, df):
+        """Build a table from a DataFrame with the food_database.xlsx column names."""
+        import pandas as pd
+
+        missing = [col for col in SOURCE_COLUMNS if col not in df.columns]
+        if missing:
+            raise ValueError(f"Columns {missing} not found in food database")
+
+        df = df.rename(columns=SOURCE_COLUMNS)
+        df = df[df["name"].notna()]
+        df = df.assign(name=df["name"].astype(str).str.strip())
+        df = df[df["name"] != ""].drop_duplicates("name")
+        macros = df[list(MACROS)].apply(pd.to_numeric, errors="coerce").fillna(0)
+
+        categories = tags = None
+        if "Category" in df.columns:
+            categories = df["Category"].where(df["Category"].notna(), None).tolist()
+        if "Tags" in df.columns:
+            tags = df["Tags"].where(df["Tags"].notna(), None).tolist()
+        return cls.from_columns(df["name"].tolist(), macros.to_numpy(), categories, tags)
+
+
+def _table_name(digest):
+    return f"{digest[:16]}-v{FORMAT_VERSION}"
+
+
+def compile_food_table(source=FOOD_FILE, table_dir=TABLE_DIR):
+    """Compile source into table_dir/<digest> unless that cache already exists."""
+    import pandas as pd
+
+    digest = file_digest(source)
+    target = os.path.join(table_dir, _table_name(digest))
+    if is_published(target):
+        return target
+
+    table = FoodTable.from_frame(pd.read_excel(source, engine="openpyxl"))
+    meta = {
+        "source": os.path.basename(source),
+        "sha256": digest,
+        "rows": len(table),
+        "categories": table.categories,
+    }
+    return publish_arrays(target, table.arrays(), meta)
+
+
+def open_food_table(path):
+    arrays, meta = read_arrays(path, _ARRAYS)
+    return FoodTable(
+        arrays["macros"], arrays["name_offsets"], arrays["name_blob"],
+        arrays["category_codes"], meta.get("categories", ()), meta, arrays["tag_bits"],
+    )
+
+
+def load_food_table(source=FOOD_FILE, table_dir=TABLE_DIR):
+    """Memory-map the compiled table for source, compiling it first if source changed."""
+    return open_food_table(compile_food_table(source, table_dir))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile the food database into the binary food table")
+    parser.add_argument("--source", default=FOOD_FILE)
+    parser.add_argument("--out", default=TABLE_DIR)
+    parser.add_argument("--prune", action="store_true", help="delete tables compiled from older sources")
+    args = parser.parse_args()
+
+    path = compile_food_table(args.source, args.out)
+    print(f"✅ Food table ready at {path}: {len(open_food_table(path))} foods")
+    if args.prune:
+        print(f"🧹 Removed old tables: {prune(args.out, _table_name(file_digest(args.source)))}")
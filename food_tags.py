@@ -0,0 +1,95 @@
+"""Dietary restriction tags for the food table.
+
+Every food gets a bitset of "contains" tags (meat, dairy, gluten, ...),
+derived from its name and from an optional comma-separated ``Tags`` column
+in the source spreadsheet. A restriction (vegetarian, nut_free, ...) is the
+set of tags it forbids, so a user's combined restrictions are a single
+bitmask and filtering the catalog is one vectorized AND, however many
+restrictions they have.
+"""
+import re
+
+import numpy as np
+
+TAGS = (
+    "meat", "fish", "shellfish", "dairy", "egg", "gluten",
+    "tree_nut", "peanut", "soy", "sesame", "honey",
+)
+TAG_BITS = {tag: 1 << i for i, tag in enumerate(TAGS)}
+
+RESTRICTIONS = {
+    "vegetarian": ("meat", "fish", "shellfish"),
+    "pescatarian": ("meat",),
+    "vegan": ("meat", "fish", "shellfish", "dairy", "egg", "honey"),
+    "dairy_free": ("dairy",),
+    "egg_free": ("egg",),
+    "gluten_free": ("gluten",),
+    "nut_free": ("tree_nut", "peanut"),
+    "tree_nut_free": ("tree_nut",),
+    "peanut_free": ("peanut",),
+    "soy_free": ("soy",),
+    "sesame_free": ("sesame",),
+    "shellfish_free": ("shellfish",),
+    "fish_free": ("fish",),
+}
+
+_KEYWORDS = {
+    "meat": r"chicken|beef|pork|lamb|turkey|bacon|ham|sausages?|steak|duck|veal|mutton|goat|venison|gelatin",
+    "fish": r"fish|salmon|tuna|cod|sardines?|mackerel|trout|tilapia|anchov(?:y|ies)|halibut|herring",
+    "shellfish": r"shrimps?|prawns?|crabs?|lobsters?|oysters?|clams?|mussels?|scallops?",
+    "dairy": r"milk|cheese|yogh?urt|butter|cream|whey|ghee|paneer|kefir|casein",
+    "egg": r"eggs?|mayonnaise|mayo",
+    "gluten": r"wheat|bread|pasta|barley|rye|couscous|bagels?|noodles?|crackers?|seitan|flour|soy sauce",
+    "tree_nut": r"almonds?|walnuts?|cashews?|pecans?|pistachios?|hazelnuts?|macadamia|brazil nuts?|pine nuts?",
+    "peanut": r"peanuts?",
+    "soy": r"soy|soya|tofu|tempeh|edamame|miso",
+    "sesame": r"sesame|tahini",
+    "honey": r"honey",
+}
+_PATTERNS = {tag: re.compile(rf"\b(?:{pattern})\b") for tag, pattern in _KEYWORDS.items()}
+# One scan over all keywords rules out most names before the per-tag searches.
+_ANY_TAG = re.compile("|".join(rf"\b(?:{pattern})\b" for pattern in _KEYWORDS.values()))
+# Plant "milks"/"butters" are not dairy (their own tags still apply).
+_NOT_DAIRY = re.compile(r"\b(?:coconut|soy|soya|almond|oat|rice|peanut|cashew|nut|apple)\s+(?:milk|butter|cream)\b")
+
+
+def derive_tags(name):
+    """Tags implied by a food's name."""
+    name = name.lower()
+    if not _ANY_TAG.search(name):
+        return set()
+    tags = {tag for tag, pattern in _PATTERNS.items() if pattern.search(name)}
+    if "dairy" in tags and not _PATTERNS["dairy"].search(_NOT_DAIRY.sub(" ", name)):
+        tags.discard("dairy")
+    return tags
+
+
+def parse_tags(value):
+    """Tags listed in a source cell such as "dairy, gluten"; unknown tags are ignored."""
+    if not isinstance(value, str):
+        return set()
+    return {tag.strip().lower() for tag in value.split(",")} & set(TAGS)
+
+
+def encode(tags):
+    bits = 0
+    for tag in tags:
+        bits |= TAG_BITS[tag]
+    return bits
+
+
+def tag_bits(names, extra_tags=None):
+    """One uint16 bitset per food: derived tags plus any listed in extra_tags."""
+    extra_tags = extra_tags if extra_tags is not None else [None] * len(names)
+    return np.fromiter(
+        (encode(derive_tags(name) | parse_tags(extra)) for name, extra in zip(names, extra_tags)),
+        dtype=np.uint16, count=len(names),
+    )
+
+
+def restriction_bits(restrictions):
+    """Bitmask of every tag forbidden by the restrictions; raises ValueError on unknown names."""
+    unknown = [r for r in restrictions if r not in RESTRICTIONS]
+    if unknown:
+        raise ValueError(f"Unknown dietary restrictions: {unknown}")
+    return encode(tag for restriction in restrictions for tag in RESTRICTIONS[restriction])
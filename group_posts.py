@@ -0,0 +1,190 @@
+"""Group posts, one document each in ``group_posts`` instead of an array in the group.
+
+Posts used to be $pushed into ``groups.posts``, so every read returned a
+group's whole history and every like or comment rewrote the group document.
+Each post is now its own document {group, user, content, likes, liked_by,
+comments, created_at}. Reads page newest first along the
+{group, created_at desc, _id desc} index with a keyset cursor, so a page
+costs the same however old the group is, and a like touches one post.
+
+    python group_posts.py                  # move embedded posts into group_posts (start.sh)
+    python group_posts.py --batch-size 200
+
+The migration copies each group's embedded posts in batches, then unsets
+``posts`` on the group as long as the array has not changed since it was
+read. Migrated posts get an _id derived from the group and their position,
+so re-running after an interruption inserts nothing twice.
+"""
+import argparse
+import base64
+import hashlib
+from datetime import datetime
+
+from bson import ObjectId, json_util
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+BATCH_SIZE = 500
+DUPLICATE_KEY = 11000
+
+NEWEST_FIRST = [("created_at", DESCENDING), ("_id", DESCENDING)]
+# Posts addressed by content (the legacy API) resolve to the oldest match, as the array lookup did.
+OLDEST_FIRST = [("created_at", ASCENDING), ("_id", ASCENDING)]
+SUMMARY = {"user": 1, "content": 1, "likes": 1, "liked_by": 1, "comments": 1, "created_at": 1}
+
+
+def new_post(group, user, content, created_at=None, **extra):
+    return {
+        "group": group,
+        "user": user,
+        "content": content,
+        "likes": 0,
+        "liked_by": [],
+        "comments": [],
+        "created_at": created_at or datetime.utcnow(),
+        **extra,
+    }
+
+
+def post_filter(group, post_id=None, content=None):
+    """Filter for one post of group, by id or (legacy clients) by content; ValueError if neither is usable."""
+    if post_id:
+        if not ObjectId.is_valid(post_id):
+            raise ValueError("invalid post_id")
+        return {"_id": ObjectId(post_id), "group": group}
+    if content:
+        return {"group": group, "content": content}
+    raise ValueError("post_id or post_content is required")
+
+
+def serialize(post):
+    return {
+        "id": str(post["_id"]),
+        "user": post.get("user"),
+        "content": post.get("content"),
+        "likes": post.get("likes", 0),
+        "liked_by": post.get("liked_by", []),
+        "comments": post.get("comments", []),
+        "timestamp": post["created_at"].isoformat() if post.get("created_at") else None,
+    }
+
+
+def encode_cursor(post):
+    state = {"t": post["created_at"], "id": post["_id"]}
+    return base64.urlsafe_b64encode(json_util.dumps(state).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """(created_at, _id) of the post a page starts after; ValueError if malformed."""
+    try:
+        state = json_util.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        created_at, _id = state["t"], state["id"]
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError("invalid posts cursor") from e
+    if not isinstance(created_at, datetime):
+        raise ValueError("invalid posts cursor")
+    return created_at.replace(tzinfo=None), _id
+
+
+def page(posts_collection, group, limit=DEFAULT_LIMIT, cursor=None):
+    """(posts, next_cursor): up to limit posts of group, newest first."""
+    query = {"group": group}
+    if cursor:
+        created_at, _id = decode_cursor(cursor)
+        query["$or"] = [{"created_at": {"$lt": created_at}}, {"created_at": created_at, "_id": {"$lt": _id}}]
+    posts = list(posts_collection.find(query, SUMMARY).sort(NEWEST_FIRST).limit(limit + 1))
+    next_cursor = encode_cursor(posts[limit - 1]) if len(posts) > limit else None
+    return [serialize(post) for post in posts[:limit]], next_cursor
+
+
+def all_posts(posts_collection, group):
+    """Every post of group, oldest first (the unpaged legacy listing)."""
+    return [serialize(post) for post in posts_collection.find({"group": group}, SUMMARY).sort(OLDEST_FIRST)]
+
+
+def _created_at(post, fallback):
+    try:
+        return datetime.fromisoformat(post["timestamp"]).replace(tzinfo=None)
+    except (KeyError, TypeError, ValueError):
+        return fallback
+
+
+def legacy_post_id(group_id, index, created_at):
+    """A stable ObjectId for the index-th embedded post of a group: its time, the group, its position."""
+    seconds = max(int((created_at - datetime(1970, 1, 1)).total_seconds()), 0)
+    return ObjectId(seconds.to_bytes(4, "big") + hashlib.sha1(str(group_id).encode()).digest()[:5]
+                    + index.to_bytes(3, "big"))
+
+
+def legacy_posts(group):
+    """The group's embedded posts as group_posts documents, in array order."""
+    fallback = group.get("created_at")
+    if isinstance(fallback, str):
+        fallback = _created_at({"timestamp": fallback}, None)
+    if not isinstance(fallback, datetime):
+        fallback = group["_id"].generation_time.replace(tzinfo=None) \
+            if isinstance(group["_id"], ObjectId) else datetime(1970, 1, 1)
+
+    docs = []
+    for index, post in enumerate(group.get("posts") or []):
+        # Posts without a timestamp (badge posts) sort with the post before them.
+        fallback = _created_at(post, fallback)
+        doc = {**new_post(group["name"], post.get("user"), post.get("content"), fallback),
+               **{key: value for key, value in post.items() if key != "timestamp"}}
+        doc["_id"] = legacy_post_id(group["_id"], index, fallback)
+        docs.append(doc)
+    return docs
+
+
+def _insert(posts_collection, docs):
+    try:
+        posts_collection.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        if any(error["code"] != DUPLICATE_KEY for error in e.details.get("writeErrors", [])):
+            raise
+
+
+def migrate_group(groups_collection, posts_collection, group_id, batch_size=BATCH_SIZE):
+    """Move one group's embedded posts; returns how many it had."""
+    while True:
+        group = groups_collection.find_one({"_id": group_id}, {"name": 1, "posts": 1, "created_at": 1})
+        if not group or not group.get("posts"):
+            return 0
+        docs = legacy_posts(group)
+        for start in range(0, len(docs), batch_size):
+            _insert(posts_collection, docs[start:start + batch_size])
+        # Unset only if no post was pushed meanwhile; otherwise copy again (the copies are idempotent).
+        result = groups_collection.update_one({"_id": group_id, "posts": {"$size": len(docs)}},
+                                              {"$unset": {"posts": ""}})
+        if result.modified_count:
+            return len(docs)
+
+
+def migrate(groups_collection, posts_collection, batch_size=BATCH_SIZE, log=print):
+    """Move every group's embedded posts into posts_collection; returns (groups, posts) moved."""
+    groups = posts = 0
+    ids = [group["_id"] for group in groups_collection.find({"posts.0": {"$exists": True}}, {"_id": 1})]
+    for group_id in ids:
+        moved = migrate_group(groups_collection, posts_collection, group_id, batch_size)
+        if moved:
+            groups += 1
+            posts += moved
+            log(f"📦 {groups}/{len(ids)} groups, {posts} posts moved")
+    return groups, posts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move embedded group posts into the group_posts collection")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    from app import db, group_posts_collection, groups_collection
+    from indexes import INDEXES, apply
+
+    apply(db, {"group_posts": INDEXES["group_posts"]})
+    started = datetime.utcnow()
+    groups, posts = migrate(groups_collection, group_posts_collection, args.batch_size)
+    elapsed = (datetime.utcnow() - started).total_seconds()
+    print(f"✅ Moved {posts} posts from {groups} groups in {elapsed:.1f}s")
@@ -0,0 +1,31 @@
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:10000")
+workers = int(os.getenv("WEB_CONCURRENCY", 4))
+
+# With GUNICORN_PRELOAD=1 the app is imported once in the master, the read-only
+# datasets/models are built there and frozen out of the GC, and every worker
+# shares those pages copy-on-write instead of building its own copy. The
+# exercise index and food table are mmap'd .npy files and are shared through
+# the page cache in both modes.
+preload_app = os.getenv("GUNICORN_PRELOAD", "0") == "1"
+
+if preload_app:
+    # Warm-up happens synchronously in when_ready; a background warm-up thread
+    # started at import time must not be running across fork().
+    _warm_up = os.environ.pop("WARM_UP_RESOURCES", "")
+
+
+def when_ready(server):
+    if preload_app:
+        import app
+        names = None if _warm_up in ("", "all") else _warm_up.split(",")
+        app.preload_shared_resources(names)
+        server.log.info("Preloaded shared resources: %s", ", ".join(app.resources.timings))
+
+
+def worker_exit(server, worker):
+    # Each worker opened its own MongoDB pool (data_access drops the one
+    # inherited across fork()); close it so the server sees a clean logout.
+    import data_access
+    data_access.close_client()
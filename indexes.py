@@ -0,0 +1,202 @@
+"""The MongoDB indexes the app's queries rely on, and the command that applies them.
+
+    python indexes.py                     # create missing indexes (run at deploy, see start.sh)
+    python indexes.py --dry-run           # print what would change
+    python indexes.py --replace           # rebuild indexes whose keys match but options differ
+    python indexes.py --check             # explain() every hot query, fail on a COLLSCAN
+
+INDEXES is the whole spec: every index the app needs, per collection.
+Unique indexes back the places where the code assumes one document per key
+(register checks users.email, upserts by profile email, one steps entry per
+user and day, one entry per user and challenge, ...). Creating a unique
+index fails while duplicates exist; the command reports which and carries on
+with the rest, exiting non-zero.
+
+Indexes that exist in the database but not in the spec are listed and left
+alone. HOT_QUERIES are the request-path queries, in the shapes app.py runs
+them; ``--check`` and tests/test_indexes.py explain each one.
+"""
+import argparse
+import sys
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+DUPLICATE_KEY = 11000
+
+
+def index(*keys, unique=False):
+    return {"keys": list(keys), "unique": unique}
+
+
+INDEXES = {
+    "users": [index(("email", ASCENDING), unique=True)],
+    "profiles": [index(("email", ASCENDING), unique=True)],
+    "steps": [index(("email", ASCENDING), ("date", ASCENDING), unique=True)],
+    "sleep": [index(("user", ASCENDING), ("date", ASCENDING))],
+    "meals": [index(("user", ASCENDING), ("date", ASCENDING))],
+    "nutrition_daily": [index(("user", ASCENDING), ("date", ASCENDING), unique=True)],
+    "nutrition_totals": [index(("user", ASCENDING), unique=True)],
+    "user_challenges": [
+        index(("email", ASCENDING), ("challenge_name", ASCENDING), unique=True),
+        index(("challenge_name", ASCENDING), ("progress", DESCENDING), ("_id", ASCENDING)),
+    ],
+    "challenges": [index(("name", ASCENDING), unique=True)],
+    "notifications": [index(("user", ASCENDING))],
+    "achievements": [index(("user", ASCENDING), ("title", ASCENDING))],
+    "progress": [index(("user", ASCENDING), unique=True)],
+    "groups": [
+        index(("name", ASCENDING), unique=True),
+        index(("members", ASCENDING)),
+    ],
+    "group_posts": [
+        index(("group", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)),
+        index(("group", ASCENDING), ("content", ASCENDING)),
+    ],
+}
+
+_EMAIL, _DAY = "user@example.com", "2025-01-01"
+
+# (name, collection, filter, sort)
+HOT_QUERIES = [
+    ("login", "users", {"email": _EMAIL}, None),
+    ("profile", "profiles", {"email": _EMAIL}, None),
+    ("steps today", "steps", {"email": _EMAIL, "date": _DAY}, None),
+    ("step history", "steps", {"email": _EMAIL, "date": {"$gte": _DAY, "$lte": "2025-01-30"}}, None),
+    ("sleep history", "sleep", {"user": _EMAIL}, [("date", DESCENDING)]),
+    ("meals in window", "meals", {"user": _EMAIL, "date": {"$gte": _DAY, "$lt": "2025-01-08"}}, [("date", ASCENDING)]),
+    ("nutrition days", "nutrition_daily", {"user": _EMAIL, "date": {"$gte": _DAY, "$lte": "2025-01-07"}},
+     [("date", ASCENDING)]),
+    ("nutrition totals", "nutrition_totals", {"user": _EMAIL}, None),
+    ("user challenge", "user_challenges", {"email": _EMAIL, "challenge_name": "Sleep Tracker"}, None),
+    ("my challenges", "user_challenges", {"email": _EMAIL}, None),
+    ("leaderboard", "user_challenges", {"challenge_name": "Sleep Tracker"},
+     [("progress", DESCENDING), ("_id", ASCENDING)]),
+    ("challenge", "challenges", {"name": "Sleep Tracker"}, None),
+    ("notifications", "notifications", {"user": _EMAIL}, None),
+    ("achievements", "achievements", {"user": _EMAIL}, None),
+    ("like achievement", "achievements", {"title": "🎖 Well-Rested Badge", "user": _EMAIL}, None),
+    ("progress", "progress", {"user": _EMAIL}, None),
+    ("group", "groups", {"name": "Runners"}, None),
+    ("my groups", "groups", {"members": _EMAIL}, None),
+    ("group posts", "group_posts", {"group": "Runners"}, [("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ("post by content", "group_posts", {"group": "Runners", "content": "Morning run"}, [("created_at", ASCENDING)]),
+]
+
+
+def index_name(spec):
+    """The name MongoDB gives an index on these keys when none is specified."""
+    return "_".join(f"{field}_{direction}" for field, direction in spec["keys"])
+
+
+def plan(collection, specs):
+    """(missing, conflicting, unknown) for one collection.
+
+    missing and conflicting are specs; conflicting ones exist under the same
+    name with different keys or uniqueness. unknown are names of indexes
+    the spec does not mention (other than _id_).
+    """
+    existing = collection.index_information()
+    missing, conflicting = [], []
+    for spec in specs:
+        info = existing.get(index_name(spec))
+        if info is None:
+            missing.append(spec)
+        elif [tuple(key) for key in info["key"]] != [tuple(key) for key in spec["keys"]] \
+                or bool(info.get("unique")) != spec["unique"]:
+            conflicting.append(spec)
+    wanted = {index_name(spec) for spec in specs} | {"_id_"}
+    unknown = sorted(name for name in existing if name not in wanted)
+    return missing, conflicting, unknown
+
+
+def apply(db, indexes=INDEXES, replace=False, dry_run=False, log=print):
+    """Create the indexes of the spec that are missing; returns the number of failures."""
+    failures = 0
+    for name, specs in indexes.items():
+        collection = db[name]
+        missing, conflicting, unknown = plan(collection, specs)
+        for extra in unknown:
+            log(f"ℹ️ {name}.{extra} is not in the spec, leaving it")
+        for spec in conflicting:
+            if replace:
+                log(f"♻️ {name}.{index_name(spec)}: options differ, rebuilding")
+                if not dry_run:
+                    collection.drop_index(index_name(spec))
+                missing.append(spec)
+            else:
+                log(f"⚠️ {name}.{index_name(spec)} exists with other options (use --replace)")
+                failures += 1
+        for spec in missing:
+            log(f"➕ {name}.{index_name(spec)}{' (unique)' if spec['unique'] else ''}")
+            if dry_run:
+                continue
+            try:
+                collection.create_indexes([IndexModel(spec["keys"], unique=spec["unique"])])
+            except OperationFailure as e:
+                failures += 1
+                if e.code == DUPLICATE_KEY:
+                    log(f"❌ {name}.{index_name(spec)}: duplicate keys, clean them up first ({e.details.get('errmsg')})")
+                else:
+                    log(f"❌ {name}.{index_name(spec)}: {e}")
+    return failures
+
+
+def plan_stages(explain):
+    """Every stage name in the winning plan of an explain() result."""
+    stages = []
+    pending = [explain["queryPlanner"]["winningPlan"]]
+    while pending:
+        node = pending.pop()
+        # Slot-based engine plans nest the classic tree under queryPlan.
+        node = node.get("queryPlan", node)
+        if "stage" in node:
+            stages.append(node["stage"])
+        if "inputStage" in node:
+            pending.append(node["inputStage"])
+        pending.extend(node.get("inputStages", []))
+    return stages
+
+
+def explain(db, collection, query, sort=None):
+    cursor = db[collection].find(query)
+    if sort:
+        cursor = cursor.sort(sort)
+    return cursor.explain()
+
+
+def check(db, queries=HOT_QUERIES, log=print):
+    """Names of the hot queries whose winning plan scans the collection."""
+    scans = []
+    for name, collection, query, sort in queries:
+        stages = plan_stages(explain(db, collection, query, sort))
+        if "COLLSCAN" in stages:
+            scans.append(name)
+        log(f"{'❌' if 'COLLSCAN' in stages else '✅'} {name}: {' <- '.join(stages)}")
+    return scans
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply the MongoDB index spec")
+    parser.add_argument("--dry-run", action="store_true", help="only print what would change")
+    parser.add_argument("--replace", action="store_true", help="rebuild indexes whose options differ from the spec")
+    parser.add_argument("--check", action="store_true", help="explain the hot queries instead, fail on a COLLSCAN")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    import data_access
+
+    if args.check:
+        scans = check(data_access.db)
+        if scans:
+            print(f"❌ Collection scans: {', '.join(scans)}")
+            sys.exit(1)
+        print("✅ Every hot query uses an index")
+    else:
+        failures = apply(data_access.db, replace=args.replace, dry_run=args.dry_run)
+        if failures:
+            print(f"❌ {failures} index(es) could not be applied")
+            sys.exit(1)
+        print("✅ Indexes match the spec")
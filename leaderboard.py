@@ -0,0 +1,64 @@
+"""Challenge leaderboards, ranked and paged in the database.
+
+A page is one aggregation on user_challenges: match the challenge, sort by
+progress (ties by _id) along the {challenge_name, progress, _id} index,
+stop after ``limit`` entries and join the usernames from users for just
+those. Pages are keyset-paginated: the cursor carries the last entry's
+(progress, _id) and rank, so page 200 costs the same as page 1 however many
+users joined the challenge.
+"""
+import base64
+
+from bson import json_util
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+def encode_cursor(entry, rank):
+    # json_util keeps the _id's BSON type (ObjectId as {"$oid": ...}) across the round trip.
+    state = {"p": entry.get("progress", 0), "id": entry["_id"], "r": rank}
+    return base64.urlsafe_b64encode(json_util.dumps(state, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """(progress, _id, rank) of the entry a page starts after; ValueError if malformed."""
+    try:
+        state = json_util.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        progress, _id, rank = state["p"], state["id"], int(state["r"])
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError("invalid leaderboard cursor") from e
+    if not isinstance(progress, (int, float)) or isinstance(progress, bool):
+        raise ValueError("invalid leaderboard cursor")
+    return progress, _id, rank
+
+
+def pipeline(challenge_name, limit=DEFAULT_LIMIT, after=None):
+    match = {"challenge_name": challenge_name}
+    if after is not None:
+        progress, _id, _ = after
+        match["$or"] = [{"progress": {"$lt": progress}}, {"progress": progress, "_id": {"$gt": _id}}]
+    return [
+        {"$match": match},
+        {"$sort": {"progress": -1, "_id": 1}},
+        {"$limit": limit + 1},
+        {"$lookup": {"from": "users", "localField": "email", "foreignField": "email", "as": "user"}},
+        {"$project": {
+            "progress": 1,
+            "username": {"$ifNull": [{"$arrayElemAt": ["$user.username", 0]}, "$email"]},
+        }},
+    ]
+
+
+def page(user_challenges_collection, challenge_name, limit=DEFAULT_LIMIT, cursor=None):
+    """(entries, next_cursor) for one page; entries are {rank, username, progress}."""
+    after = decode_cursor(cursor) if cursor else None
+    rows = list(user_challenges_collection.aggregate(pipeline(challenge_name, limit, after)))
+    rank = after[2] if after else 0
+
+    entries = []
+    for row in rows[:limit]:
+        rank += 1
+        entries.append({"rank": rank, "username": row["username"], "progress": row.get("progress", 0)})
+    next_cursor = encode_cursor(rows[limit - 1], rank) if len(rows) > limit else None
+    return entries, next_cursor
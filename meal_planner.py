@@ -0,0 +1,205 @@
+import itertools
+import os
+import time
+from functools import lru_cache
+
+import numpy as np
+
+# (meal, share of daily calories); snacks appear twice and are returned as a list.
+MEAL_SHARES = (
+    ("breakfast", 0.25),
+    ("lunch", 0.35),
+    ("dinner", 0.30),
+    ("snacks", 0.05),
+    ("snacks", 0.05),
+)
+FOODS_PER_MEAL = (2, 3, 4)
+PORTIONS = (0.25, 0.5, 1.0, 1.5, 2.0)
+CANDIDATES = 10
+BEST_COMBINATIONS = 5
+LATENCY_BUDGET_MS = float(os.getenv("MEAL_COMPOSER_BUDGET_MS", 50))
+
+
+def macro_targets(calories, macros):
+    """(calories, protein g, carbs g, fat g) targets for meals of the given calories.
+
+    calories may be a scalar or an array; the result has a trailing axis of 4.
+    """
+    calories = np.asarray(calories, dtype=np.float64)
+    return np.stack([
+        calories,
+        calories * macros['protein'] / 4,
+        calories * macros['carbs'] / 4,
+        calories * macros['fat'] / 9,
+    ], axis=-1)
+
+
+def macro_error(totals, targets):
+    """Mean absolute relative error over calories, protein, carbs and fat."""
+    targets = np.asarray(targets, dtype=np.float64)
+    return np.mean(np.abs(np.asarray(totals) - targets) / np.maximum(targets, 1e-9), axis=-1)
+
+
+@lru_cache(maxsize=None)
+def _combinations(n, size):
+    return np.array(list(itertools.combinations(range(n), size)), dtype=np.int64).reshape(-1, size)
+
+
+@lru_cache(maxsize=None)
+def _portion_grid(portions, size):
+    return np.array(list(itertools.product(portions, repeat=size)), dtype=np.float64)
+
+
+class MealComposer:
+    """Composes meals that hit a macro target with 2-4 foods and portion multipliers.
+
+    Features are the four macros divided by their standard deviation over the
+    food table, so calories no longer dominate protein/carbs/fat. For a target
+    the composer keeps the ``candidates`` foods whose macro mix is closest to
+    the target's (cosine over the scaled features), then scores every
+    combination of 2, 3 and 4 of them under every portion assignment in one
+    NumPy pass per combination size, ranked by relative squared error.
+
+    Sizes are tried smallest first; once ``budget_ms`` is spent the best
+    combinations found so far are returned.
+    """
+
+    def __init__(self, food_table, sizes=FOODS_PER_MEAL, portions=PORTIONS,
+                 candidates=CANDIDATES, budget_ms=LATENCY_BUDGET_MS):
+        self.food_table = food_table
+        self.sizes = tuple(sizes)
+        self.portions = tuple(portions)
+        self.candidates = candidates
+        self.budget_ms = budget_ms
+
+        macros = np.asarray(food_table.macros, dtype=np.float64)
+        scale = macros.std(axis=0) if len(macros) else np.ones(macros.shape[1])
+        self.scale = np.where(scale > 0, scale, 1.0)
+        self.features = macros / self.scale
+        norms = np.linalg.norm(self.features, axis=1)
+        self.directions = self.features / np.where(norms > 0, norms, 1.0)[:, None]
+
+    def candidate_rows(self, target, mask=None):
+        """Nearest foods to the target's macro mix, among the rows allowed by mask.
+
+        The mask is applied before ranking, so a user's restrictions never
+        need a model refit; the cost is one (n, 4) mat-vec plus argpartition.
+        """
+        target = np.asarray(target, dtype=np.float64) / self.scale
+        similarity = self.directions @ (target / max(np.linalg.norm(target), 1e-12))
+        n = min(self.candidates, len(similarity))
+        if mask is not None:
+            similarity[~mask] = -np.inf
+            n = min(n, int(np.count_nonzero(mask)))
+        top = np.argpartition(-similarity, n - 1)[:n] if n else np.empty(0, dtype=np.int64)
+        return top[np.argsort(-similarity[top], kind="stable")]
+
+    def compose(self, target, n_best=BEST_COMBINATIONS, mask=None):
+        """The n_best (rows, portions, error) combinations for one target, best first.
+
+        Only foods allowed by ``mask`` are used; no foods allowed means no combinations.
+        """
+        deadline = time.perf_counter() + self.budget_ms / 1000
+        target = np.asarray(target, dtype=np.float64)
+        scaled_target = target / self.scale
+        target_norm = max(float(scaled_target @ scaled_target), 1e-12)  # errors are relative to it
+        rows = self.candidate_rows(target, mask)
+        features = self.features[rows]
+
+        best = []
+        for size in self.sizes:
+            if size > len(rows):
+                break
+            if best and time.perf_counter() > deadline:
+                break
+            combos = _combinations(len(rows), size)
+            grid = _portion_grid(self.portions, size)
+            # ||grid[p] @ F_m - t||^2 expanded, so the (combos, portions, 4)
+            # totals tensor is never materialised.
+            combo_features = features[combos]
+            gram = np.matmul(combo_features, combo_features.transpose(0, 2, 1))
+            quadratic = np.einsum("ps,mst,pt->mp", grid, gram, grid, optimize=True)
+            errors = (quadratic - 2 * (combo_features @ scaled_target) @ grid.T) / target_norm + 1.0
+
+            k = min(n_best, errors.size)
+            flat = np.argpartition(errors, k - 1, axis=None)[:k]
+            for m, p in zip(*np.unravel_index(flat, errors.shape)):
+                best.append((rows[combos[m]], grid[p], float(errors[m, p])))
+
+        if not best and len(rows):
+            portions = np.ones(1)
+            error = float(((features[0] - scaled_target) ** 2).sum() / target_norm)
+            best.append((rows[:1], portions, error))
+
+        best.sort(key=lambda combo: combo[2])
+        return best[:n_best]
+
+
+class MealPlanner:
+    """Builds meal plans from the food table with vectorized meal composition.
+
+    Every meal target of every requested day is a row of one targets matrix.
+    Only the distinct targets are composed (a plan has at most four, however
+    many days it spans); each meal then takes one of its target's best
+    combinations at random, so days differ without giving up accuracy.
+    """
+
+    def __init__(self, food_table, composer=None, rng=None, mask=None):
+        self.food_table = food_table
+        self.composer = composer if composer is not None else MealComposer(food_table)
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.mask = mask
+
+    def select(self, targets):
+        """(rows, portions) of the foods chosen for each target row."""
+        targets = np.atleast_2d(np.asarray(targets, dtype=np.float64))
+        unique, inverse = np.unique(targets, axis=0, return_inverse=True)
+        options = [self.composer.compose(target, mask=self.mask) for target in unique]
+        if not all(options):
+            raise ValueError("No foods match the dietary restrictions")
+        selected = []
+        for i in np.ravel(inverse):
+            rows, portions, _ = options[i][self.rng.integers(len(options[i]))]
+            selected.append((rows, portions))
+        return selected
+
+    def meals(self, targets):
+        """One meal dict per target row."""
+        meals = []
+        for rows, portions in self.select(targets):
+            served = self.food_table.macros[rows] * portions[:, None]
+            totals = served.sum(axis=0).tolist()
+            foods = self.food_table.records(rows.tolist())
+            for food, portion, values in zip(foods, portions.tolist(), served.tolist()):
+                food.update(calories=values[0], protein=values[1], carbs=values[2], fat=values[3], portion=portion)
+            meals.append({
+                'foods': foods,
+                'total_calories': totals[0],
+                'total_protein': totals[1],
+                'total_carbs': totals[2],
+                'total_fat': totals[3],
+            })
+        return meals
+
+    def plan(self, daily_calories, macros, days=1):
+        """A list of ``days`` daily plans; each distinct meal target is composed once."""
+        shares = np.array([share for _, share in MEAL_SHARES])
+        targets = macro_targets(np.tile(daily_calories * shares, days), macros)
+        meals = self.meals(targets)
+
+        plans = []
+        for day in range(days):
+            day_meals = meals[day * len(MEAL_SHARES):(day + 1) * len(MEAL_SHARES)]
+            plan = {}
+            for (name, _), meal in zip(MEAL_SHARES, day_meals):
+                if name == 'snacks':
+                    plan.setdefault('snacks', []).append(meal)
+                else:
+                    plan[name] = meal
+            plan['total_calories'] = sum(
+                meal['total_calories']
+                for meal in plan.values()
+                if isinstance(meal, dict)
+            )
+            plans.append(plan)
+        return plans
@@ -0,0 +1,86 @@
+import os
+import threading
+import time
+from collections import namedtuple
+
+from artifacts import file_digest
+
+LoadedModel = namedtuple("LoadedModel", ["model", "version", "path", "loaded_at"])
+
+
+def _joblib_load(path):
+    import joblib
+    return joblib.load(path)
+
+
+class ModelRegistry:
+    """Keeps one loaded model artifact per worker and hot-swaps it when the file changes.
+
+    The artifact is stat()ed at most every ``check_interval`` seconds. A changed
+    mtime/size triggers a content hash, and only a new hash triggers a reload.
+    The new model is loaded off to the side and published with a single
+    reference assignment, so in-flight requests keep the model they started with.
+    """
+
+    def __init__(self, path, loader=_joblib_load, check_interval=5.0):
+        self.path = path
+        self.loader = loader
+        self.check_interval = check_interval
+        self._current = None
+        self._stat = None
+        self._next_check = 0.0
+        self._missing_logged = False
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        return self._current.version if self._current else None
+
+    def get(self):
+        """Return the current LoadedModel, reloading first if the artifact changed."""
+        now = time.monotonic()
+        if now >= self._next_check:
+            self.refresh(now)
+        if self._current is None:
+            raise FileNotFoundError(f"Model artifact not available at {self.path}")
+        return self._current
+
+    def refresh(self, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if now < self._next_check:
+                return self._current
+            # Throttled even while nothing is loaded, so a missing artifact costs one stat per interval.
+            self._next_check = now + self.check_interval
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                if self._current is None and not self._missing_logged:
+                    print(f"❌ Model file not found at {self.path}")
+                    self._missing_logged = True
+                return self._current
+            self._missing_logged = False
+
+            stat_key = (st.st_mtime_ns, st.st_size)
+            if stat_key == self._stat:
+                return self._current
+
+            version = file_version(self.path)
+            if self._current is not None and version == self._current.version:
+                self._stat = stat_key
+                return self._current
+
+            try:
+                model = self.loader(self.path)
+            except Exception as e:
+                print(f"❌ ERROR: Model {self.path} could not be loaded: {e}")
+                return self._current
+
+            self._stat = stat_key
+            self._current = LoadedModel(model, version, self.path, time.time())
+            print(f"✅ Model {os.path.basename(self.path)} version {version} loaded")
+            return self._current
+
+
+def file_version(path):
+    return file_digest(path)[:12]
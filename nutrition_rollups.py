@@ -0,0 +1,168 @@
+"""Per-day nutrition totals, maintained as meals are logged.
+
+``nutrition_daily`` holds one document per (user, UTC day) and
+``nutrition_totals`` one per user, each with the summed ``nutrition`` of the
+meals logged and a ``meals`` count. log_meal bumps both with ``$inc``, so
+reading a day, a week or a lifetime touches at most seven documents however
+many meals the user has logged.
+
+    python nutrition_rollups.py             # rebuild every rollup from the meals collection
+    python nutrition_rollups.py --if-empty  # only if there are no rollups yet (start.sh)
+
+The backfill recounts from scratch: it replaces the rollup of every
+(user, day) that has meals, then deletes the rollups it did not write (days
+whose meals were all deleted, users with no dated meals left). Every rollup
+records in ``since`` when it started counting, so rollups that log_meal
+creates while the backfill runs are kept. It is safe to re-run to repair
+drift. Meals logged while it runs can be counted twice or not at all;
+re-run it after the first deploy settles.
+"""
+import argparse
+from datetime import datetime, timedelta
+
+from pymongo import ASCENDING, ReplaceOne
+
+NUTRIENTS = ("calories", "protein", "carbs", "fats")
+PERIODS = {"day": 1, "week": 7}
+BATCH_SIZE = 1000
+
+
+def empty_totals():
+    return {nutrient: 0 for nutrient in NUTRIENTS}
+
+
+def ensure_indexes(daily_collection, totals_collection):
+    daily_collection.create_index([("user", ASCENDING), ("date", ASCENDING)], unique=True)
+    totals_collection.create_index([("user", ASCENDING)], unique=True)
+
+
+def record_meal(daily_collection, totals_collection, user, logged_at, nutrition):
+    """Add one logged meal's nutrition to the user's day and lifetime rollups."""
+    inc = {f"nutrition.{nutrient}": nutrition.get(nutrient, 0) for nutrient in NUTRIENTS}
+    inc["meals"] = 1
+    update = {"$inc": inc, "$setOnInsert": {"since": datetime.utcnow()}}
+    daily_collection.update_one({"user": user, "date": logged_at.strftime("%Y-%m-%d")}, update, upsert=True)
+    totals_collection.update_one({"user": user}, update, upsert=True)
+
+
+def window(period, end):
+    """(start, end) dates of the ``period`` ending on ``end``, both inclusive."""
+    return end - timedelta(days=PERIODS[period] - 1), end
+
+
+def daily_totals(daily_collection, user, start, end):
+    """Rollups for each day in [start, end] with meals logged, oldest first."""
+    return list(daily_collection.find(
+        {"user": user, "date": {"$gte": str(start), "$lte": str(end)}},
+        {"_id": 0, "date": 1, "nutrition": 1, "meals": 1},
+    ).sort("date", ASCENDING))
+
+
+def window_totals(daily_collection, user, start, end):
+    """(nutrition, meals, days) summed over [start, end]."""
+    days = daily_totals(daily_collection, user, start, end)
+    totals = empty_totals()
+    for day in days:
+        for nutrient in NUTRIENTS:
+            totals[nutrient] += day.get("nutrition", {}).get(nutrient, 0)
+    return totals, sum(day.get("meals", 0) for day in days), days
+
+
+def lifetime_totals(totals_collection, user, meal_collection=None):
+    """(nutrition, meals) over every meal the user has logged; meals is 0 if none.
+
+    Without a rollup document (meals logged before the rollups were
+    backfilled) the user's meals are summed instead, if meal_collection is given.
+    """
+    doc = totals_collection.find_one({"user": user}, {"_id": 0, "nutrition": 1, "meals": 1})
+    if not doc:
+        return meal_totals(meal_collection, user) if meal_collection is not None else (empty_totals(), 0)
+    return {**empty_totals(), **doc.get("nutrition", {})}, doc.get("meals", 0)
+
+
+def meal_totals(meal_collection, user):
+    """(nutrition, meals) summed over the user's meals in the database."""
+    totals = next(meal_collection.aggregate([
+        {"$match": {"user": user}},
+        {"$group": {"_id": None, "meals": {"$sum": 1}, **_sum_nutrition()}},
+    ]), None)
+    if not totals:
+        return empty_totals(), 0
+    return {nutrient: totals[nutrient] for nutrient in NUTRIENTS}, totals["meals"]
+
+
+def _sum_nutrition():
+    return {nutrient: {"$sum": {"$ifNull": [f"$nutrition.{nutrient}", 0]}} for nutrient in NUTRIENTS}
+
+
+def _flush(collection, ops):
+    if ops:
+        collection.bulk_write(ops, ordered=False)
+    return []
+
+
+def backfill(meal_collection, daily_collection, totals_collection, batch_size=BATCH_SIZE):
+    """Recompute every rollup from the meals collection; returns (users, days) written.
+
+    The grouping runs in the database and the results are written back with
+    unordered bulk upserts of ``batch_size`` documents. Rollups counted
+    before this run started and not rewritten by it are deleted.
+    """
+    ensure_indexes(daily_collection, totals_collection)
+    started = datetime.utcnow()
+    days = meal_collection.aggregate([
+        {"$match": {"date": {"$type": "string"}}},
+        {"$group": {
+            "_id": {"user": "$user", "date": {"$substr": ["$date", 0, 10]}},
+            "meals": {"$sum": 1},
+            **_sum_nutrition(),
+        }},
+    ], allowDiskUse=True)
+
+    lifetime, ops, n_days = {}, [], 0
+    for day in days:
+        user, date = day["_id"]["user"], day["_id"]["date"]
+        nutrition = {nutrient: day[nutrient] for nutrient in NUTRIENTS}
+        ops.append(ReplaceOne(
+            {"user": user, "date": date},
+            {"user": user, "date": date, "nutrition": nutrition, "meals": day["meals"], "since": started},
+            upsert=True,
+        ))
+        totals = lifetime.setdefault(user, {"nutrition": empty_totals(), "meals": 0})
+        for nutrient in NUTRIENTS:
+            totals["nutrition"][nutrient] += nutrition[nutrient]
+        totals["meals"] += day["meals"]
+        n_days += 1
+        if len(ops) >= batch_size:
+            ops = _flush(daily_collection, ops)
+    ops = _flush(daily_collection, ops)
+
+    for user, totals in lifetime.items():
+        ops.append(ReplaceOne({"user": user}, {"user": user, **totals, "since": started}, upsert=True))
+        if len(ops) >= batch_size:
+            ops = _flush(totals_collection, ops)
+    _flush(totals_collection, ops)
+
+    stale = {"$or": [{"since": {"$lt": started}}, {"since": {"$exists": False}}]}
+    daily_collection.delete_many(stale)
+    totals_collection.delete_many(stale)
+    return len(lifetime), n_days
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the daily nutrition rollups from logged meals")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--if-empty", action="store_true", help="skip if any lifetime rollup already exists")
+    args = parser.parse_args()
+
+    from app import meal_collection, nutrition_daily_collection, nutrition_totals_collection
+
+    if args.if_empty and nutrition_totals_collection.find_one({}, {"_id": 1}):
+        print("✅ Nutrition rollups already built")
+        raise SystemExit(0)
+
+    started = datetime.utcnow()
+    users, days = backfill(meal_collection, nutrition_daily_collection, nutrition_totals_collection,
+                           args.batch_size)
+    elapsed = (datetime.utcnow() - started).total_seconds()
+    print(f"✅ Rebuilt nutrition rollups for {users} users, {days} days in {elapsed:.1f}s")
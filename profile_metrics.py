@@ -0,0 +1,179 @@
+"""Derived profile metrics (BMI and daily calories) and the batch job that recomputes them.
+
+The formulas work on NumPy arrays, so the same code serves one profile in
+store_profile/edit_profile and a whole batch in the recompute job. Each
+profile records the ``metrics_version`` it was computed with; changing a
+formula means bumping its version and running
+
+    python profile_metrics.py --max-rate 2000     # profiles per second
+
+which pages through profiles by _id, recomputes a batch at a time and writes
+the changes back with one bulk_write per batch. Progress is checkpointed
+after every batch, so an interrupted run resumes where it stopped (--restart
+starts over). The formula is chosen with PROFILE_METRICS_FORMULA.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+from pymongo import ASCENDING, UpdateOne
+
+ACTIVITY_MULTIPLIERS = {
+    "sedentary": 1.2,
+    "light": 1.375,
+    "moderate": 1.55,
+    "active": 1.725,
+    "very_active": 1.9,
+}
+DEFAULT_ACTIVITY = "sedentary"
+
+# Bump a formula's version whenever its output changes.
+FORMULA_VERSIONS = {"base": 1, "mifflin_st_jeor": 1}
+FORMULA = os.getenv("PROFILE_METRICS_FORMULA", "base")
+
+BATCH_SIZE = 500
+PROJECTION = {"weight": 1, "height": 1, "age": 1, "gender": 1, "activity_level": 1,
+              "bmi": 1, "daily_calories": 1, "metrics_version": 1, "profile_version": 1}
+
+
+def metrics_version(formula=FORMULA):
+    return f"{formula}-v{FORMULA_VERSIONS[formula]}"
+
+
+def bmi(weight_kg, height_cm):
+    height_m = np.asarray(height_cm, dtype=np.float64) / 100
+    return np.round(np.asarray(weight_kg, dtype=np.float64) / height_m ** 2, 2)
+
+
+def daily_calories(weight_kg, height_cm, age, female, activity, formula=FORMULA):
+    """Daily calorie needs.
+
+    "base" is the original weight x 22 kcal (x 0.9 for women) and ignores
+    activity; "mifflin_st_jeor" is BMR (10 w + 6.25 h - 5 a + 5, or - 161 for
+    women) times the activity multiplier.
+    """
+    weight_kg = np.asarray(weight_kg, dtype=np.float64)
+    female = np.asarray(female, dtype=bool)
+    if formula == "base":
+        return weight_kg * 22 * np.where(female, 0.9, 1.0)
+    if formula == "mifflin_st_jeor":
+        bmr = 10 * weight_kg + 6.25 * np.asarray(height_cm, dtype=np.float64) - 5 * np.asarray(age, dtype=np.float64)
+        return (bmr + np.where(female, -161.0, 5.0)) * np.asarray(activity, dtype=np.float64)
+    raise ValueError(f"Unknown formula: {formula}")
+
+
+def _number(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return np.nan
+    return value if value > 0 else np.nan
+
+
+def compute(profiles, formula=FORMULA):
+    """(valid, bmi, daily_calories) arrays for a batch of profile documents.
+
+    Profiles without a positive weight and height are not valid; a missing
+    age or activity level only matters to formulas that use them.
+    """
+    weight = np.array([_number(p.get("weight")) for p in profiles], dtype=np.float64)
+    height = np.array([_number(p.get("height")) for p in profiles], dtype=np.float64)
+    age = np.array([_number(p.get("age")) for p in profiles], dtype=np.float64)
+    female = np.array([str(p.get("gender", "")).lower() == "female" for p in profiles], dtype=bool)
+    activity = np.array([ACTIVITY_MULTIPLIERS.get(p.get("activity_level"), ACTIVITY_MULTIPLIERS[DEFAULT_ACTIVITY])
+                         for p in profiles], dtype=np.float64)
+
+    valid = ~np.isnan(weight) & ~np.isnan(height)
+    if formula == "mifflin_st_jeor":
+        valid &= ~np.isnan(age)
+    with np.errstate(invalid="ignore"):
+        return valid, bmi(weight, height), daily_calories(weight, height, age, female, activity, formula)
+
+
+def for_profile(profile, formula=FORMULA):
+    """{"bmi", "daily_calories", "metrics_version"} for one profile, or None if it can't be computed."""
+    valid, bmis, calories = compute([profile], formula)
+    if not valid[0]:
+        return None
+    return {"bmi": float(bmis[0]), "daily_calories": float(calories[0]), "metrics_version": metrics_version(formula)}
+
+
+def batch_updates(profiles, formula=FORMULA):
+    """UpdateOne operations for the profiles of a batch whose metrics are stale.
+
+    Each update is conditional on the profile_version read, so a profile
+    edited meanwhile is left to the edit. Changed values bump profile_version
+    so cached meal plans are regenerated.
+    """
+    version = metrics_version(formula)
+    valid, bmis, calories = compute(profiles, formula)
+    ops = []
+    for profile, ok, new_bmi, new_calories in zip(profiles, valid, bmis.tolist(), calories.tolist()):
+        if not ok:
+            continue
+        changed = profile.get("bmi") != new_bmi or profile.get("daily_calories") != new_calories
+        if not changed and profile.get("metrics_version") == version:
+            continue
+        update = {"$set": {"bmi": new_bmi, "daily_calories": new_calories, "metrics_version": version}}
+        if changed:
+            update["$inc"] = {"profile_version": 1}
+        ops.append(UpdateOne({"_id": profile["_id"], "profile_version": profile.get("profile_version")}, update))
+    return ops
+
+
+def recompute(profiles_collection, checkpoints_collection, formula=FORMULA, batch_size=BATCH_SIZE,
+              max_rate=None, restart=False, log=print, clock=time.monotonic, sleep=time.sleep):
+    """Bring every profile's metrics up to ``formula``; returns {"scanned", "updated", "seconds"}.
+
+    Batches are read with keyset pagination on _id rather than one long
+    cursor, and the last _id is checkpointed per formula version. max_rate
+    caps the profiles scanned per second.
+    """
+    job_id = f"profile_metrics:{metrics_version(formula)}"
+    state = {} if restart else (checkpoints_collection.find_one({"_id": job_id}) or {})
+    last_id = state.get("last_id")
+    scanned = updated = 0
+    started = clock()
+
+    while True:
+        query = {} if last_id is None else {"_id": {"$gt": last_id}}
+        batch = list(profiles_collection.find(query, PROJECTION).sort("_id", ASCENDING).limit(batch_size))
+        if not batch:
+            break
+        ops = batch_updates(batch, formula)
+        if ops:
+            updated += profiles_collection.bulk_write(ops, ordered=False).modified_count
+        scanned += len(batch)
+        last_id = batch[-1]["_id"]
+        checkpoints_collection.update_one(
+            {"_id": job_id},
+            {"$set": {"last_id": last_id}, "$inc": {"scanned": len(batch), "updated": len(ops)}},
+            upsert=True,
+        )
+
+        elapsed = clock() - started
+        if max_rate:
+            ahead = scanned / max_rate - elapsed
+            if ahead > 0:
+                sleep(ahead)
+                elapsed += ahead
+        log(f"📊 {scanned} profiles scanned, {updated} updated ({scanned / max(elapsed, 1e-9):.0f}/s)")
+
+    checkpoints_collection.update_one({"_id": job_id}, {"$set": {"finished": True}}, upsert=True)
+    return {"scanned": scanned, "updated": updated, "seconds": clock() - started}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute derived profile metrics in bulk")
+    parser.add_argument("--formula", default=FORMULA, choices=sorted(FORMULA_VERSIONS))
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--max-rate", type=float, help="profiles per second")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and rescan every profile")
+    args = parser.parse_args()
+
+    from app import db, profiles_collection
+
+    result = recompute(profiles_collection, db.job_checkpoints, args.formula, args.batch_size,
+                       args.max_rate, args.restart)
+    print(f"✅ {result['scanned']} profiles scanned, {result['updated']} updated in {result['seconds']:.1f}s")
@@ -0,0 +1,77 @@
+import threading
+import time
+
+
+class ResourceRegistry:
+    """Lazily built, per-worker resources (datasets, indexes, models).
+
+    Each resource is built by its registered builder the first time it is
+    requested and then published into ``namespace`` (normally the ``app``
+    module globals), so ``app.food_table`` and friends keep working and can still
+    be monkeypatched in tests.
+    """
+
+    def __init__(self, namespace=None):
+        self._namespace = namespace if namespace is not None else {}
+        self._builders = {}
+        self._lock = threading.RLock()
+        self.timings = {}
+
+    def resource(self, name):
+        def decorator(builder):
+            self._builders[name] = builder
+            return builder
+        return decorator
+
+    def __contains__(self, name):
+        return name in self._builders
+
+    def names(self):
+        return list(self._builders)
+
+    def loaded(self, name):
+        return name in self._namespace
+
+    def get(self, name):
+        try:
+            return self._namespace[name]
+        except KeyError:
+            pass
+
+        with self._lock:
+            if name not in self._namespace:
+                if name not in self._builders:
+                    raise KeyError(f"Unknown resource: {name}")
+                start = time.perf_counter()
+                value = self._builders[name]()
+                self.timings[name] = time.perf_counter() - start
+                self._namespace[name] = value
+            return self._namespace[name]
+
+    def set(self, name, value):
+        with self._lock:
+            self._namespace[name] = value
+
+    def reset(self, name=None):
+        with self._lock:
+            for key in ([name] if name else self.names()):
+                self._namespace.pop(key, None)
+                self.timings.pop(key, None)
+
+    def warm_up(self, names=None, background=False):
+        """Build the given resources (all of them by default) ahead of the first request."""
+        names = list(names) if names else self.names()
+
+        def run():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    print(f"⚠ Warm-up of '{name}' failed: {e}")
+
+        if background:
+            thread = threading.Thread(target=run, name="resource-warm-up", daemon=True)
+            thread.start()
+            return thread
+        run()
+        return None
@@ -1,5 +1,17 @@
 #!/bin/bash
 
+# Build the exercise neighbor index (no-op unless fitness_exercises.csv changed)
+python exercise_index.py --prune
+# Compile food_database.xlsx into the memory-mapped food table (no-op unless it changed)
+python food_table.py --prune
+
+# Create any MongoDB index from indexes.py that is missing (no-op when they all exist)
+python indexes.py
+# Move posts still embedded in groups into group_posts (no-op once none are left)
+python group_posts.py
+# Build the nutrition rollups from the logged meals on first deploy (no-op once they exist)
+python nutrition_rollups.py --if-empty
+
 # Start the Flask backend using Gunicorn
 echo "Starting Flask backend..."
-gunicorn -w 4 -b 0.0.0.0:10000 app:app
\ No newline at end of file
+gunicorn -c gunicorn.conf.py app:app
@@ -0,0 +1,125 @@
+import pytest
+import random
+from flask_jwt_extended import create_access_token
+from unittest.mock import patch
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from challenge_ranks import ChallengeRanks, RankBoards, SortedKeys
+from app import app, resources
+
+def test_sorted_keys_match_a_sorted_list():
+    rng = random.Random(0)
+    keys, expected = SortedKeys(load=4), []
+    for _ in range(2000):
+        key = (rng.randint(0, 50), rng.choice("abcdefgh"))
+        if expected and rng.random() < 0.4:
+            key = rng.choice(expected)
+            keys.remove(key)
+            expected.remove(key)
+        else:
+            keys.add(key)
+            expected.append(key)
+        expected.sort()
+        probe = (rng.randint(0, 50),)
+        assert keys.index(probe) == sum(k < probe for k in expected)
+    start = rng.randint(0, len(expected))
+    assert keys.slice(start, start + 7) == expected[start:start + 7]
+    assert keys.slice(-3, len(expected) + 3) == expected
+    with pytest.raises(KeyError):
+        keys.remove((99, "z"))
+
+def test_standing_ranks_ties_and_neighbors():
+    board = ChallengeRanks([("a", 10), ("b", 30), ("c", 20), ("d", 20), ("e", 5)])
+    standing = board.standing("d", neighbors=2)
+    assert standing["rank"] == 2 and standing["participants"] == 5
+    assert standing["percentile"] == 80.0
+    assert [(e["email"], e["rank"]) for e in standing["above"]] == [("c", 2), ("b", 1)]
+    assert [(e["email"], e["rank"]) for e in standing["below"]] == [("a", 4), ("e", 5)]
+    assert board.standing("b")["percentile"] == 100.0
+    assert board.standing("nobody") is None
+
+    board.set("e", 40)
+    board.remove("b")
+    assert board.standing("e")["rank"] == 1
+    assert board.standing("a")["rank"] == 4 and len(board) == 4
+
+class FakeUserChallenges:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection=None):
+        return iter(dict(doc) for doc in self.docs
+                          if query.get("challenge_name", doc["challenge_name"]) == doc["challenge_name"])
+
+def test_boards_load_all_and_replay_writes_during_refresh():
+    collection = FakeUserChallenges([{"challenge_name": "Steps", "email": f"{i}@x", "progress": i} for i in range(5)]
+                                    + [{"challenge_name": "Sleep", "email": "a@x", "progress": 3}])
+    now = [0.0]
+    boards = RankBoards(collection, refresh_seconds=60, clock=lambda: now[0])
+    assert boards.load_all() == 2
+    assert boards.standing("Steps", "4@x")["rank"] == 1
+
+    boards.set("Steps", "0@x", 10)
+    assert boards.standing("Steps", "0@x")["rank"] == 1
+
+    # Another worker moved 1@x ahead; a rebuild sees it, and keeps this worker's write made in between.
+    collection.docs[1]["progress"] = 50
+    original_load = boards._load
+
+    def load_with_write(name):
+        board = original_load(name)
+        boards.set("Steps", "2@x", 99)
+        return board
+    boards._load = load_with_write
+    now[0] = 61
+    boards.refresh("Steps")
+    assert boards.standing("Steps", "2@x")["rank"] == 1
+    assert boards.standing("Steps", "1@x")["rank"] == 2
+
+def test_unloaded_challenge_is_loaded_on_demand():
+    boards = RankBoards(FakeUserChallenges([{"challenge_name": "Steps", "email": "a@x", "progress": 1}]))
+    boards.set("Steps", "b@x", 5)  # not loaded yet: the write is in Mongo already
+    assert boards.standing("Steps", "a@x")["participants"] == 1
+
+def test_unknown_challenges_are_not_cached():
+    boards = RankBoards(FakeUserChallenges([{"challenge_name": "Steps", "email": "a@x", "progress": 1}]))
+    for i in range(100):
+        assert boards.standing(f"nope-{i}", "a@x") is None
+    assert boards.standing("Steps", "a@x")["rank"] == 1
+    assert list(boards._boards) == ["Steps"]
+
+@pytest.fixture
+def client():
+    app.config["TESTING"] = True
+    app.config["JWT_SECRET_KEY"] = "test_secret_key"
+    with app.test_client() as client:
+        yield client
+
+def auth_header(email="c@x"):
+    with app.app_context():
+        token = create_access_token(identity=email)
+    return {"Authorization": f"Bearer {token}"}
+
+@patch("app.users_collection.find")
+def test_my_rank_endpoint(mock_users, client):
+    boards = RankBoards(FakeUserChallenges([{"challenge_name": "Steps", "email": email, "progress": progress}
+                                            for email, progress in [("a@x", 1), ("b@x", 2), ("c@x", 3), ("d@x", 4)]]))
+    boards.load_all()
+    mock_users.return_value = [{"email": "d@x", "username": "dee"}]
+    resources.set("challenge_ranks", boards)
+    try:
+        response = client.get("/api/my-rank/Steps?neighbors=1", headers=auth_header())
+        assert response.status_code == 200
+        assert response.json["rank"] == 2 and response.json["percentile"] == 75.0
+        assert response.json["above"] == [{"username": "dee", "progress": 4, "rank": 1}]
+        assert response.json["below"] == [{"username": "b@x", "progress": 2, "rank": 3}]
+
+        with patch("app.user_challenges_collection.delete_one") as mock_delete:
+            mock_delete.return_value.deleted_count = 1
+            client.post("/api/leave-challenge", json={"challenge_name": "Steps"}, headers=auth_header())
+        assert client.get("/api/my-rank/Steps", headers=auth_header()).status_code == 404
+        assert client.get("/api/my-rank/Steps?neighbors=50", headers=auth_header()).status_code == 400
+    finally:
+        resources.reset("challenge_ranks")
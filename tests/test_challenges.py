@@ -86,23 +86,19 @@ def test_get_user_challenges(mock_find, client):
     assert res.json["challenges"][0]["progress"] == 10
 
 @patch("app.get_jwt_identity")
-@patch("app.user_challenges_collection.find_one")
-@patch("app.user_challenges_collection.update_one")
+@patch("app.user_challenges_collection.find_one_and_update")
 @patch("app.challenges_collection.find_one") 
-def test_update_challenge_progress(mock_challenge_find, mock_update, mock_user_find, mock_identity, client):
+def test_update_challenge_progress(mock_challenge_find, mock_update, mock_identity, client):
 
     mock_identity.return_value = "test@example.com"
     mock_challenge_find.return_value = {
         "name": "Water Challenge",
         "target": 30
     }
-    mock_user_find.return_value = {
-        "email": "test@example.com",
-        "challenge_name": "Water Challenge",
+    mock_update.return_value = {
         "progress": 10,
-        "target": 30
+        "completed": False
     }
-    mock_update.return_value.modified_count = 1
 
     res = client.post(
         "/api/update-challenge-progress",
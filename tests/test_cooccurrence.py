@@ -0,0 +1,112 @@
+import pytest
+import numpy as np
+from datetime import datetime, timedelta
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from cooccurrence import (build_cooccurrence, count_sessions, history_sessions, latest_path,
+                          load_cooccurrence, open_cooccurrence)
+
+N_ITEMS = 6
+DAY = datetime(2025, 3, 3)
+
+def row_for_id(ex_id):
+    return ex_id - 1 if isinstance(ex_id, int) and 1 <= ex_id <= N_ITEMS else None
+
+class FakeCursor(list):
+    def batch_size(self, n):
+        return self
+
+class FakeProfiles:
+    def __init__(self, profiles):
+        self.profiles = profiles
+
+    def find(self, query, projection=None):
+        return FakeCursor(self.profiles)
+
+def entry(ex_id, days, hours=9):
+    return {"exerciseId": ex_id, "timestamp": DAY + timedelta(days=days, hours=hours)}
+
+def dense_counts(profiles, since=None, until=None):
+    expected = np.zeros((N_ITEMS, N_ITEMS), dtype=np.int64)
+    for profile in profiles:
+        for rows in history_sessions(profile["workout_history"], row_for_id, since, until):
+            for i in set(rows):
+                for j in set(rows):
+                    expected[i, j] += 1
+    return expected
+
+@pytest.fixture
+def profiles():
+    rng = np.random.default_rng(7)
+    return [
+        {"workout_history": [entry(int(rng.integers(1, N_ITEMS + 1)), int(rng.integers(0, 10)), int(rng.integers(0, 24)))
+                             for _ in range(20)]}
+        for _ in range(30)
+    ] + [{"workout_history": [{"exerciseId": 1}, {"exerciseId": 2}, {"exerciseId": 99}]}]
+
+def test_history_sessions_group_by_day():
+    history = [entry(1, 0), entry(2, 0, 20), entry(1, 1), {"exerciseId": 3}, {"exerciseId": 4}, entry(999, 1)]
+    sessions = sorted(sorted(rows) for rows in history_sessions(history, row_for_id))
+    assert sessions == [[0], [0, 1], [2, 3]]
+
+    since = DAY + timedelta(days=1)
+    sessions = history_sessions(history, row_for_id, since, since + timedelta(days=1))
+    assert sessions == [[0]]
+
+def test_counts_match_dense_and_flush_size(profiles):
+    counts, stats = count_sessions(profiles, row_for_id, N_ITEMS)
+    small, _ = count_sessions(profiles, row_for_id, N_ITEMS, flush_pairs=5)
+
+    np.testing.assert_array_equal(counts.toarray(), dense_counts(profiles))
+    np.testing.assert_array_equal(small.toarray(), counts.toarray())
+    assert stats["profiles"] == len(profiles)
+
+def test_incremental_build_matches_full(tmp_path, profiles):
+    collection = FakeProfiles(profiles)
+    out = str(tmp_path / "cooc")
+
+    build_cooccurrence(collection, row_for_id, N_ITEMS, "v1", out, until=DAY + timedelta(days=4))
+    build_cooccurrence(collection, row_for_id, N_ITEMS, "v1", out, until=DAY + timedelta(days=8))
+    incremental = load_cooccurrence("v1", out)
+    assert incremental.meta["incremental_from"] == (DAY + timedelta(days=4)).isoformat()
+
+    full = open_cooccurrence(
+        build_cooccurrence(collection, row_for_id, N_ITEMS, "v1", str(tmp_path / "full"), full=True,
+                           until=DAY + timedelta(days=8))
+    )
+    np.testing.assert_array_equal(incremental.counts.toarray(), full.counts.toarray())
+    assert incremental.meta["sessions"] == full.meta["sessions"]
+    assert load_cooccurrence("v2", out) is None
+
+def test_registry_picks_up_incremental_builds(tmp_path, profiles):
+    from artifacts import prune
+    from cooccurrence import latest_pointer, open_latest
+    from model_registry import ModelRegistry
+    collection = FakeProfiles(profiles)
+    out = str(tmp_path / "cooc")
+    registry = ModelRegistry(latest_pointer("v1", out), loader=open_latest, check_interval=0)
+    with pytest.raises(FileNotFoundError):
+        registry.get()
+
+    first = build_cooccurrence(collection, row_for_id, N_ITEMS, "v1", out, until=DAY + timedelta(days=4))
+    assert registry.get().model.meta["watermark"] == (DAY + timedelta(days=4)).isoformat()
+    second = build_cooccurrence(collection, row_for_id, N_ITEMS, "v1", out, until=DAY + timedelta(days=8))
+    assert registry.get().model.meta["watermark"] == (DAY + timedelta(days=8)).isoformat()
+
+    assert prune(out, os.path.basename(second)) == [os.path.basename(first)]
+    assert open_latest(latest_pointer("v1", out)).meta["watermark"] == (DAY + timedelta(days=8)).isoformat()
+
+def test_scores_are_cosine_normalised(tmp_path, profiles):
+    path = build_cooccurrence(FakeProfiles(profiles), row_for_id, N_ITEMS, "v1", str(tmp_path), full=True,
+                              until=DAY + timedelta(days=30))
+    assert latest_path("v1", str(tmp_path)) == path
+    built = open_cooccurrence(path)
+
+    dense = dense_counts(profiles, until=DAY + timedelta(days=30)).astype(float)
+    norm = np.sqrt(np.diag(dense))
+    similarity = dense / np.outer(norm, norm)
+    np.fill_diagonal(similarity, 0)
+
+    np.testing.assert_allclose(built.scores([0, 2, 2]), similarity[0] + 2 * similarity[2])
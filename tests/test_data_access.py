@@ -0,0 +1,76 @@
+import pytest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import data_access
+
+@pytest.fixture
+def fake_mongo(monkeypatch):
+    clients = []
+
+    def make_client(uri, **kwargs):
+        client = MagicMock(name=f"client{len(clients)}")
+        client.kwargs = kwargs
+        clients.append(client)
+        return client
+
+    monkeypatch.setattr(data_access, "MongoClient", make_client)
+    data_access._forget_client()
+    yield clients
+    data_access._forget_client()
+
+def test_no_client_until_first_use(fake_mongo):
+    assert fake_mongo == []
+    data_access.users.find_one({"email": "a@example.com"})
+    assert len(fake_mongo) == 1
+    data_access.profiles.find_one({"email": "a@example.com"})
+    assert len(fake_mongo) == 1
+
+def test_new_client_after_fork(fake_mongo, monkeypatch):
+    first = data_access.get_client()
+    assert data_access.get_client() is first
+
+    monkeypatch.setattr(data_access.os, "getpid", lambda: -1)
+    second = data_access.get_client()
+    assert second is not first
+    first.close.assert_not_called()
+
+def test_settings_from_environment(fake_mongo, monkeypatch):
+    monkeypatch.setenv("MONGO_MAX_POOL_SIZE", "5")
+    monkeypatch.setenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "1500")
+    kwargs = data_access.get_client().kwargs
+    assert kwargs["connect"] is False
+    assert kwargs["maxPoolSize"] == 5
+    assert kwargs["serverSelectionTimeoutMS"] == 1500
+    assert kwargs["socketTimeoutMS"] == 20000
+
+def test_collection_methods_can_be_patched():
+    with patch.object(data_access.groups, "find_one", return_value={"name": "g", "members": []}) as mock_find:
+        assert data_access.find_group("g") == {"name": "g", "members": []}
+    mock_find.assert_called_once_with({"name": "g"}, data_access.GROUP_MEMBERS)
+    assert "find_one" not in vars(data_access.groups)
+
+@patch.object(data_access.profiles, "find_one")
+def test_profile_complete_reads_only_required_fields(mock_find):
+    mock_find.return_value = {"name": "A", "age": 30, "gender": "female", "height": 170, "weight": None}
+    assert not data_access.profile_complete("a@example.com")
+    projection = mock_find.call_args[0][1]
+    assert set(projection) == {"_id", *data_access.PROFILE_REQUIRED_FIELDS}
+
+    mock_find.return_value = {**mock_find.return_value, "weight": 60}
+    assert data_access.profile_complete("a@example.com")
+
+@patch.object(data_access.profiles, "find_one")
+def test_public_profile_leaves_out_taste(mock_find):
+    data_access.find_profile("a@example.com")
+    mock_find.assert_called_once_with({"email": "a@example.com"}, {"_id": 0, "taste": 0})
+
+@patch.object(data_access.steps, "find_one")
+def test_steps_on(mock_find):
+    mock_find.return_value = None
+    assert data_access.steps_on("a@example.com", "2025-04-06") == 0
+    mock_find.return_value = {"steps": 1200}
+    assert data_access.steps_on("a@example.com", "2025-04-06") == 1200
+    mock_find.assert_called_with({"email": "a@example.com", "date": "2025-04-06"}, {"_id": 0, "steps": 1})
@@ -0,0 +1,49 @@
+import pytest
+import subprocess
+import joblib
+import numpy as np
+import sys
+import os
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+from diet_clusters import CentroidModel, DEFAULT_HABITS, export, load, save
+
+@pytest.fixture(scope="module")
+def kmeans():
+    from sklearn.cluster import KMeans
+    X = np.random.default_rng(0).uniform(10, 60, (3000, 5))
+    return KMeans(n_clusters=8, n_init=2, random_state=0).fit(X)
+
+def habit_rows(bmis):
+    return np.column_stack([bmis, np.tile(DEFAULT_HABITS, (len(bmis), 1))])
+
+def test_cut_table_matches_kmeans_bit_for_bit(kmeans):
+    model = CentroidModel(**export(kmeans))
+    assert len(model.bmi_cuts) > 1
+
+    bmis = np.concatenate([
+        np.random.default_rng(1).uniform(0, 200, 20000),
+        (model.bmi_cuts.view(np.int64)[:, None] + np.arange(-300, 301)).ravel().view(np.float64),
+    ])
+    expected = kmeans.predict(habit_rows(bmis))
+    assert [model.cluster_for_bmi(b) for b in bmis.tolist()] == expected.tolist()
+
+def test_nearest_centroid_matches_kmeans(kmeans):
+    model = CentroidModel(**export(kmeans))
+    X = np.random.default_rng(2).uniform(0, 70, (5000, 5))
+    np.testing.assert_array_equal(model.predict(X), kmeans.predict(X))
+    assert model.cluster_for_bmi(500.0) == kmeans.predict(habit_rows([500.0]))[0]
+
+def test_saved_model_matches_served_pickle(tmp_path):
+    kmeans = joblib.load(os.path.join(ROOT, "diet_kmeans.pkl"))
+    path = tmp_path / "centroids.npz"
+    save(path, export(kmeans))
+    model = load(path)
+    bmis = np.arange(10, 60, 0.01)
+    assert [model.cluster_for_bmi(b) for b in bmis.tolist()] == kmeans.predict(habit_rows(bmis)).tolist()
+
+def test_served_export_loads_without_sklearn():
+    code = ("import sys, diet_clusters; m = diet_clusters.load('diet_centroids.npz'); "
+            "m.cluster_for_bmi(22.0); assert 'sklearn' not in sys.modules and 'joblib' not in sys.modules")
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
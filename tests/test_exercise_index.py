@@ -0,0 +1,65 @@
+import pytest
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from exercise_index import build_index, load_exercise_index, open_index, prune_indexes, load_exercises, build_tfidf
+
+@pytest.fixture
+def exercises_csv(tmp_path):
+    rows = [
+        {"bodyPart": "upper arms", "equipment": "barbell", "gifUrl": "", "id": 1, "name": "curl", "target": "biceps"},
+        {"bodyPart": "upper arms", "equipment": "dumbbell", "gifUrl": "", "id": 2, "name": "hammer curl", "target": "biceps"},
+        {"bodyPart": "upper legs", "equipment": "barbell", "gifUrl": "", "id": 3, "name": "squat", "target": "quads"},
+        {"bodyPart": "upper legs", "equipment": "body weight", "gifUrl": "", "id": 4, "name": "lunge", "target": "quads"},
+        {"bodyPart": "chest", "equipment": "barbell", "gifUrl": "", "id": 5, "name": "bench press", "target": "pectorals"},
+        {"bodyPart": "waist", "equipment": "body weight", "gifUrl": "", "id": 6, "name": "crunch", "target": "abs"},
+    ]
+    path = tmp_path / "fitness_exercises.csv"
+    pd.DataFrame(rows).to_csv(path, index=False)
+    return path
+
+def test_neighbors_match_dense_cosine(tmp_path, exercises_csv):
+    index = load_exercise_index(str(exercises_csv), str(tmp_path / "index"), k=3)
+
+    tfidf = build_tfidf(load_exercises(str(exercises_csv))['tags'])
+    dense = (tfidf @ tfidf.T).toarray()
+    np.fill_diagonal(dense, -1)
+
+    for row in range(len(index)):
+        rows, scores = index.neighbors(row)
+        assert row not in rows
+        assert len(rows) <= 3
+        assert list(scores) == sorted(scores, reverse=True)
+        np.testing.assert_allclose(scores, dense[row, rows], rtol=1e-5)
+        expected = np.sort(dense[row][dense[row] > 0])[::-1][:3]
+        np.testing.assert_allclose(scores, expected, rtol=1e-5)
+
+def test_neighbors_limit_k(tmp_path, exercises_csv):
+    index = load_exercise_index(str(exercises_csv), str(tmp_path / "index"), k=3)
+    rows, scores = index.neighbors(0, k=1)
+    assert len(rows) == 1
+    assert rows[0] == 1
+
+def test_index_reused_until_csv_changes(tmp_path, exercises_csv):
+    index_dir = str(tmp_path / "index")
+    first = build_index(str(exercises_csv), index_dir, k=3)
+    mtime = os.path.getmtime(os.path.join(first, "meta.json"))
+    assert build_index(str(exercises_csv), index_dir, k=3) == first
+    assert os.path.getmtime(os.path.join(first, "meta.json")) == mtime
+
+    df = pd.read_csv(exercises_csv)
+    df.loc[len(df)] = {"bodyPart": "back", "equipment": "cable", "gifUrl": "", "id": 7, "name": "row", "target": "lats"}
+    df.to_csv(exercises_csv, index=False)
+
+    second = build_index(str(exercises_csv), index_dir, k=3)
+    assert second != first
+    assert len(open_index(second)) == 7
+    assert prune_indexes(str(exercises_csv), index_dir) == [os.path.basename(first)]
+
+def test_index_arrays_are_read_only(tmp_path, exercises_csv):
+    index = load_exercise_index(str(exercises_csv), str(tmp_path / "index"), k=3)
+    with pytest.raises(ValueError):
+        index.neighbor_indices[0] = 5
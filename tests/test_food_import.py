@@ -0,0 +1,98 @@
+import pytest
+import numpy as np
+import gzip
+import json
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from food_import import BarcodeIndex, build_hash_index, import_foods, open_barcode_index
+from food_table import open_food_table
+
+CSV_ROWS = [
+    "code\tproduct_name\tenergy-kcal_100g\tenergy_100g\tproteins_100g\tcarbohydrates_100g\tfat_100g\tmain_category\tallergens",
+    "0012345678905\tGreek Yogurt\t97\t\t9\t3.6\t5\ten:dairies\ten:milk",
+    "4006381333931\tOat  Bar\t\t1674\t8\t60\t15\ten:snacks\ten:gluten,en:nuts",
+    "5000000000001\t\t100\t\t1\t1\t1\t\t",
+    "5000000000002\tBroken\tabc\t\t1\t1\t1\t\t",
+    "5000000000003\tImpossible\t5000\t\t1\t1\t1\t\t",
+    "not-a-code\tApple\t52\t\t0.3\t14\t0.2\ten:fruits\t",
+]
+
+@pytest.fixture
+def csv_dump(tmp_path):
+    path = tmp_path / "foods.csv"
+    path.write_text("\n".join(CSV_ROWS) + "\n", encoding="utf-8")
+    return str(path)
+
+def test_csv_import_normalizes_units_and_skips_bad_rows(tmp_path, csv_dump):
+    path = import_foods(csv_dump, str(tmp_path / "imports"), chunk_rows=2, log=lambda msg: None)
+    table = open_food_table(path)
+
+    assert table.names == ["Greek Yogurt", "Oat Bar", "Apple"]
+    assert table.meta["skipped"] == 3
+    oat = table.lookup("Oat Bar")
+    assert table.macros[oat, 0] == pytest.approx(1674 / 4.184)
+    assert table.tags(oat) == ["gluten", "tree_nut"]
+    assert table.category(table.lookup("Greek Yogurt")) == "dairies"
+    assert isinstance(table.macros, np.memmap)
+
+    barcodes = open_barcode_index(path)
+    assert barcodes.lookup("0012345678905") == table.lookup("Greek Yogurt")
+    assert barcodes.lookup("12345678905") == table.lookup("Greek Yogurt")
+    assert barcodes.lookup("4006381333931") == oat
+    assert barcodes.lookup("5000000000001") is None
+    assert barcodes.lookup("not-a-code") is None
+    assert import_foods(csv_dump, str(tmp_path / "imports")) == path
+
+def test_jsonl_gz_import_with_nested_nutriments(tmp_path):
+    source = tmp_path / "foods.jsonl.gz"
+    records = [
+        {"code": "111", "product_name": "Salt Crackers", "categories": "en:snacks, en:crackers",
+         "nutriments": {"energy-kj_100g": 2092, "proteins_100g": 9, "proteins_unit": "mg",
+                        "carbohydrates_100g": 70, "fat_100g": 10}},
+        {"code": "222", "product_name": "Water", "nutriments": {"energy-kcal_100g": 0}},
+        {"code": "333", "product_name": "Rice Cake", "nutriments": {"energy_100g": "1000", "energy_unit": "kJ"}},
+        {"code": "444", "product_name": "Broth", "nutrition_data_per": "100g",
+         "nutriments": {"energy_value": 42, "energy_unit": "kJ", "proteins_value": 500, "proteins_unit": "mg"}},
+    ]
+    with gzip.open(source, "wt", encoding="utf-8") as f:
+        f.write("\n".join(json.dumps(r) for r in records) + "\n{broken\n")
+
+    table = open_food_table(import_foods(str(source), str(tmp_path / "imports"), log=lambda msg: None))
+    crackers = table.nutrients(table.lookup("Salt Crackers"))
+    assert crackers["calories"] == pytest.approx(500)
+    # *_100g values are already normalised; the unit describes the label value, not them.
+    assert crackers["protein"] == pytest.approx(9)
+    assert table.nutrients(table.lookup("Rice Cake"))["calories"] == pytest.approx(1000 / 4.184)
+    broth = table.nutrients(table.lookup("Broth"))
+    assert broth["calories"] == pytest.approx(42 / 4.184) and broth["protein"] == pytest.approx(0.5)
+    assert table.category(table.lookup("Salt Crackers")) == "snacks"
+    assert "gluten" in table.tags(table.lookup("Salt Crackers"))
+    assert table.nutrients(table.lookup("Water"))["calories"] == 0
+
+def test_hash_index_matches_dict_and_keeps_first_duplicate():
+    rng = np.random.default_rng(1)
+    keys = rng.integers(1, 10 ** 13, 5000, dtype=np.uint64)
+    keys[10] = keys[3]
+    table_keys, table_rows = build_hash_index(keys, np.arange(len(keys)))
+    index = BarcodeIndex(table_keys, table_rows)
+
+    expected = {}
+    for row, key in enumerate(keys.tolist()):
+        expected.setdefault(key, row)
+    assert len(index) == len(expected)
+    assert all(index.lookup(str(key)) == row for key, row in expected.items())
+    assert index.lookup("1") is None or 1 in expected
+
+def test_food_by_barcode_endpoint(tmp_path, csv_dump):
+    from app import app
+    path = import_foods(csv_dump, str(tmp_path / "imports"), log=lambda msg: None)
+    with patch("app.food_table", open_food_table(path)), patch("app.barcode_index", open_barcode_index(path)), \
+            app.test_client() as client:
+        res = client.get("/api/food-by-barcode/0012345678905")
+        assert res.status_code == 200
+        assert res.get_json()["name"] == "Greek Yogurt"
+        assert res.get_json()["tags"] == ["dairy"]
+        assert client.get("/api/food-by-barcode/999").status_code == 404
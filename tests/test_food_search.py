@@ -0,0 +1,85 @@
+import pytest
+import pandas as pd
+import sys
+import os
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from food_search import FoodSearchIndex, normalize
+from food_table import FoodTable
+
+NAMES = ["Chicken Breast", "Chickpeas", "Whole Wheat Bread", "Wheat Bran", "Brown Rice", "Rice",
+         "Crème Fraîche", "Broccoli", "Banana", "Beef"]
+
+@pytest.fixture
+def index():
+    return FoodSearchIndex(NAMES)
+
+@pytest.fixture
+def food_table():
+    return FoodTable.from_columns(NAMES, [[100.0, 10.0, 10.0, 1.0]] * len(NAMES))
+
+def names(index, rows):
+    return [NAMES[row] for row in rows]
+
+def test_normalize():
+    assert normalize("  Crème   Fraîche! ") == "creme fraiche"
+
+def test_prefix_tiers_rank_exact_then_name_then_word(index):
+    page, has_more = index.search("rice")
+    assert [(NAMES[row], match) for row, match in page][:2] == [("Rice", "exact"), ("Brown Rice", "word")]
+    assert not has_more
+
+    page, _ = index.search("chick")
+    assert [NAMES[row] for row, match in page if match == "prefix"] == ["Chicken Breast", "Chickpeas"]
+
+    page, _ = index.search("bre")
+    assert {NAMES[row] for row, match in page if match == "word"} == {"Chicken Breast", "Whole Wheat Bread"}
+
+def test_fuzzy_matches_typos(index):
+    rows, scores = index.fuzzy("brocoli")
+    assert NAMES[rows[0]] == "Broccoli"
+    assert list(scores) == sorted(scores, reverse=True)
+    assert names(index, index.suggest("chiken brest"))[0] == "Chicken Breast"
+    assert index.resolve("creme fraiche") == NAMES.index("Crème Fraîche")
+
+def test_pagination_covers_all_matches_once(index):
+    everything, _ = index.search("b", limit=100)
+    pages, offset = [], 0
+    while True:
+        page, has_more = index.search("b", limit=3, offset=offset)
+        pages += page
+        if not has_more:
+            break
+        offset += 3
+    assert pages == everything
+    assert len({row for row, _ in pages}) == len(pages)
+
+def test_search_foods_endpoint(index, food_table):
+    from app import app
+    with patch("app.food_table", food_table), patch("app.food_search", index), app.test_client() as client:
+        res = client.get("/api/search-foods?q=whe&limit=1")
+        assert res.status_code == 200
+        body = res.get_json()
+        assert body["results"][0]["name"] == "Wheat Bran"
+        assert body["results"][0]["match"] == "prefix"
+        assert body["next_offset"] == 1
+
+        assert client.get("/api/search-foods").status_code == 400
+        assert client.get("/api/search-foods?q=rice&limit=500").status_code == 400
+
+def test_log_meal_suggests_corrections(index, food_table):
+    from flask_jwt_extended import create_access_token
+    from app import app, meal_collection
+    with patch("app.food_table", food_table), patch("app.food_search", index), \
+            patch.object(meal_collection, "insert_one", MagicMock()), \
+            patch("app.nutrition_rollups.record_meal", MagicMock()), \
+            app.test_client() as client, app.app_context():
+        headers = {"Authorization": f"Bearer {create_access_token(identity='testuser@example.com')}"}
+        res = client.post("/api/log-meal", json={"meals": {"lunch": ["brown rice", "Brocolli"]}}, headers=headers)
+
+        assert res.status_code == 201
+        body = res.get_json()
+        assert body["total_nutrition"]["calories"] == 100
+        assert body["unmatched"][0]["name"] == "Brocolli"
+        assert body["unmatched"][0]["suggestions"][0] == "Broccoli"
@@ -0,0 +1,131 @@
+import pytest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import group_posts
+
+class FakeCursor(list):
+    def sort(self, keys):
+        for field, direction in reversed(keys):
+            self.sort_in_place(field, direction)
+        return self
+
+    def sort_in_place(self, field, direction):
+        list.sort(self, key=lambda doc: doc[field], reverse=direction < 0)
+
+    def limit(self, n):
+        return FakeCursor(self[:n])
+
+class FakePosts:
+    """Evaluates the queries group_posts issues against group_posts, over a list of documents."""
+
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+
+    def find(self, query, projection=None):
+        rows = [doc for doc in self.docs if doc["group"] == query["group"]]
+        if "$or" in query:
+            older, tie = query["$or"]
+            created_at, _id = tie["created_at"], tie["_id"]["$lt"]
+            assert older == {"created_at": {"$lt": created_at}}
+            rows = [doc for doc in rows
+                    if doc["created_at"] < created_at or (doc["created_at"] == created_at and doc["_id"] < _id)]
+        return FakeCursor(dict(doc) for doc in rows)
+
+    def insert_many(self, docs, ordered=True):
+        ids = {doc["_id"] for doc in self.docs}
+        errors = [{"code": 11000, "index": i} for i, doc in enumerate(docs) if doc["_id"] in ids]
+        self.docs.extend(doc for doc in docs if doc["_id"] not in ids)
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+class FakeGroups:
+    def __init__(self, docs):
+        self.docs = docs
+        self.before_unset = None
+
+    def find(self, query, projection=None):
+        return [{"_id": doc["_id"]} for doc in self.docs if doc.get("posts")]
+
+    def find_one(self, query, projection=None):
+        return next((dict(doc) for doc in self.docs if doc["_id"] == query["_id"]), None)
+
+    def update_one(self, query, update):
+        if self.before_unset:
+            self.before_unset()
+            self.before_unset = None
+        for doc in self.docs:
+            if doc["_id"] == query["_id"] and len(doc.get("posts", [])) == query["posts"]["$size"]:
+                doc.pop("posts")
+                return SimpleNamespace(modified_count=1)
+        return SimpleNamespace(modified_count=0)
+
+def test_pages_walk_every_post_newest_first_across_ties():
+    start = datetime(2025, 1, 1)
+    # Pairs of posts share a timestamp, so pages must break ties on _id.
+    docs = [group_posts.new_post("Runners", "a@x", f"post {i}", start + timedelta(minutes=i // 2), _id=ObjectId())
+            for i in range(11)]
+    posts = FakePosts(docs + [group_posts.new_post("Walkers", "b@x", "elsewhere", start, _id=ObjectId())])
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = group_posts.page(posts, "Runners", limit=3, cursor=cursor)
+        seen.extend(post["content"] for post in page)
+        assert len(page) <= 3
+        if not cursor:
+            break
+    expected = sorted(docs, key=lambda doc: (doc["created_at"], doc["_id"]), reverse=True)
+    assert seen == [doc["content"] for doc in expected]
+
+def test_bad_cursors_and_post_references_are_rejected():
+    for cursor in ("not-a-cursor", "e30", group_posts.encode_cursor({"created_at": "2025", "_id": 1})):
+        with pytest.raises(ValueError):
+            group_posts.decode_cursor(cursor)
+    with pytest.raises(ValueError):
+        group_posts.post_filter("Runners")
+    with pytest.raises(ValueError):
+        group_posts.post_filter("Runners", post_id="123")
+    assert group_posts.post_filter("Runners", content="Hi") == {"group": "Runners", "content": "Hi"}
+
+def test_legacy_posts_keep_order_and_get_stable_ids():
+    group = {"_id": ObjectId(), "name": "Runners", "posts": [
+        {"user": "a@x", "content": "first", "likes": 2, "liked_by": ["b@x"], "comments": [],
+         "timestamp": "2025-01-01T08:00:00"},
+        {"user": "a@x", "content": "🎉 Earned a new badge: Beginner!", "likes": 0, "comments": []},
+        {"user": "b@x", "content": "second", "likes": 0, "comments": [{"user": "a@x", "text": "hi"}],
+         "timestamp": "2025-01-02T08:00:00.123456"},
+    ]}
+    docs = group_posts.legacy_posts(group)
+    assert [doc["content"] for doc in docs] == ["first", "🎉 Earned a new badge: Beginner!", "second"]
+    assert docs[0]["likes"] == 2 and docs[0]["liked_by"] == ["b@x"] and docs[2]["comments"][0]["text"] == "hi"
+    assert docs[1]["created_at"] == datetime(2025, 1, 1, 8) and docs[1]["liked_by"] == []
+    assert all("timestamp" not in doc and doc["group"] == "Runners" for doc in docs)
+    assert [doc["_id"] for doc in docs] == [doc["_id"] for doc in group_posts.legacy_posts(group)]
+    assert len({doc["_id"] for doc in docs}) == 3
+    # Same-second posts still page in array order.
+    assert sorted(docs, key=lambda doc: (doc["created_at"], doc["_id"])) == docs
+
+def test_migrate_moves_posts_once_and_retries_groups_written_meanwhile():
+    groups = FakeGroups([
+        {"_id": ObjectId(), "name": "Runners", "created_at": "2025-01-01T00:00:00",
+         "posts": [{"user": "a@x", "content": f"post {i}", "likes": 0, "comments": []} for i in range(5)]},
+        {"_id": ObjectId(), "name": "Empty", "posts": []},
+    ])
+    posts = FakePosts()
+    # A post lands in the array after the copy was read: the unset must not drop it.
+    late = {"user": "b@x", "content": "late", "likes": 0, "comments": []}
+    groups.before_unset = lambda: groups.docs[0]["posts"].append(late)
+
+    assert group_posts.migrate(groups, posts, batch_size=2, log=lambda message: None) == (1, 6)
+    assert "posts" not in groups.docs[0]
+    assert sorted(doc["content"] for doc in posts.docs) == ["late"] + [f"post {i}" for i in range(5)]
+
+    # Interrupted after copying but before the unset: the re-run inserts nothing twice.
+    groups.docs[0]["posts"] = [{"user": "a@x", "content": f"post {i}", "likes": 0, "comments": []} for i in range(5)] + [late]
+    assert group_posts.migrate(groups, posts, log=lambda message: None) == (1, 6)
+    assert len(posts.docs) == 6
@@ -2,6 +2,7 @@ import pytest
 from unittest.mock import patch
 import sys
 import os
+from datetime import datetime
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from app import app
@@ -48,16 +49,20 @@ def test_join_group(mock_update, mock_find, client):
     res = client.post("/api/join-group", headers=auth_header(), json={"group_name": "TestGroup"})
     assert res.status_code == 200
 
+@patch("app.group_posts_collection.find")
 @patch("app.groups_collection.find_one")
-def test_get_group_details(mock_find, client):
+def test_get_group_details(mock_find, mock_posts, client):
     mock_find.return_value = {"name": "TestGroup", "members": ["test@example.com"]}
+    mock_posts.return_value.sort.return_value.limit.return_value = []
     res = client.get("/api/get-group-details/TestGroup", headers=auth_header())
     assert res.status_code == 200
     assert "name" in res.json
+    assert res.json["posts"] == [] and res.json["next_posts"] is None
 
+@patch("app.group_posts_collection.delete_many")
 @patch("app.groups_collection.find_one")
 @patch("app.groups_collection.delete_one")
-def test_delete_group(mock_delete, mock_find, client):
+def test_delete_group(mock_delete, mock_find, mock_delete_posts, client):
     mock_find.return_value = {"name": "TestGroup", "members": ["test@example.com"]}
     res = client.post("/api/delete-group", headers=auth_header(), json={"group_name": "TestGroup"})
     assert res.status_code == 200
@@ -70,37 +75,44 @@ def test_leave_group(mock_update, mock_find, client):
     assert res.status_code == 200
 
 @patch("app.groups_collection.find_one")
-@patch("app.groups_collection.update_one")
-def test_group_post(mock_update, mock_find, client):
+@patch("app.group_posts_collection.insert_one")
+def test_group_post(mock_insert, mock_find, client):
     mock_find.return_value = {"name": "TestGroup", "members": ["test@example.com"]}
-    mock_update.return_value.modified_count = 1
     res = client.post("/api/group-post", headers=auth_header(), json={
         "group_name": "TestGroup",
         "content": "Hello Group!"
     })
     assert res.status_code == 201
+    post = mock_insert.call_args[0][0]
+    assert post["group"] == "TestGroup" and post["content"] == "Hello Group!"
 
 @patch("app.notifications_collection.insert_one")
-@patch("app.groups_collection.find_one")
-@patch("app.groups_collection.update_one")
-def test_like_post(mock_update, mock_find, mock_notify, client):
-    mock_find.return_value = {
-        "posts": [{"content": "Hello", "user": "someone@example.com"}]
-    }
-    mock_update.return_value.modified_count = 1
+@patch("app.group_posts_collection.find_one_and_update")
+def test_like_post(mock_update, mock_notify, client):
+    mock_update.return_value = {"user": "someone@example.com"}
     res = client.post("/api/like-post", headers=auth_header(), json={
         "group_name": "TestGroup", "post_content": "Hello"
     })
     assert res.status_code == 200
+    assert mock_update.call_args[0][0]["liked_by"] == {"$ne": "test@example.com"}
+    assert mock_notify.call_args[0][0]["user"] == "someone@example.com"
+
+@patch("app.group_posts_collection.find_one")
+@patch("app.group_posts_collection.find_one_and_update")
+def test_like_post_twice(mock_update, mock_find, client):
+    mock_update.return_value = None
+    mock_find.return_value = {"_id": "p1"}
+    res = client.post("/api/like-post", headers=auth_header(), json={
+        "group_name": "TestGroup", "post_id": "65f000000000000000000001"
+    })
+    assert res.status_code == 400
+    res = client.post("/api/like-post", headers=auth_header(), json={"group_name": "TestGroup", "post_id": "nope"})
+    assert res.status_code == 400
 
 @patch("app.notifications_collection.insert_one")
-@patch("app.groups_collection.find_one")
-@patch("app.groups_collection.update_one")
-def test_comment_post(mock_update, mock_find, mock_notify, client):
-    mock_find.return_value = {
-        "posts": [{"content": "Hello", "user": "someone@example.com"}]
-    }
-    mock_update.return_value.modified_count = 1
+@patch("app.group_posts_collection.find_one_and_update")
+def test_comment_post(mock_update, mock_notify, client):
+    mock_update.return_value = {"user": "someone@example.com"}
     res = client.post("/api/comment-post", headers=auth_header(), json={
         "group_name": "TestGroup",
         "post_content": "Hello",
@@ -114,14 +126,29 @@ def test_get_notifications(mock_find, client):
     res = client.get("/api/notifications", headers=auth_header())
     assert res.status_code == 200
 
+@patch("app.group_posts_collection.find")
 @patch("app.groups_collection.find_one")
-def test_get_group_posts(mock_find, client):
-    mock_find.return_value = {
-        "members": ["test@example.com"],
-        "posts": [{"content": "Hi"}]
-    }
+def test_get_group_posts(mock_find, mock_posts, client):
+    mock_find.return_value = {"members": ["test@example.com"]}
+    mock_posts.return_value.sort.return_value = [
+        {"_id": "p1", "user": "test@example.com", "content": "Hi", "created_at": datetime(2025, 1, 1)}
+    ]
     res = client.get("/api/get-group-posts/TestGroup", headers=auth_header())
     assert res.status_code == 200
+    assert [post["content"] for post in res.json] == ["Hi"]
+
+@patch("app.group_posts_collection.find")
+@patch("app.groups_collection.find_one")
+def test_get_group_posts_paged(mock_find, mock_posts, client):
+    mock_find.return_value = {"members": ["test@example.com"]}
+    mock_posts.return_value.sort.return_value.limit.return_value = [
+        {"_id": "p1", "user": "test@example.com", "content": "Hi", "created_at": datetime(2025, 1, 1)}
+    ]
+    res = client.get("/api/get-group-posts/TestGroup?limit=20", headers=auth_header())
+    assert res.status_code == 200
+    assert res.json["posts"][0]["content"] == "Hi" and res.json["next"] is None
+    assert client.get("/api/get-group-posts/TestGroup?limit=0", headers=auth_header()).status_code == 400
+    assert client.get("/api/get-group-posts/TestGroup?after=bad", headers=auth_header()).status_code == 400
 
 @patch("app.groups_collection.find")
 def test_get_groups(mock_find, client):
@@ -137,17 +164,17 @@ def test_get_user_groups(mock_find, client):
     assert res.status_code == 200
     assert "groups" in res.json
 
-@patch("app.groups_collection.update_one")
+@patch("app.group_posts_collection.find_one_and_update")
 def test_dislike_post(mock_update, client):
-    mock_update.return_value.modified_count = 1
+    mock_update.return_value = {"_id": "p1"}
     res = client.post("/api/dislike-post", headers=auth_header(), json={
         "group_name": "TestGroup", "post_content": "Hello"
     })
     assert res.status_code == 200
 
-@patch("app.groups_collection.update_one")
+@patch("app.group_posts_collection.find_one_and_update")
 def test_remove_comment(mock_update, client):
-    mock_update.return_value.modified_count = 1
+    mock_update.return_value = {"_id": "p1"}
     res = client.post("/api/remove-comment", headers=auth_header(), json={
         "group_name": "TestGroup",
         "post_content": "Hello",
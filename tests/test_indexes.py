@@ -0,0 +1,105 @@
+import pytest
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from pymongo.errors import OperationFailure
+from indexes import HOT_QUERIES, INDEXES, apply, check, index_name, plan, plan_stages
+
+# The query-plan tests need a real mongod: MONGO_TEST_URI=mongodb://localhost:27017 pytest tests/test_indexes.py
+MONGO_TEST_URI = os.getenv("MONGO_TEST_URI")
+
+class FakeCollection:
+    def __init__(self, indexes=None, duplicates=False):
+        self.indexes = {"_id_": {"key": [("_id", 1)]}, **(indexes or {})}
+        self.duplicates = duplicates
+        self.dropped = []
+
+    def index_information(self):
+        return self.indexes
+
+    def create_indexes(self, models):
+        for model in models:
+            doc = model.document
+            if self.duplicates and doc.get("unique"):
+                raise OperationFailure("E11000 duplicate key error", 11000, {"errmsg": "E11000 duplicate key error"})
+            self.indexes[doc["name"]] = {"key": list(doc["key"].items()), **({"unique": True} if doc.get("unique") else {})}
+
+    def drop_index(self, name):
+        self.dropped.append(name)
+        del self.indexes[name]
+
+def test_apply_creates_missing_indexes_once():
+    db = {name: FakeCollection() for name in INDEXES}
+    assert apply(db, log=lambda msg: None) == 0
+    assert db["users"].indexes["email_1"]["unique"]
+    assert db["user_challenges"].indexes["challenge_name_1_progress_-1__id_1"]["key"] == \
+        [("challenge_name", 1), ("progress", -1), ("_id", 1)]
+    assert all(plan(db[name], specs) == ([], [], []) for name, specs in INDEXES.items())
+
+    messages = []
+    assert apply(db, log=messages.append) == 0
+    assert messages == []
+
+def test_conflicting_index_is_reported_or_replaced():
+    db = {"users": FakeCollection({"email_1": {"key": [("email", 1)]}})}
+    messages = []
+    assert apply(db, {"users": INDEXES["users"]}, log=messages.append) == 1
+    assert "--replace" in messages[0]
+
+    assert apply(db, {"users": INDEXES["users"]}, replace=True, log=lambda msg: None) == 0
+    assert db["users"].dropped == ["email_1"]
+    assert db["users"].indexes["email_1"]["unique"]
+
+def test_duplicates_fail_one_index_and_keep_going():
+    db = {"users": FakeCollection(duplicates=True), "notifications": FakeCollection({"legacy": {"key": [("x", 1)]}})}
+    messages = []
+    assert apply(db, {"users": INDEXES["users"], "notifications": INDEXES["notifications"]}, log=messages.append) == 1
+    assert any("duplicate keys" in message for message in messages)
+    assert any("legacy is not in the spec" in message for message in messages)
+    assert "user_1" in db["notifications"].indexes
+
+def test_dry_run_changes_nothing():
+    db = {"users": FakeCollection()}
+    apply(db, {"users": INDEXES["users"]}, dry_run=True, log=lambda msg: None)
+    assert list(db["users"].indexes) == ["_id_"]
+
+def test_plan_stages_walks_classic_and_sbe_plans():
+    classic = {"queryPlanner": {"winningPlan": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}}}
+    sbe = {"queryPlanner": {"winningPlan": {"queryPlan": {"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}}}}}
+    assert plan_stages(classic) == ["FETCH", "IXSCAN"]
+    assert "COLLSCAN" in plan_stages(sbe)
+
+def test_every_hot_query_has_a_spec_index():
+    for name, collection, query, sort in HOT_QUERIES:
+        prefixes = [[field for field, _ in spec["keys"]] for spec in INDEXES[collection]]
+        assert any(keys[0] in query for keys in prefixes), name
+    assert all(index_name(spec) for specs in INDEXES.values() for spec in specs)
+
+@pytest.fixture(scope="module")
+def mongo_db():
+    if not MONGO_TEST_URI:
+        pytest.skip("MONGO_TEST_URI not set")
+    from pymongo.mongo_client import MongoClient
+
+    client = MongoClient(MONGO_TEST_URI, serverSelectionTimeoutMS=2000)
+    db = client[f"indexes_test_{os.getpid()}"]
+    for collection in INDEXES:
+        db[collection].insert_many([{"email": f"{i}@example.com", "user": f"{i}@example.com", "name": f"group {i}",
+                                     "challenge_name": f"challenge {i % 5}", "date": f"2025-01-{i % 28 + 1:02d}",
+                                     "title": f"badge {i}", "members": [f"{i}@example.com"], "progress": i}
+                                    for i in range(200)])
+    yield db
+    client.drop_database(db.name)
+    client.close()
+
+def test_hot_queries_use_indexes(mongo_db):
+    assert apply(mongo_db, log=lambda msg: None) == 0
+    assert check(mongo_db, log=lambda msg: None) == []
+
+def test_collscan_is_detected_without_indexes(mongo_db):
+    mongo_db["users"].drop_indexes()
+    try:
+        assert check(mongo_db, [q for q in HOT_QUERIES if q[1] == "users"], log=lambda msg: None) == ["login"]
+    finally:
+        apply(mongo_db, {"users": INDEXES["users"]}, log=lambda msg: None)
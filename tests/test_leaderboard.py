@@ -0,0 +1,88 @@
+import pytest
+from bson import ObjectId
+from flask_jwt_extended import create_access_token
+from unittest.mock import patch
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import leaderboard
+from app import app
+
+class FakeUserChallenges:
+    """Runs the stages leaderboard.pipeline emits, over a list of documents."""
+
+    def __init__(self, docs, users):
+        self.docs = docs
+        self.users = {user["email"]: user for user in users}
+        self.pipelines = []
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        match, sort, limit, lookup, project = pipeline
+        rows = [doc for doc in self.docs if doc["challenge_name"] == match["$match"]["challenge_name"]]
+        if "$or" in match["$match"]:
+            after, tie = match["$match"]["$or"]
+            progress, _id = tie["progress"], tie["_id"]["$gt"]
+            rows = [doc for doc in rows if doc["progress"] < progress or (doc["progress"] == progress and doc["_id"] > _id)]
+        assert sort == {"$sort": {"progress": -1, "_id": 1}}
+        rows = sorted(rows, key=lambda doc: (-doc["progress"], doc["_id"]))[:limit["$limit"]]
+        assert lookup["$lookup"]["from"] == "users"
+        return iter([{"_id": doc["_id"], "progress": doc["progress"],
+                      "username": self.users.get(doc["email"], {}).get("username", doc["email"])} for doc in rows])
+
+@pytest.fixture
+def board():
+    docs = [{"_id": i, "email": f"{i}@example.com", "challenge_name": "Steps", "progress": i // 2} for i in range(1, 11)]
+    docs.append({"_id": 99, "email": "other@example.com", "challenge_name": "Sleep", "progress": 100})
+    return FakeUserChallenges(docs, [{"email": f"{i}@example.com", "username": f"user{i}"} for i in range(1, 10)])
+
+def test_pages_walk_the_whole_board_in_order(board):
+    seen, cursor = [], None
+    while True:
+        entries, cursor = leaderboard.page(board, "Steps", limit=3, cursor=cursor)
+        seen.extend(entries)
+        if cursor is None:
+            break
+    assert [entry["rank"] for entry in seen] == list(range(1, 11))
+    assert [entry["progress"] for entry in seen] == [5, 4, 4, 3, 3, 2, 2, 1, 1, 0]
+    assert seen[0]["username"] == "10@example.com"  # no users document: falls back to the email
+    assert seen[1]["username"] == "user8"
+    assert len(board.pipelines) == 4
+    assert all(stage["$limit"] == 4 for pipeline in board.pipelines for stage in pipeline if "$limit" in stage)
+
+def test_top_n_has_no_next_page_when_board_fits(board):
+    entries, cursor = leaderboard.page(board, "Steps", limit=10)
+    assert len(entries) == 10 and cursor is None
+
+def test_cursor_round_trip_and_validation():
+    oid = ObjectId("65f000000000000000000001")
+    assert leaderboard.decode_cursor(leaderboard.encode_cursor({"_id": oid, "progress": 7.5}, 40)) == (7.5, oid, 40)
+    for bad in ("garbage", leaderboard.encode_cursor({"_id": 1, "progress": "x"}, 1)):
+        with pytest.raises(ValueError):
+            leaderboard.decode_cursor(bad)
+
+@pytest.fixture
+def client():
+    app.config["TESTING"] = True
+    app.config["JWT_SECRET_KEY"] = "test_secret_key"
+    with app.test_client() as client:
+        yield client
+
+def auth_header(email="testuser@example.com"):
+    with app.app_context():
+        token = create_access_token(identity=email)
+    return {"Authorization": f"Bearer {token}"}
+
+def test_leaderboard_endpoint_pages(board, client):
+    with patch("app.user_challenges_collection", board):
+        first = client.get("/api/get-leaderboard/Steps?limit=4", headers=auth_header())
+        second = client.get(f"/api/get-leaderboard/Steps?limit=4&after={first.json['next']}", headers=auth_header())
+        empty = client.get("/api/get-leaderboard/Nothing", headers=auth_header())
+        bad = client.get("/api/get-leaderboard/Steps?after=garbage", headers=auth_header())
+        too_many = client.get("/api/get-leaderboard/Steps?limit=1000", headers=auth_header())
+
+    assert first.status_code == 200
+    assert [entry["rank"] for entry in second.json["leaderboard"]] == [5, 6, 7, 8]
+    assert empty.json["leaderboard"] == [] and "message" in empty.json
+    assert bad.status_code == 400 and too_many.status_code == 400
@@ -10,6 +10,7 @@ from app import (
     load_food_data, initialize_model, calculate_calorie_needs,
     generate_meal_plan, get_macros_by_bmi, generate_meal, adjust_calories_by_goal
 )
+from food_table import FoodTable
 
 @pytest.fixture
 def mock_food_df():
@@ -26,26 +27,48 @@ def test_load_food_data_success(tmp_path, mock_food_df):
     mock_food_df.to_excel(file_path, index=False, engine="openpyxl")
 
     with patch("app.os.getcwd", return_value=str(tmp_path)):
-        food_dict = load_food_data()
-        assert isinstance(food_dict, dict)
-        assert "Chicken" in food_dict
+        food_table = load_food_data()
+        assert isinstance(food_table, FoodTable)
+        assert "Chicken" in food_table
 
-        chicken_data = food_dict["Chicken"]
+        chicken_data = food_table.nutrients(food_table.lookup("Chicken"))
         assert isinstance(chicken_data, dict)
-        assert "Calories (kcal)" in chicken_data
-        assert "Protein (g)" in chicken_data
-        assert "Carbohydrates (g)" in chicken_data
-        assert "Fats (g)" in chicken_data
-        assert chicken_data["Calories (kcal)"] == 165
-        assert chicken_data["Protein (g)"] == 31.0
+        assert "calories" in chicken_data
+        assert "protein" in chicken_data
+        assert "carbs" in chicken_data
+        assert "fat" in chicken_data
+        assert chicken_data["calories"] == 165
+        assert chicken_data["protein"] == 31.0
+
+def test_load_food_data_uses_compiled_cache(tmp_path, mock_food_df):
+    file_path = tmp_path / "food_database.xlsx"
+    mock_food_df.to_excel(file_path, index=False, engine="openpyxl")
+
+    with patch("app.os.getcwd", return_value=str(tmp_path)):
+        first = load_food_data()
+        with patch("pandas.read_excel", side_effect=AssertionError("cache not used")):
+            second = load_food_data()
+        assert isinstance(second.macros, np.memmap)
+        assert second.names == first.names
+
+        mock_food_df.loc[len(mock_food_df)] = ["Tofu", 76, 8, 1.9, 4.8]
+        mock_food_df.to_excel(file_path, index=False, engine="openpyxl")
+        assert "Tofu" in load_food_data()
+
+def test_load_food_data_missing_columns(tmp_path, mock_food_df):
+    file_path = tmp_path / "food_database.xlsx"
+    mock_food_df.drop(columns=["Fats (g)"]).to_excel(file_path, index=False, engine="openpyxl")
+
+    with patch("app.os.getcwd", return_value=str(tmp_path)):
+        assert load_food_data() is None
 
 def test_initialize_model(mock_food_df):
-    mock_food_dict = mock_food_df.set_index("Food Name")[["Calories (kcal)", "Protein (g)", "Carbohydrates (g)", "Fats (g)"]].to_dict(orient="index")
-    with patch("app.food_database", mock_food_dict):
-        model, df = initialize_model()
+    mock_table = FoodTable.from_frame(mock_food_df)
+    with patch("app.food_table", mock_table):
+        model, table = initialize_model()
         assert model is not None
-        assert not df.empty
-        assert "protein" in df.columns
+        assert len(table) > 0
+        assert "protein" in table.columns
 
 def test_calculate_calorie_needs():
     assert calculate_calorie_needs(22, 70, 'sedentary') == pytest.approx(70 * 22 * 1.2)
@@ -62,14 +85,9 @@ def test_adjust_calories_by_goal():
     assert adjust_calories_by_goal(2000, 'lose_weight', 27) == 1800
     assert adjust_calories_by_goal(2000, 'maintain', 22) == 2000
 
-def test_generate_meal(monkeypatch, mock_food_df):
-    mock_dict = mock_food_df.set_index("Food Name")[["Calories (kcal)", "Protein (g)", "Carbohydrates (g)", "Fats (g)"]].to_dict(orient="index")
-    with patch("app.food_database", mock_dict):
-        model, df = initialize_model()
-
-        monkeypatch.setattr("app.food_model", model)
-        monkeypatch.setattr("app.food_df", df)
-
+def test_generate_meal(mock_food_df):
+    mock_table = FoodTable.from_frame(mock_food_df)
+    with patch("app.food_table", mock_table):
         macros = {'protein': 0.3, 'carbs': 0.5, 'fat': 0.2}
         meal = generate_meal(600, macros)
         assert isinstance(meal, dict)
@@ -77,14 +95,9 @@ def test_generate_meal(monkeypatch, mock_food_df):
         assert len(meal['foods']) > 0
         assert 'name' in meal['foods'][0]
 
-def test_generate_meal_plan(monkeypatch, mock_food_df):
-    mock_dict = mock_food_df.set_index("Food Name")[["Calories (kcal)", "Protein (g)", "Carbohydrates (g)", "Fats (g)"]].to_dict(orient="index")
-    with patch("app.food_database", mock_dict):
-        model, df = initialize_model()
-
-        monkeypatch.setattr("app.food_model", model)
-        monkeypatch.setattr("app.food_df", df)
-
+def test_generate_meal_plan(mock_food_df):
+    mock_table = FoodTable.from_frame(mock_food_df)
+    with patch("app.food_table", mock_table):
         bmi = 22
         total_calories = 2200
         plan = generate_meal_plan(bmi, total_calories)
@@ -94,3 +107,168 @@ def test_generate_meal_plan(monkeypatch, mock_food_df):
         assert 'snacks' in plan
         assert isinstance(plan['snacks'], list)
         assert 'total_calories' in plan
+
+def test_meal_planner_composes_each_distinct_target_once(mock_food_df):
+    from meal_planner import MealComposer, MealPlanner, MEAL_SHARES
+    table = FoodTable.from_frame(mock_food_df)
+    composer = MealComposer(table)
+    counting = MagicMock(wraps=composer)
+    plans = MealPlanner(table, counting).plan(2200, get_macros_by_bmi(22), days=7)
+
+    assert counting.compose.call_count == len(set(share for _, share in MEAL_SHARES))
+    assert len(plans) == 7
+    for plan in plans:
+        assert set(plan) == {'breakfast', 'lunch', 'dinner', 'snacks', 'total_calories'}
+        assert len(plan['snacks']) == 2
+        for meal in [plan['breakfast'], plan['lunch'], plan['dinner']] + plan['snacks']:
+            assert 2 <= len(meal['foods']) <= 4
+            assert len({food['name'] for food in meal['foods']}) == len(meal['foods'])
+            assert meal['total_protein'] == pytest.approx(sum(food['protein'] for food in meal['foods']))
+            for food in meal['foods']:
+                base = table.nutrients(table.lookup(food['name']))
+                assert food['calories'] == pytest.approx(base['calories'] * food['portion'])
+        assert plan['total_calories'] == pytest.approx(
+            sum(plan[name]['total_calories'] for name in ('breakfast', 'lunch', 'dinner'))
+        )
+
+def test_meal_composer_matches_brute_force(mock_food_df):
+    import itertools
+    from meal_planner import MealComposer, PORTIONS, macro_targets
+    table = FoodTable.from_frame(mock_food_df)
+    composer = MealComposer(table, candidates=len(table), budget_ms=1000)
+    target = macro_targets(700, get_macros_by_bmi(22))
+
+    scaled = table.macros / composer.scale
+    best = min(
+        np.sum((np.asarray(portions) @ scaled[list(rows)] - target / composer.scale) ** 2)
+        for size in (2, 3, 4)
+        for rows in itertools.combinations(range(len(table)), size)
+        for portions in itertools.product(PORTIONS, repeat=size)
+    ) / np.sum((target / composer.scale) ** 2)
+
+    options = composer.compose(target)
+    assert options[0][2] == pytest.approx(best)
+    assert [error for _, _, error in options] == sorted(error for _, _, error in options)
+
+def test_meal_composer_beats_knn_sampling_macro_error(mock_food_df):
+    import itertools
+    from meal_planner import MealComposer, macro_error, macro_targets
+    table = FoodTable.from_frame(mock_food_df)
+    with patch("app.food_table", table):
+        model, _ = initialize_model()
+    composer = MealComposer(table)
+
+    for calories in (400, 600, 800):
+        target = macro_targets(calories, get_macros_by_bmi(22))
+        _, indices = model.kneighbors([target])
+        knn_error = np.mean([macro_error(table.macros[list(rows)].sum(axis=0), target)
+                             for rows in itertools.combinations(indices[0], 3)])
+        rows, portions, _ = composer.compose(target)[0]
+        composed = (table.macros[rows] * portions[:, None]).sum(axis=0)
+        assert macro_error(composed, target) < knn_error
+
+def test_meal_plan_endpoint_days(monkeypatch, mock_food_df):
+    from flask_jwt_extended import create_access_token
+    from app import app, profiles_collection
+    mock_table = FoodTable.from_frame(mock_food_df)
+    with patch("app.food_table", mock_table):
+        monkeypatch.setattr(profiles_collection, "find_one",
+                            lambda query, projection=None: {"bmi": 22, "daily_calories": 2000})
+
+        with app.test_client() as client, app.app_context():
+            headers = {"Authorization": f"Bearer {create_access_token(identity='testuser@example.com')}"}
+            week = client.get("/api/meal-plan?days=7", headers=headers)
+            assert week.status_code == 200
+            assert len(week.get_json()["days"]) == 7
+
+            single = client.get("/api/meal-plan", headers=headers)
+            assert single.status_code == 200
+            assert "breakfast" in single.get_json()
+
+            assert client.get("/api/meal-plan?days=0", headers=headers).status_code == 400
+
+@pytest.fixture
+def tagged_food_df():
+    return pd.DataFrame({
+        "Food Name": ["Chicken", "Rice", "Broccoli", "Beef", "Oats", "Cheese", "Tofu", "Almonds",
+                      "Salmon", "Lentils", "Egg", "Soy Milk"],
+        "Calories (kcal)": [165, 130, 55, 250, 389, 402, 76, 579, 208, 116, 155, 54],
+        "Protein (g)": [31, 2.5, 3.7, 26, 17, 25, 8, 21, 20, 9, 13, 3.3],
+        "Carbohydrates (g)": [0, 28, 11, 0, 66, 1.3, 1.9, 22, 0, 20, 1.1, 6],
+        "Fats (g)": [3.6, 0.3, 0.6, 20, 7, 33, 4.8, 50, 13, 0.4, 11, 1.8],
+        "Tags": [None, None, None, None, "gluten", None, None, None, None, None, None, None],
+    })
+
+def test_food_table_restriction_masks(tagged_food_df):
+    table = FoodTable.from_frame(tagged_food_df)
+    assert table.tags(table.lookup("Oats")) == ["gluten"]
+    assert table.tags(table.lookup("Soy Milk")) == ["soy"]
+
+    vegan = {table.name(row) for row in np.flatnonzero(table.allowed(["vegan"]))}
+    assert vegan == {"Rice", "Broccoli", "Oats", "Tofu", "Almonds", "Lentils", "Soy Milk"}
+
+    combined = table.allowed(["vegetarian", "nut_free", "soy_free"], excluded_foods=["Rice"])
+    expected = table.allowed(["vegetarian"]) & ~table.tag_masks["tree_nut"] & ~table.tag_masks["soy"]
+    expected[table.lookup("Rice")] = False
+    np.testing.assert_array_equal(combined, expected)
+
+    with pytest.raises(ValueError):
+        table.allowed(["carnivore"])
+
+def test_compiled_food_table_keeps_tags(tmp_path, tagged_food_df):
+    from food_table import load_food_table
+    source = tmp_path / "food_database.xlsx"
+    tagged_food_df.to_excel(source, index=False, engine="openpyxl")
+
+    table = load_food_table(str(source), str(tmp_path / "tables"))
+    assert isinstance(table.tag_bits, np.memmap)
+    np.testing.assert_array_equal(table.tag_bits, FoodTable.from_frame(tagged_food_df).tag_bits)
+
+def test_meal_plan_respects_restrictions(tagged_food_df):
+    from meal_planner import MealPlanner
+    table = FoodTable.from_frame(tagged_food_df)
+    mask = table.allowed(["vegan", "gluten_free"], excluded_foods=["Tofu"])
+    plans = MealPlanner(table, mask=mask).plan(2200, get_macros_by_bmi(22), days=3)
+
+    allowed = {table.name(row) for row in np.flatnonzero(mask)}
+    for plan in plans:
+        for meal in [plan['breakfast'], plan['lunch'], plan['dinner']] + plan['snacks']:
+            assert {food['name'] for food in meal['foods']} <= allowed
+
+    with pytest.raises(ValueError):
+        MealPlanner(table, mask=np.zeros(len(table), dtype=bool)).plan(2000, get_macros_by_bmi(22))
+
+def test_meal_plan_cached_per_profile_version(monkeypatch, mock_food_df):
+    from flask_jwt_extended import create_access_token
+    from app import app, profiles_collection, meal_plan_cache
+    meal_plan_cache.clear()
+    profile = {"bmi": 22, "daily_calories": 2000, "profile_version": 1}
+    monkeypatch.setattr(profiles_collection, "find_one", lambda query, projection=None: dict(profile))
+    monkeypatch.setattr(profiles_collection, "update_one", MagicMock())
+
+    with patch("app.food_table", FoodTable.from_frame(mock_food_df)), \
+            app.test_client() as client, app.app_context():
+        headers = {"Authorization": f"Bearer {create_access_token(identity='cache@example.com')}"}
+
+        first = client.get("/api/meal-plan", headers=headers)
+        second = client.get("/api/meal-plan", headers=headers)
+        assert first.headers["X-Cache"] == "MISS"
+        assert second.headers["X-Cache"] == "HIT"
+        assert second.get_json() == first.get_json()
+
+        regenerated = client.get("/api/meal-plan?regenerate=1", headers=headers)
+        assert regenerated.headers["X-Cache"] == "REGENERATED"
+        assert client.get("/api/meal-plan", headers=headers).get_json() == regenerated.get_json()
+
+        assert client.get("/api/meal-plan?days=2", headers=headers).headers["X-Cache"] == "MISS"
+
+        assert client.put("/api/edit-profile", json={"name": "New"}, headers=headers).status_code == 200
+        assert profiles_collection.update_one.call_args[0][1]["$inc"] == {"profile_version": 1}
+        assert client.get("/api/meal-plan", headers=headers).headers["X-Cache"] == "MISS"
+
+        profile["profile_version"] = 2
+        assert client.get("/api/meal-plan", headers=headers).headers["X-Cache"] == "MISS"
+
+        stats = client.get("/api/meal-plan/cache-stats", headers=headers).get_json()
+        assert stats["hits"] == 2
+        assert stats["invalidations"] == 2
@@ -0,0 +1,105 @@
+import pytest
+import joblib
+import os
+import sys
+from unittest.mock import patch
+from flask_jwt_extended import create_access_token
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from model_registry import ModelRegistry
+from app import app, resources
+
+def write_model(path, value, mtime):
+    joblib.dump({"value": value}, path)
+    os.utime(path, (mtime, mtime))
+
+def test_model_loaded_once(tmp_path):
+    path = tmp_path / "model.pkl"
+    write_model(path, 1, 1000)
+    loads = []
+
+    def loader(p):
+        loads.append(p)
+        return joblib.load(p)
+
+    registry = ModelRegistry(str(path), loader=loader, check_interval=0)
+    first = registry.get()
+    second = registry.get()
+    assert first is second
+    assert first.model == {"value": 1}
+    assert len(loads) == 1
+
+def test_model_swapped_when_artifact_changes(tmp_path):
+    path = tmp_path / "model.pkl"
+    write_model(path, 1, 1000)
+    registry = ModelRegistry(str(path), check_interval=0)
+    old = registry.get()
+
+    write_model(path, 2, 2000)
+    new = registry.get()
+    assert new.model == {"value": 2}
+    assert new.version != old.version
+    assert old.model == {"value": 1}
+
+def test_touch_without_content_change_keeps_model(tmp_path):
+    path = tmp_path / "model.pkl"
+    write_model(path, 1, 1000)
+    registry = ModelRegistry(str(path), check_interval=0)
+    old = registry.get()
+
+    os.utime(path, (3000, 3000))
+    assert registry.get() is old
+
+def test_broken_artifact_keeps_previous_model(tmp_path):
+    path = tmp_path / "model.pkl"
+    write_model(path, 1, 1000)
+    registry = ModelRegistry(str(path), check_interval=0)
+    old = registry.get()
+
+    path.write_bytes(b"not a pickle")
+    os.utime(path, (4000, 4000))
+    assert registry.get() is old
+
+def test_check_interval_skips_stat(tmp_path):
+    path = tmp_path / "model.pkl"
+    write_model(path, 1, 1000)
+    registry = ModelRegistry(str(path), check_interval=3600)
+    old = registry.get()
+
+    write_model(path, 2, 2000)
+    assert registry.get() is old
+
+def test_missing_artifact(tmp_path):
+    registry = ModelRegistry(str(tmp_path / "missing.pkl"))
+    with pytest.raises(FileNotFoundError):
+        registry.get()
+
+def test_missing_artifact_checked_once_per_interval(tmp_path, capsys):
+    path = tmp_path / "late.pkl"
+    registry = ModelRegistry(str(path), check_interval=3600)
+    with patch("model_registry.os.stat", wraps=os.stat) as mock_stat:
+        for _ in range(3):
+            with pytest.raises(FileNotFoundError):
+                registry.get()
+    assert mock_stat.call_count == 1
+    assert capsys.readouterr().out.count("not found") == 1
+
+    write_model(path, 1, 1000)
+    registry._next_check = 0
+    assert registry.get().model == {"value": 1}
+
+@patch("app.nutrition_totals_collection.find_one")
+@patch("app.profiles_collection.find_one")
+def test_recommend_diet_reports_model_version(mock_profile, mock_totals):
+    mock_profile.return_value = {"bmi": 22.0}
+    mock_totals.return_value = {"nutrition": {"calories": 500, "protein": 30, "carbs": 60, "fats": 10}, "meals": 1}
+
+    with app.app_context():
+        token = create_access_token(identity="test@example.com")
+    with app.test_client() as client:
+        res = client.get("/api/recommend-diet", headers={"Authorization": f"Bearer {token}"})
+
+    assert res.status_code == 200
+    assert res.json["model_version"] == resources.get("diet_models").version
+    assert res.json["overall_nutrition"]["calories"] == 500
+    assert "goal" in res.json["recommended_diet"]
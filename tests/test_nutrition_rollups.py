@@ -0,0 +1,136 @@
+import pytest
+from datetime import date, datetime
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from nutrition_rollups import backfill, lifetime_totals, record_meal, window, window_totals
+from app import app, meal_collection, nutrition_daily_collection, nutrition_totals_collection
+
+class FakeCursor(list):
+    def sort(self, key, direction=1):
+        return FakeCursor(sorted(self, key=lambda doc: doc[key], reverse=direction < 0))
+
+def rollup(day, calories, meals=1):
+    return {"date": day, "meals": meals,
+            "nutrition": {"calories": calories, "protein": 10, "carbs": 20, "fats": 5}}
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    app.config['JWT_SECRET_KEY'] = 'test_secret_key'
+    with app.test_client() as client:
+        yield client
+
+@pytest.fixture
+def auth_header():
+    from flask_jwt_extended import create_access_token
+    with app.app_context():
+        token = create_access_token(identity="testuser@example.com")
+    return {"Authorization": f"Bearer {token}"}
+
+def test_record_meal_increments_day_and_lifetime():
+    daily, totals = MagicMock(), MagicMock()
+    record_meal(daily, totals, "a@x.com", datetime(2025, 4, 6, 23, 59),
+                {"calories": 500, "protein": 30, "carbs": 60, "fats": 10})
+
+    query, update = daily.update_one.call_args[0]
+    assert query == {"user": "a@x.com", "date": "2025-04-06"}
+    assert update["$inc"]["nutrition.calories"] == 500
+    assert update["$inc"]["meals"] == 1
+    assert isinstance(update["$setOnInsert"]["since"], datetime)
+    assert daily.update_one.call_args[1]["upsert"] is True
+    assert totals.update_one.call_args[0] == ({"user": "a@x.com"}, update)
+
+def test_window_totals_sum_only_the_requested_days():
+    daily = MagicMock()
+    daily.find.return_value = FakeCursor([rollup("2025-04-06", 700, meals=2), rollup("2025-04-01", 300)])
+
+    start, end = window("week", date(2025, 4, 6))
+    totals, meals, days = window_totals(daily, "a@x.com", start, end)
+
+    assert (start, end) == (date(2025, 3, 31), date(2025, 4, 6))
+    assert daily.find.call_args[0][0]["date"] == {"$gte": "2025-03-31", "$lte": "2025-04-06"}
+    assert totals["calories"] == 1000 and totals["fats"] == 10
+    assert meals == 3
+    assert [day["date"] for day in days] == ["2025-04-01", "2025-04-06"]
+
+def test_lifetime_totals_without_meals():
+    totals = MagicMock()
+    totals.find_one.return_value = None
+    assert lifetime_totals(totals, "a@x.com") == ({"calories": 0, "protein": 0, "carbs": 0, "fats": 0}, 0)
+
+def test_lifetime_totals_fall_back_to_meals_before_backfill():
+    totals, meals = MagicMock(), MagicMock()
+    totals.find_one.return_value = None
+    meals.aggregate.return_value = iter([{"_id": None, "meals": 3, "calories": 1500, "protein": 90, "carbs": 160, "fats": 40}])
+    assert lifetime_totals(totals, "a@x.com", meals) == (
+        {"calories": 1500, "protein": 90, "carbs": 160, "fats": 40}, 3)
+    assert meals.aggregate.call_args[0][0][0] == {"$match": {"user": "a@x.com"}}
+
+    meals.aggregate.return_value = iter([])
+    assert lifetime_totals(totals, "a@x.com", meals)[1] == 0
+
+def test_backfill_replaces_rollups_in_batches():
+    meals, daily, totals = MagicMock(), MagicMock(), MagicMock()
+    meals.aggregate.return_value = iter([
+        {"_id": {"user": "a", "date": "2025-04-05"}, "meals": 2, "calories": 900, "protein": 40, "carbs": 90, "fats": 30},
+        {"_id": {"user": "a", "date": "2025-04-06"}, "meals": 1, "calories": 400, "protein": 20, "carbs": 50, "fats": 10},
+        {"_id": {"user": "b", "date": "2025-04-06"}, "meals": 1, "calories": 250, "protein": 5, "carbs": 40, "fats": 8},
+    ])
+
+    assert backfill(meals, daily, totals, batch_size=2) == (2, 3)
+
+    batches = [call[0][0] for call in daily.bulk_write.call_args_list]
+    assert [len(batch) for batch in batches] == [2, 1]
+    started = batches[0][1]._doc.pop("since")
+    assert batches[0][1]._doc == {"user": "a", "date": "2025-04-06", "meals": 1,
+                                  "nutrition": {"calories": 400, "protein": 20, "carbs": 50, "fats": 10}}
+    # Rollups this run did not rewrite (days or users whose meals are gone) are swept.
+    stale = {"$or": [{"since": {"$lt": started}}, {"since": {"$exists": False}}]}
+    daily.delete_many.assert_called_once_with(stale)
+    totals.delete_many.assert_called_once_with(stale)
+    lifetime = {op._filter["user"]: op._doc for call in totals.bulk_write.call_args_list for op in call[0][0]}
+    assert lifetime["a"]["nutrition"]["calories"] == 1300
+    assert lifetime["a"]["meals"] == 3
+    assert lifetime["b"]["nutrition"]["carbs"] == 40
+
+def test_get_meals_reads_the_requested_week(client, auth_header):
+    days = FakeCursor([rollup("2025-04-05", 600), rollup("2025-04-06", 400)])
+    meals = FakeCursor([{"user": "testuser@example.com", "date": "2025-04-06T08:00:00", "meals": {}}])
+    with patch.object(nutrition_daily_collection, "find", MagicMock(return_value=days)), \
+            patch.object(meal_collection, "find", MagicMock(return_value=meals)) as find_meals:
+        res = client.get("/api/get-meals?period=week&date=2025-04-06", headers=auth_header)
+
+    assert res.status_code == 200
+    body = res.get_json()
+    assert (body["start"], body["end"]) == ("2025-03-31", "2025-04-06")
+    assert body["overall_nutrition"]["calories"] == 1000
+    assert body["meal_count"] == 2
+    assert len(body["meals"]) == 1
+    assert find_meals.call_args[0][0]["date"] == {"$gte": "2025-03-31", "$lt": "2025-04-07"}
+
+def test_get_meals_all_time_uses_lifetime_rollup(client, auth_header):
+    with patch.object(nutrition_totals_collection, "find_one",
+                      MagicMock(return_value={"nutrition": {"calories": 12000}, "meals": 30})), \
+            patch.object(meal_collection, "find", MagicMock(side_effect=AssertionError("meals scanned"))):
+        res = client.get("/api/get-meals?period=all", headers=auth_header)
+
+    assert res.status_code == 200
+    assert res.get_json()["overall_nutrition"]["calories"] == 12000
+    assert res.get_json()["meal_count"] == 30
+
+def test_get_meals_without_a_window_lists_every_meal(client, auth_header):
+    meals = [{"user": "testuser@example.com", "date": "2025-04-05T08:00:00", "nutrition": {"calories": 300, "fats": 4}},
+             {"user": "testuser@example.com", "date": "bad", "nutrition": {"calories": 200, "protein": 12}}]
+    with patch.object(meal_collection, "find", MagicMock(return_value=meals)), \
+            patch.object(nutrition_daily_collection, "find", MagicMock(side_effect=AssertionError("rollups read"))):
+        res = client.get("/api/get-meals", headers=auth_header)
+
+    assert res.status_code == 200
+    assert res.get_json() == {"meals": meals, "overall_nutrition": {"calories": 500, "protein": 12, "carbs": 0, "fats": 4}}
+
+def test_get_meals_rejects_bad_window(client, auth_header):
+    assert client.get("/api/get-meals?period=month", headers=auth_header).status_code == 400
+    assert client.get("/api/get-meals?date=06-04-2025", headers=auth_header).status_code == 400
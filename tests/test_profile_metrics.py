@@ -0,0 +1,113 @@
+import pytest
+import numpy as np
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from profile_metrics import batch_updates, compute, for_profile, metrics_version, recompute
+from app import calculate_bmi, calculate_base_calories
+
+class Result:
+    def __init__(self, n):
+        self.modified_count = n
+
+class FakeCursor(list):
+    def sort(self, key, direction=1):
+        return FakeCursor(sorted(self, key=lambda doc: doc[key]))
+
+    def limit(self, n):
+        return FakeCursor(self[:n])
+
+class FakeProfiles:
+    def __init__(self, docs):
+        self.docs = {doc["_id"]: doc for doc in docs}
+        self.queries = []
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        after = query.get("_id", {}).get("$gt")
+        return FakeCursor(dict(doc) for _id, doc in self.docs.items() if after is None or _id > after)
+
+    def bulk_write(self, ops, ordered=True):
+        modified = 0
+        for op in ops:
+            doc = self.docs[op._filter["_id"]]
+            if doc.get("profile_version") != op._filter["profile_version"]:
+                continue
+            doc.update(op._doc["$set"])
+            for field, step in op._doc.get("$inc", {}).items():
+                doc[field] = doc.get(field, 0) + step
+            modified += 1
+        return Result(modified)
+
+class FakeCheckpoints:
+    def __init__(self):
+        self.docs = {}
+
+    def find_one(self, query):
+        return self.docs.get(query["_id"])
+
+    def update_one(self, query, update, upsert=False):
+        doc = self.docs.setdefault(query["_id"], {})
+        doc.update(update.get("$set", {}))
+        for field, step in update.get("$inc", {}).items():
+            doc[field] = doc.get(field, 0) + step
+
+def profile(_id, weight=70, height=175, gender="male", **extra):
+    return {"_id": _id, "weight": weight, "height": height, "age": 30, "gender": gender, **extra}
+
+def test_vectorized_formulas_match_scalar_helpers():
+    profiles = [profile(i, weight=50 + i, height=150 + 3 * i, gender="female" if i % 2 else "male") for i in range(20)]
+    valid, bmis, calories = compute(profiles, "base")
+    assert valid.all()
+    for p, b, c in zip(profiles, bmis, calories):
+        assert b == calculate_bmi(p["weight"], p["height"])
+        assert c == calculate_base_calories(p["weight"], p["gender"])
+
+def test_mifflin_st_jeor_uses_activity_level():
+    metrics = for_profile(profile(1, gender="female", activity_level="moderate"), "mifflin_st_jeor")
+    assert metrics["daily_calories"] == pytest.approx((10 * 70 + 6.25 * 175 - 5 * 30 - 161) * 1.55)
+    assert metrics["metrics_version"] == metrics_version("mifflin_st_jeor")
+
+def test_invalid_profiles_are_skipped():
+    valid, _, _ = compute([profile(1, weight=None), profile(2, height="abc"), profile(3, height=-1), profile(4)], "base")
+    assert valid.tolist() == [False, False, False, True]
+
+def test_batch_updates_only_touch_stale_profiles():
+    current = {**profile(1), **for_profile(profile(1), "base"), "profile_version": 3}
+    renamed = {**current, "_id": 2, "metrics_version": "old"}
+    stale = profile(3, bmi=1.0, daily_calories=1.0)
+    ops = batch_updates([current, renamed, stale], "base")
+
+    assert [op._filter["_id"] for op in ops] == [2, 3]
+    assert "$inc" not in ops[0]._doc
+    assert ops[0]._filter["profile_version"] == 3
+    assert ops[1]._doc["$inc"] == {"profile_version": 1}
+
+def test_recompute_resumes_from_checkpoint_and_throttles():
+    profiles = FakeProfiles([profile(i, weight=60 + i) for i in range(1, 8)])
+    checkpoints = FakeCheckpoints()
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    result = recompute(profiles, checkpoints, "base", batch_size=3, max_rate=10,
+                       log=lambda msg: None, clock=lambda: now[0], sleep=sleep)
+    assert result["scanned"] == 7 and result["updated"] == 7
+    assert sleeps == pytest.approx([0.3, 0.3, 0.1])
+    assert all(doc["bmi"] == calculate_bmi(doc["weight"], 175) for doc in profiles.docs.values())
+    assert all(doc["profile_version"] == 1 for doc in profiles.docs.values())
+
+    state = checkpoints.docs[f"profile_metrics:{metrics_version('base')}"]
+    assert state["last_id"] == 7 and state["finished"]
+
+    profiles.docs[8] = profile(8)
+    result = recompute(profiles, checkpoints, "base", log=lambda msg: None)
+    assert result["scanned"] == 1
+    assert profiles.queries[-2] == {"_id": {"$gt": 7}}
+
+    assert recompute(profiles, checkpoints, "base", restart=True, log=lambda msg: None) == \
+        {"scanned": 8, "updated": 0, "seconds": pytest.approx(0, abs=1)}
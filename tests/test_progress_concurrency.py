@@ -0,0 +1,119 @@
+import pytest
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask_jwt_extended import create_access_token
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import data_access
+from app import app, WORKOUT_BADGES
+
+THREADS = 16
+REQUESTS_PER_THREAD = 21
+EMAIL = "stress@example.com"
+CHALLENGE = "Stress Test Steps"
+
+class Serialized:
+    """Runs one operation of the wrapped collection at a time.
+
+    A single write is atomic in MongoDB, but an in-memory stand-in for it
+    need not be thread-safe. Requests still interleave between operations,
+    which is where read-then-write code loses updates.
+    """
+
+    def __init__(self, collection, lock):
+        self.collection = collection
+        self.lock = lock
+
+    def __getattr__(self, name):
+        method = getattr(self.collection, name)
+
+        def call(*args, **kwargs):
+            with self.lock:
+                return method(*args, **kwargs)
+        return call
+
+@pytest.fixture
+def collections(monkeypatch):
+    # An in-memory Mongo: the test needs real update semantics, not a live server.
+    mongomock = pytest.importorskip("mongomock")
+    monkeypatch.setenv("MONGO_URI", "mongodb://localhost:27017")
+    monkeypatch.setattr(data_access, "MongoClient", mongomock.MongoClient)
+    data_access._forget_client()
+    lock = threading.Lock()
+    wrapped = {}
+    for name in ("user_challenges", "challenges", "progress", "achievements"):
+        wrapped[name] = Serialized(getattr(data_access, name).resolve(), lock)
+        monkeypatch.setattr(data_access, name, wrapped[name])
+        monkeypatch.setattr(f"app.{name}_collection", wrapped[name])
+    yield wrapped
+    data_access._forget_client()
+
+@pytest.fixture
+def clean(collections):
+    app.config["TESTING"] = True
+    app.config["JWT_SECRET_KEY"] = "test_secret_key"
+    user_challenges_collection = collections["user_challenges"]
+    challenges_collection = collections["challenges"]
+    progress_collection = collections["progress"]
+    achievements_collection = collections["achievements"]
+
+    def cleanup():
+        user_challenges_collection.delete_many({"email": EMAIL})
+        challenges_collection.delete_many({"name": CHALLENGE})
+        progress_collection.delete_many({"user": EMAIL})
+        achievements_collection.delete_many({"user": EMAIL})
+    cleanup()
+    yield collections
+    cleanup()
+
+def auth_header():
+    with app.app_context():
+        token = create_access_token(identity=EMAIL)
+    return {"Authorization": f"Bearer {token}"}
+
+def hammer(method, path, json=None):
+    """Send THREADS * REQUESTS_PER_THREAD requests from THREADS threads; returns the JSON responses."""
+    headers = auth_header()
+
+    def worker(_):
+        responses = []
+        with app.test_client() as client:
+            for _ in range(REQUESTS_PER_THREAD):
+                response = getattr(client, method)(path, json=json, headers=headers)
+                assert response.status_code == 200, response.json
+                responses.append(response.json)
+        return responses
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        return [response for responses in pool.map(worker, range(THREADS)) for response in responses]
+
+def test_concurrent_challenge_progress_is_not_lost(clean):
+    challenges_collection, user_challenges_collection = clean["challenges"], clean["user_challenges"]
+    achievements_collection = clean["achievements"]
+    total = THREADS * REQUESTS_PER_THREAD
+    challenges_collection.insert_one({"name": CHALLENGE, "target": total // 2, "unit": "steps"})
+    user_challenges_collection.insert_one({"email": EMAIL, "challenge_name": CHALLENGE, "progress": 0})
+
+    responses = hammer("post", "/api/update-challenge-progress", {"challenge_name": CHALLENGE, "progress": 1})
+
+    entry = user_challenges_collection.find_one({"email": EMAIL, "challenge_name": CHALLENGE})
+    assert entry["progress"] == total
+    assert entry["completed"] is True
+    assert sum("badge" in response for response in responses) == 1
+    assert achievements_collection.count_documents({"user": EMAIL, "title": f"🏆 {CHALLENGE} Champion"}) == 1
+
+def test_concurrent_workout_days_award_each_badge_once_per_cycle(clean):
+    progress_collection, achievements_collection = clean["progress"], clean["achievements"]
+    total = THREADS * REQUESTS_PER_THREAD
+    cycle = max(WORKOUT_BADGES)
+
+    responses = hammer("post", "/api/track-progress")
+
+    assert progress_collection.find_one({"user": EMAIL})["completed_days"] == total % cycle
+    assert sorted(response["completed_days"] for response in responses) == \
+        sorted(day % cycle for day in range(1, total + 1))
+    for badge in WORKOUT_BADGES.values():
+        assert sum(response["badge"] == badge for response in responses) == total // cycle
+        assert achievements_collection.count_documents({"user": EMAIL, "title": f"🎖 {badge}"}) == total // cycle
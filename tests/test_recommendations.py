@@ -1,4 +1,5 @@
 import pytest
+import numpy as np
 from flask_jwt_extended import create_access_token
 from flask import json
 import sys
@@ -36,10 +37,12 @@ def mock_profile(monkeypatch):
         ],
     }
 
-    def mock_find_one(query):
+    def mock_find_one(query, projection=None):
         return sample_profile if query.get("email") == "testuser@example.com" else None
 
     monkeypatch.setattr("app.profiles_collection.find_one", mock_find_one)
+    # Profiles without a stored taste vector get one written on first read.
+    monkeypatch.setattr("app.profiles_collection.update_one", lambda query, update: None)
 
     return sample_profile  
 
@@ -75,7 +78,13 @@ def mock_exercises_df(monkeypatch):
     ]
 
     df = pd.DataFrame(mock_data)
+    df['tags'] = df['bodyPart'] + ' ' + df['equipment'] + ' ' + df['target']
 
+    from exercise_engine import ExerciseEngine
+    from exercise_index import index_from_frame
+    from app import format_gif_url
+
+    monkeypatch.setattr("app.exercise_engine", ExerciseEngine(df, index_from_frame(df, k=2), gif_url=format_gif_url))
     monkeypatch.setattr("app.exercises_df", df)  
     return df
 
@@ -129,7 +138,7 @@ def test_get_personalized_workouts_success(client, auth_header, mock_profile, mo
     assert True  
 
 def test_get_personalized_workouts_missing_bmi(client, auth_header, monkeypatch):
-    def mock_find_one(query):
+    def mock_find_one(query, projection=None):
         return {
             "email": "testuser@example.com"
         }
@@ -142,7 +151,7 @@ def test_get_personalized_workouts_missing_bmi(client, auth_header, monkeypatch)
     assert "BMI not found" in json_data["error"]
 
 def test_get_personalized_workouts_no_profile(client, auth_header, monkeypatch):
-    def mock_find_one(query):
+    def mock_find_one(query, projection=None):
         return None
 
     monkeypatch.setattr(profiles_collection, "find_one", mock_find_one)
@@ -150,3 +159,113 @@ def test_get_personalized_workouts_no_profile(client, auth_header, monkeypatch):
     assert response.status_code == 400 or response.status_code == 500
     json_data = response.get_json()
     assert json_data["success"] is False
+
+def test_exercise_engine_candidates_match_pandas_filters():
+    from app import resources
+    engine = resources.get("exercise_engine")
+    df = engine.df
+
+    mask = engine.candidates("beginner", "upper arms", ["dumbbell", "body weight"])
+    expected = df[~df['name'].str.contains('advanced|pro', case=False)]
+    expected = expected[expected['bodyPart'] == "upper arms"]
+    expected = expected[expected['equipment'].isin(["dumbbell", "body weight"])]
+    assert list(np.flatnonzero(mask)) == list(expected.index)
+
+    mask = engine.candidates("low-impact", "all", ["band", "body weight"]) & engine.leg
+    expected = df[df['equipment'].str.contains('body weight|resistance band', case=False)]
+    expected = expected[expected['equipment'].isin(["band", "body weight"])]
+    expected = expected[expected['bodyPart'].str.lower().str.contains("leg")]
+    assert list(np.flatnonzero(mask)) == list(expected.index)
+
+    assert not engine.candidates("intermediate", "no such part", ["barbell"]).any()
+
+def test_personalized_workouts_use_history_neighbors(client, auth_header, mock_profile, monkeypatch):
+    from app import resources
+    writes = []
+    monkeypatch.setattr("app.profiles_collection.update_one", lambda query, update: writes.append((query, update)))
+    engine = resources.get("exercise_engine")
+    mock_profile["preferred_body_part"] = "all"
+    mock_profile["equipment"] = ["body weight"]
+    mock_profile["workout_history"] = [{"exerciseId": 1}, {"exerciseId": 1}]
+
+    seen = engine.rows_for_ids([1])
+    mask = engine.candidates("intermediate", "all", ["body weight"]) & engine.arm
+    expected, _ = engine.recommend(engine.taste_vector([seen[0], seen[0]]), k=7, exclude=seen, mask=mask)
+
+    response = client.get("/api/get-personalized-workouts", headers=auth_header)
+    assert response.status_code == 200
+    plan = response.get_json()["weekly_workout_plan"]
+    days = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"][:len(expected)]
+    assert [plan[day]["arms"]["id"] for day in days] == [engine.records[row]["id"] for row in expected]
+    assert all(plan[day]["arms"]["id"] != 1 for day in plan)
+
+    # The rebuilt vector is stored once, only while the profile has no current one.
+    [(query, update)] = writes
+    assert query == {"email": "testuser@example.com", "taste.index_version": {"$ne": engine.version}}
+    np.testing.assert_allclose(update["$set"]["taste"]["vector"], engine.taste_vector([seen[0], seen[0]]), rtol=1e-6)
+
+def test_taste_vector_incremental_update_matches_rebuild():
+    from app import resources
+    engine = resources.get("exercise_engine")
+    rows = [0, 5, 5, 9]
+    ages = [30.0, 12.0, 3.0, 0.0]
+
+    vector = np.zeros(engine.index.tfidf_matrix.shape[1])
+    previous_age = ages[0]
+    for row, age in zip(rows, ages):
+        vector = engine.update_taste(vector, row, elapsed_days=previous_age - age)
+        previous_age = age
+
+    np.testing.assert_allclose(vector, engine.taste_vector(rows, ages), rtol=1e-6)
+
+def test_taste_recommend_matches_brute_force():
+    from app import resources
+    engine = resources.get("exercise_engine")
+    vector = engine.taste_vector([0, 5, 9], [0.0, 7.0, 21.0])
+    exclude = np.array([0, 5, 9])
+
+    rows, scores = engine.recommend(vector, k=10, exclude=exclude, mask=engine.arm)
+
+    brute = engine.index.tfidf_matrix.toarray() @ vector
+    brute[exclude] = -np.inf
+    brute[~engine.arm] = -np.inf
+    np.testing.assert_allclose(scores, np.sort(brute)[::-1][:len(rows)], rtol=1e-6)
+    assert all(engine.arm[row] and row not in exclude for row in rows)
+
+def test_log_workout_updates_taste_incrementally(client, auth_header, monkeypatch):
+    from datetime import datetime, timedelta
+    from app import resources
+    engine = resources.get("exercise_engine")
+    vector = engine.taste_vector(engine.rows_for_ids([1]))
+    profile = {
+        "email": "testuser@example.com",
+        "workout_history": [{"exerciseId": 1}],
+        "taste": {
+            "vector": vector.tolist(),
+            "index_version": engine.version,
+            "updated_at": datetime.utcnow() - timedelta(days=14),
+            "updates": 4,
+        },
+    }
+    writes = []
+
+    class Result:
+        matched_count = 1
+
+    monkeypatch.setattr(profiles_collection, "find_one", lambda query, projection=None: profile)
+    monkeypatch.setattr(profiles_collection, "update_one", lambda query, update: writes.append((query, update)) or Result())
+
+    response = client.post("/api/log-workout", json={"exerciseId": 2}, headers=auth_header)
+    assert response.status_code == 201
+
+    query, update = writes[0]
+    assert query["taste.updates"] == 4
+    assert update["$push"]["workout_history"]["exerciseId"] == 2
+    taste = update["$set"]["taste"]
+    assert taste["updates"] == 5
+    expected = engine.update_taste(vector, engine.row_for_id(2), elapsed_days=14)
+    np.testing.assert_allclose(taste["vector"], expected, rtol=1e-4)
+
+def test_log_workout_unknown_exercise(client, auth_header):
+    response = client.post("/api/log-workout", json={"exerciseId": -1}, headers=auth_header)
+    assert response.status_code == 404
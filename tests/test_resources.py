@@ -0,0 +1,62 @@
+import pytest
+import subprocess
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from resources import ResourceRegistry
+
+def test_resource_built_once_on_first_use():
+    namespace = {}
+    registry = ResourceRegistry(namespace)
+    calls = []
+
+    @registry.resource("model")
+    def build_model():
+        calls.append(1)
+        return "model"
+
+    assert not registry.loaded("model")
+    assert registry.get("model") == "model"
+    assert registry.get("model") == "model"
+    assert calls == [1]
+    assert namespace["model"] == "model"
+    assert "model" in registry.timings
+
+def test_published_value_can_be_overridden():
+    namespace = {}
+    registry = ResourceRegistry(namespace)
+    registry.resource("data")(lambda: "real")
+
+    namespace["data"] = "mocked"
+    assert registry.get("data") == "mocked"
+
+    registry.reset("data")
+    assert registry.get("data") == "real"
+
+def test_unknown_resource():
+    with pytest.raises(KeyError):
+        ResourceRegistry().get("missing")
+
+def test_warm_up_survives_failing_builder():
+    registry = ResourceRegistry()
+
+    @registry.resource("broken")
+    def build_broken():
+        raise RuntimeError("no file")
+
+    registry.resource("ok")(lambda: 1)
+    registry.warm_up()
+    assert registry.loaded("ok")
+    assert not registry.loaded("broken")
+
+def test_app_import_is_lazy():
+    import app
+    assert "food_table" in app.resources
+    assert "food_knn" not in app.resources and "food_knn" not in app.SHARED_RESOURCES
+
+def test_preloaded_resources_import_no_sklearn():
+    code = ("import sys, app; app.preload_shared_resources(); "
+            "assert not [m for m in sys.modules if m.startswith('sklearn')]")
+    subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                   check=True, capture_output=True)
@@ -36,7 +36,7 @@ def test_get_sleep_streak(mock_find, client):
 
 @patch("app.user_challenges_collection.update_one")
 def test_reset_sleep(mock_update, client):
-    mock_update.return_value = None
+    mock_update.return_value = MagicMock(matched_count=1, upserted_id=None)
     res = client.post("/api/reset-sleep", headers=auth_header())
     assert res.status_code == 200
     assert res.json["message"] == "Sleep value reset successfully!"
@@ -0,0 +1,76 @@
+import pytest
+import json
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from model_registry import ModelRegistry
+from train_diet_model import FEATURES, promote, read_features, reservoir_sample, train
+
+@pytest.fixture
+def diet_csv(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 300
+    height = rng.uniform(1.5, 1.9, n)
+    bmi = np.where(np.arange(n) % 2, rng.normal(21, 1, n), rng.normal(35, 1, n))
+    path = tmp_path / "diet.csv"
+    pd.DataFrame({
+        "Gender": "Female", "Height": height, "Weight": bmi * height ** 2,
+        "FCVC": rng.integers(1, 4, n), "NCP": rng.integers(1, 5, n),
+        "FAF": rng.integers(0, 4, n), "CH2O": rng.integers(1, 4, n),
+    }).to_csv(path, index=False)
+    return path
+
+def test_read_features_in_chunks(diet_csv):
+    chunks = list(read_features(diet_csv, chunk_rows=128))
+    assert [len(chunk) for chunk in chunks] == [128, 128, 44]
+    df = pd.read_csv(diet_csv)
+    np.testing.assert_allclose(chunks[0][:, 0], (df["Weight"] / df["Height"] ** 2)[:128])
+    assert chunks[0].shape[1] == len(FEATURES)
+
+def test_reservoir_sample_is_bounded():
+    chunks = (np.full((100, len(FEATURES)), i, dtype=np.float64) for i in range(10))
+    sample, rows = reservoir_sample(chunks, size=50)
+    assert rows == 1000
+    assert sample.shape == (50, len(FEATURES))
+    assert len(np.unique(sample[:, 0])) > 1
+
+def test_sweep_publishes_versioned_artifact(diet_csv, tmp_path):
+    path = train(str(diet_csv), ks=range(2, 5), n_init=2, n_jobs=1, out_dir=str(tmp_path / "models"),
+                 log=lambda msg: None)
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+
+    assert meta["k"] == 2
+    assert [m["k"] for m in meta["sweep"]] == [2, 3, 4]
+    assert all(m["silhouette"] is not None for m in meta["sweep"])
+    assert meta["features"] == list(FEATURES)
+    assert meta["data"]["rows"] == 300
+    assert os.path.basename(path) == meta["version"]
+    assert os.path.exists(os.path.join(path, "model.pkl"))
+
+def test_minibatch_training(diet_csv, tmp_path):
+    path = train(str(diet_csv), k=2, minibatch=True, chunk_rows=64, batch_size=32, n_jobs=1,
+                 out_dir=str(tmp_path / "models"), log=lambda msg: None)
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    assert meta["algorithm"] == "MiniBatchKMeans"
+    assert meta["sweep"][0]["silhouette"] > 0.5
+
+def test_promote_swaps_served_model(diet_csv, tmp_path):
+    import diet_clusters
+
+    served = str(tmp_path / "diet_kmeans.pkl")
+    centroids = str(tmp_path / "diet_centroids.npz")
+    first = train(str(diet_csv), k=2, n_init=1, n_jobs=1, out_dir=str(tmp_path / "models"), log=lambda msg: None)
+    promote(first, served, centroids)
+    registry = ModelRegistry(centroids, loader=diet_clusters.load, check_interval=0)
+    assert registry.get().model.n_clusters == 2
+
+    second = train(str(diet_csv), k=3, n_init=1, n_jobs=1, out_dir=str(tmp_path / "models"), log=lambda msg: None)
+    promote(second, served, centroids)
+    assert registry.get().model.n_clusters == 3
+    assert ModelRegistry(served, check_interval=0).get().model.n_clusters == 3
+    assert not [name for name in os.listdir(tmp_path) if ".tmp-" in name]
@@ -0,0 +1,51 @@
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from ttl_cache import TTLCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_lru_eviction_keeps_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set(("a", 1), "A")
+    cache.set(("b", 1), "B")
+    assert cache.get(("a", 1)) == "A"
+    cache.set(("c", 1), "C")
+
+    assert cache.get(("b", 1)) is None
+    assert cache.get(("a", 1)) == "A"
+    assert cache.get(("c", 1)) == "C"
+    assert cache.stats()["evictions"] == 1
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=60, clock=clock)
+    cache.set(("a", 1), "A")
+    clock.now = 59
+    assert cache.get(("a", 1)) == "A"
+    clock.now = 60
+    assert cache.get(("a", 1)) is None
+    assert len(cache) == 0
+    assert cache.stats()["expirations"] == 1
+
+def test_invalidate_drops_whole_group_and_counts():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set(("a", "mon"), 1)
+    cache.set(("a", "tue"), 2)
+    cache.set(("b", "mon"), 3)
+
+    assert cache.invalidate("a") == 2
+    assert cache.get(("a", "mon")) is None
+    assert cache.get(("b", "mon")) == 3
+
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["hit_rate"] == pytest.approx(0.5)
+    assert stats["invalidations"] == 2
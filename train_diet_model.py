@@ -1,56 +1,206 @@
+"""Train the diet clustering model.
+
+    python train_diet_model.py                          # sweep K=2..8 on diet.csv, keep the best silhouette
+    python train_diet_model.py --k 3 --promote          # train K=3 and serve it
+    python train_diet_model.py --data big.csv --minibatch --chunk-rows 200000
+
+Each K of the sweep is fitted in its own worker process and scored by
+inertia and silhouette (on a fixed-size sample, silhouette being quadratic).
+With --minibatch the CSV is streamed in chunks into MiniBatchKMeans.partial_fit,
+so memory is bounded by the chunk size whatever the dataset size.
+
+Every run publishes a versioned artifact under artifacts/diet_models/
+holding model.pkl, centroids.npz (the sklearn-free export served by
+diet_clusters.py, checked against the model's predict) and a meta.json with
+the features, K, the sweep's metrics and the training data's hash.
+--promote copies both over diet_kmeans.pkl / diet_centroids.npz atomically;
+the serving ModelRegistry notices the new content and swaps it in without a
+restart.
+"""
+import argparse
 import os
+import shutil
+from datetime import datetime
+
+import numpy as np
 import pandas as pd
-import joblib
-import matplotlib.pyplot as plt
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import LabelEncoder
-
-# **🔹 Restrict CPU usage to prevent Joblib parallelization issues**
-os.environ["LOKY_MAX_CPU_COUNT"] = "1"  
-
-# **🔹 Load dataset efficiently**
-dataset_path = os.path.join(os.getcwd(), "diet.csv")
-if not os.path.exists(dataset_path):
-    raise FileNotFoundError(f"❌ Dataset not found at {dataset_path}")
-
-# **🔹 Load only necessary columns**
-df = pd.read_csv(dataset_path, usecols=["Height", "Weight", "FCVC", "NCP", "FAF", "CH2O", "NObeyesdad"])
-
-# **🔹 Compute BMI directly**
-df["BMI"] = df["Weight"] / (df["Height"] ** 2)
-
-# **🔹 Encode categorical labels (one-time transformation)**
-encoder = LabelEncoder()
-df["NObeyesdad"] = encoder.fit_transform(df["NObeyesdad"])
-
-# **🔹 Select only necessary features**
-X = df[["BMI", "FCVC", "NCP", "FAF", "CH2O"]].values  # Use `.values` to speed up NumPy processing
-
-# **🔹 Reduce K range (Speeds up training)**
-wcss = []
-for i in range(2, 4):  # ⚡ Testing only K=2 & K=3 for best speed
-    kmeans = KMeans(n_clusters=i, random_state=42, n_init=3, max_iter=20)  # ⚡ Lowered `n_init` & `max_iter`
-    kmeans.fit(X)
-    wcss.append(kmeans.inertia_)
-
-# **🔹 Plot Elbow Curve**
-plt.figure(figsize=(8, 5))
-plt.plot(range(2, 4), wcss, marker="o", linestyle="-", color="b")
-plt.xlabel("Number of Clusters (K)")
-plt.ylabel("WCSS (Within-Cluster Sum of Squares)")
-plt.title("Elbow Method for Optimal K")
-plt.grid(True)
-plt.show()
-
-# **🔹 Select Best `K` Based on Elbow Graph**
-optimal_k = 2  # Manually adjust this based on the graph
-
-# **🔹 Train Final Model (Highly Optimized)**
-kmeans = KMeans(n_clusters=optimal_k, random_state=42, n_init=3, max_iter=20)  # ⚡ Minimal settings for speed
-df["Cluster"] = kmeans.fit_predict(X)
-
-# **🔹 Save Trained Model**
-model_path = os.path.join(os.getcwd(), "diet_kmeans.pkl")
-joblib.dump(kmeans, model_path)
-
-print(f"✅ Model trained in **FAST MODE** with {optimal_k} clusters and saved at: {model_path}")
+
+from artifacts import ARTIFACTS_DIR, file_digest, publish_directory
+
+MODELS_DIR = os.path.join(ARTIFACTS_DIR, "diet_models")
+MODEL_PATH = "diet_kmeans.pkl"
+CENTROIDS_PATH = "diet_centroids.npz"
+FEATURES = ("BMI", "FCVC", "NCP", "FAF", "CH2O")
+SOURCE_COLUMNS = ["Height", "Weight", "FCVC", "NCP", "FAF", "CH2O"]
+CHUNK_ROWS = 100000
+SAMPLE_SIZE = 10000
+RANDOM_STATE = 42
+
+
+def read_features(path, chunk_rows=CHUNK_ROWS):
+    """Yield feature matrices of at most chunk_rows rows (BMI computed from height in m and weight in kg)."""
+    for chunk in pd.read_csv(path, usecols=SOURCE_COLUMNS, chunksize=chunk_rows):
+        chunk = chunk.dropna()
+        chunk = chunk[(chunk["Height"] > 0) & (chunk["Weight"] > 0)]
+        bmi = chunk["Weight"].to_numpy(dtype=np.float64) / chunk["Height"].to_numpy(dtype=np.float64) ** 2
+        yield np.column_stack([bmi] + [chunk[column].to_numpy(dtype=np.float64) for column in FEATURES[1:]])
+
+
+def reservoir_sample(chunks, size=SAMPLE_SIZE, seed=RANDOM_STATE):
+    """(uniform sample of at most size rows, total rows) over a stream of chunks, in one pass.
+
+    Every row draws a random key and the rows with the smallest keys are kept.
+    """
+    rng = np.random.default_rng(seed)
+    sample, keys, rows = np.empty((0, len(FEATURES))), np.empty(0), 0
+    for chunk in chunks:
+        rows += len(chunk)
+        sample = np.concatenate([sample, chunk])
+        keys = np.concatenate([keys, rng.random(len(chunk))])
+        if len(keys) > size:
+            keep = np.argpartition(keys, size - 1)[:size]
+            sample, keys = sample[keep], keys[keep]
+    return sample, rows
+
+
+def _metrics(model, sample, inertia):
+    from sklearn.metrics import silhouette_score
+
+    labels = model.predict(sample)
+    n_labels = len(np.unique(labels))
+    silhouette = silhouette_score(sample, labels) if 1 < n_labels < len(sample) else None
+    return {"k": int(model.n_clusters), "inertia": float(inertia),
+            "silhouette": None if silhouette is None else float(silhouette)}
+
+
+def fit_kmeans(k, X, sample, n_init=10, max_iter=300):
+    """KMeans on the full matrix; inertia is over all of X."""
+    from sklearn.cluster import KMeans
+
+    model = KMeans(n_clusters=k, random_state=RANDOM_STATE, n_init=n_init, max_iter=max_iter).fit(X)
+    return model, _metrics(model, sample, model.inertia_)
+
+
+def fit_minibatch(k, path, sample, chunk_rows=CHUNK_ROWS, batch_size=1024, epochs=3):
+    """MiniBatchKMeans fed chunk by chunk; inertia is over the evaluation sample."""
+    from sklearn.cluster import MiniBatchKMeans
+
+    model = MiniBatchKMeans(n_clusters=k, random_state=RANDOM_STATE, batch_size=batch_size, n_init=3)
+    for _ in range(epochs):
+        for chunk in read_features(path, chunk_rows):
+            for start in range(0, len(chunk), batch_size):
+                batch = chunk[start:start + batch_size]
+                if len(batch) >= k:
+                    model.partial_fit(batch)
+    return model, _metrics(model, sample, -model.score(sample))
+
+
+def _fit_one(fit, k, args, kwargs):
+    # One single-threaded fit per worker: the sweep itself is the parallelism.
+    from threadpoolctl import threadpool_limits
+
+    with threadpool_limits(limits=1):
+        return fit(k, *args, **kwargs)
+
+
+def sweep(fit, ks, args, kwargs, n_jobs=-1):
+    """Fit every K in parallel; returns [(model, metrics)] in ks order."""
+    from joblib import Parallel, delayed
+
+    return Parallel(n_jobs=n_jobs)(delayed(_fit_one)(fit, k, args, kwargs) for k in ks)
+
+
+def best_k(results):
+    """The K with the highest silhouette (ties to the smaller K)."""
+    scored = [metrics for _, metrics in results if metrics["silhouette"] is not None]
+    if not scored:
+        return results[0][1]["k"]
+    return max(scored, key=lambda metrics: (metrics["silhouette"], -metrics["k"]))["k"]
+
+
+def publish_model(model, meta, out_dir=MODELS_DIR):
+    """Publish model.pkl, centroids.npz and meta.json as a new version; returns its directory."""
+    import joblib
+
+    import diet_clusters
+
+    def write(tmp_dir):
+        joblib.dump(model, os.path.join(tmp_dir, "model.pkl"))
+        diet_clusters.save(os.path.join(tmp_dir, "centroids.npz"), diet_clusters.export(model))
+        return meta
+    return publish_directory(os.path.join(out_dir, meta["version"]), write)
+
+
+def promote(version_dir, model_path=MODEL_PATH, centroids_path=CENTROIDS_PATH):
+    """Atomically replace the served model files with the ones in version_dir."""
+    for name, path in (("model.pkl", model_path), ("centroids.npz", centroids_path)):
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        shutil.copyfile(os.path.join(version_dir, name), tmp_path)
+        os.replace(tmp_path, path)
+
+
+def train(data_path, ks=range(2, 9), k=None, minibatch=False, chunk_rows=CHUNK_ROWS, sample_size=SAMPLE_SIZE,
+          n_init=10, max_iter=300, batch_size=1024, epochs=3, n_jobs=-1, out_dir=MODELS_DIR, log=print):
+    """Sweep ks (or fit only k) and publish the best model; returns its directory."""
+    started = datetime.utcnow()
+    data_hash = file_digest(data_path)
+    ks = [k] if k is not None else list(ks)
+
+    if minibatch:
+        sample, rows = reservoir_sample(read_features(data_path, chunk_rows), sample_size)
+        results = sweep(fit_minibatch, ks, (data_path, sample),
+                        {"chunk_rows": chunk_rows, "batch_size": batch_size, "epochs": epochs}, n_jobs)
+    else:
+        X = np.concatenate(list(read_features(data_path, chunk_rows)))
+        rows = len(X)
+        sample = X if len(X) <= sample_size else \
+            X[np.random.default_rng(RANDOM_STATE).choice(len(X), sample_size, replace=False)]
+        results = sweep(fit_kmeans, ks, (X, sample), {"n_init": n_init, "max_iter": max_iter}, n_jobs)
+
+    for _, metrics in results:
+        silhouette = "n/a" if metrics["silhouette"] is None else f"{metrics['silhouette']:.4f}"
+        log(f"📊 K={metrics['k']}: inertia {metrics['inertia']:.1f}, silhouette {silhouette}")
+
+    chosen = best_k(results)
+    model = next(model for model, metrics in results if metrics["k"] == chosen)
+    meta = {
+        "version": f"{started:%Y%m%d%H%M%S}-k{chosen}-{data_hash[:8]}",
+        "features": list(FEATURES),
+        "k": chosen,
+        "algorithm": "MiniBatchKMeans" if minibatch else "KMeans",
+        "sweep": [metrics for _, metrics in results],
+        "data": {"path": os.path.basename(data_path), "sha256": data_hash, "rows": rows},
+        "trained_at": started.isoformat(),
+        "seconds": (datetime.utcnow() - started).total_seconds(),
+    }
+    path = publish_model(model, meta, out_dir)
+    log(f"✅ K={chosen} model published at {path} in {meta['seconds']:.1f}s")
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the diet clustering model")
+    parser.add_argument("--data", default=os.path.join(os.getcwd(), "diet.csv"))
+    parser.add_argument("--k-min", type=int, default=2)
+    parser.add_argument("--k-max", type=int, default=8)
+    parser.add_argument("--k", type=int, help="train only this K instead of sweeping")
+    parser.add_argument("--n-init", type=int, default=10)
+    parser.add_argument("--max-iter", type=int, default=300)
+    parser.add_argument("--minibatch", action="store_true", help="stream the CSV into MiniBatchKMeans")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--sample-size", type=int, default=SAMPLE_SIZE, help="rows used for silhouette")
+    parser.add_argument("--jobs", type=int, default=-1, help="parallel fits (-1: one per core)")
+    parser.add_argument("--out", default=MODELS_DIR)
+    parser.add_argument("--promote", action="store_true", help=f"serve the new model by replacing {MODEL_PATH}")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.data):
+        raise FileNotFoundError(f"❌ Dataset not found at {args.data}")
+
+    path = train(args.data, range(args.k_min, args.k_max + 1), args.k, args.minibatch, args.chunk_rows,
+                 args.sample_size, args.n_init, args.max_iter, args.batch_size, args.epochs, args.jobs, args.out)
+    if args.promote:
+        promote(path, os.path.join(os.getcwd(), MODEL_PATH), os.path.join(os.getcwd(), CENTROIDS_PATH))
+        print(f"🚀 Promoted {os.path.basename(path)} to {MODEL_PATH} and {CENTROIDS_PATH}")